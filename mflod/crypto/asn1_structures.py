@@ -157,6 +157,31 @@ class MPHeader(univ.Sequence):
     )
 
 
+class MPHeaderKey(univ.Sequence):
+    """ MPHeaderKey class inherits pyasn1.type.univ.Sequence class
+    and encapsulates MPHeaderKey structure in it
+    You can take a look for the information about the structure in our docs:
+    https://github.com/arachnid42/mflod/blob/master/mflod/crypto/README.md
+    #2-header-block-asn1-structure
+
+    Used since protocol version 1: the structure is RSA-encrypted in a single
+    block and holds the key MPHeader is AES-GCM encrypted with.
+
+    You need to set these parameters:
+
+        identificationString:   identification string for verifying
+                                result of decryption
+        initializationVector:   12 bytes of GCM mode nonce
+        AESKey:                 16 bytes of AES key
+
+    """
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType('identificationString', univ.OctetString()),
+        namedtype.NamedType('initializationVector', univ.OctetString()),
+        namedtype.NamedType('AESKey', univ.OctetString())
+    )
+
+
 class MessagePacket(univ.Sequence):
     """ MessagePacket class ihnerits pyasn1.type.univ.Sequence class
     and encapsulates MessagePacket structure in it
@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import mflod.crypto.pgp_parser as pgp_parser
+from mflod.crypto.key_manager import KeyManager
+
+
+class AsyncKeyManager(object):
+    """
+    Class provides asyncio counterparts of KeyManager public methods (generate_pgp_key, delete_pgp_key,
+    get_pgp_rsa_key_id and get_pgp_rsa_keys)
+
+    gpg is run with asyncio subprocesses, so key operations do not block the event loop. At most concurrency
+    gpg processes are run at once (asyncio.Semaphore), other calls wait for their turn without blocking.
+    Key cache and PGP key index are shared with the wrapped KeyManager instance.
+
+    Developers:
+        - (tnanoba) Tornike Nanobashvili
+    """
+
+    def __init__(self, key_manager=None, concurrency=4, **kwargs):
+        """
+        Initialize AsyncKeyManager
+
+        @:param key_manager: KeyManager|None (instance to share key cache and PGP key index with, a new one is
+            created of kwargs if None)
+        @:param concurrency: int (maximal amount of concurrently running gpg processes)
+        @:param kwargs: dict (KeyManager instantiation parameters)
+        """
+        self.key_manager = key_manager if key_manager is not None else KeyManager(**kwargs)
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.debug('AsyncKeyManager instance is being created.')
+
+    async def _run_gpg(self, *args, input_data=None, expected=()):
+        """
+        Runs gpg asynchronously and returns its output along with its parsed status lines, raises GPGError when gpg
+            exits with a non-zero code without emitting any of the expected status lines (see KeyManager._run_gpg)
+
+        @developer: tnanoba
+
+        :param args: str (gpg arguments)
+        :param input_data: bytes|None (standard input)
+        :param expected: tuple (status keywords a caller handles failures by)
+        :return: tuple (bytes stdout, list of status tuples (keyword, list of arguments))
+        """
+        async with self.semaphore:
+            process = await asyncio.create_subprocess_exec(
+                *self.key_manager._gpg_command(*args),
+                stdin=asyncio.subprocess.PIPE if input_data is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+
+            stdout, stderr = await process.communicate(input_data)
+
+        return stdout, self.key_manager._check_gpg_exit(args, process.returncode, stderr, expected)
+
+    async def generate_pgp_key(self, key_length=2048, user_name='Auto Generated Key',
+                               user_comment='Generated by KeyManager', user_email=''):
+        """
+        Generates PGP key pair on local environment (see KeyManager.generate_pgp_key)
+
+        @developer: tnanoba
+
+        With key_stock of the wrapped KeyManager set gpg does not generate the key: RSA key taken out of the stock
+            is turned into a PGP key in an executor thread and imported into the key chain.
+
+        :param key_length: int (defaults to 2048 bits)
+        :param user_name: str (defaults to Auto Generated Key)
+        :param user_comment: str (defaults to Generated by KeyManager)
+        :param user_email: str (no email if empty)
+
+        :return: str|None (RSA key fingerprint (SHA1))
+        """
+        try:
+            if self.key_manager.key_stock is None:
+                batch = self.key_manager._gen_key_batch(0, key_length, user_name, user_comment, user_email)
+
+                _, status = await self._run_gpg('--gen-key', input_data=batch.encode('utf-8'))
+
+                fingerprint = next((fields[1] for keyword, fields in status
+                                    if keyword == 'KEY_CREATED' and len(fields) > 1), None)
+
+                if fingerprint is None:
+                    raise ValueError('gpg did not create a key')
+
+                self.logger.info('RSA ' + '(' + str(key_length) + ' bits) key pair is being generated. Fingerprint: ' +
+                                 fingerprint)
+            else:
+                pgp_key, fingerprint = await asyncio.get_running_loop().run_in_executor(
+                    None, self.key_manager._build_stock_pgp_key, {
+                        'key_length': key_length,
+                        'user_name': user_name,
+                        'user_comment': user_comment,
+                        'user_email': user_email,
+                    })
+
+                _, status = await self._run_gpg('--import', input_data=pgp_key)
+
+                if not any(keyword == 'IMPORT_OK' for keyword, _ in status):
+                    raise ValueError('gpg did not import the key')
+
+                self.logger.info('RSA (' + str(key_length) + ' bits) key pair is being imported from key stock. '
+                                 'Fingerprint: ' + fingerprint)
+
+            await self._sync_key_index()
+
+            return fingerprint
+        except Exception as ERROR:
+            self.logger.error(ERROR)
+            return None
+
+    async def delete_pgp_key(self, fingerprint):
+        """
+        Deletes PGP key pair based on provided fingerprint (see KeyManager.delete_pgp_key)
+
+        @developer: tnanoba
+
+        :param fingerprint: str (key HEX SHA1 fingerprint)
+        :return: bool (True if the key was deleted)
+        """
+        deleted = False
+
+        try:
+            _, status = await self._run_gpg('--yes', '--delete-secret-and-public-key',
+                                            fingerprint.replace(' ', '').upper(), expected=('DELETE_PROBLEM',))
+
+            problem = next((fields for keyword, fields in status if keyword == 'DELETE_PROBLEM'), None)
+
+            if problem is not None:
+                reason = self.key_manager.DELETE_PROBLEMS.get(problem[0] if problem else '', 'deletion problem')
+
+                raise ValueError('gpg did not delete a key: ' + reason)
+
+            self.logger.info('RSA key pair is being deleted. Fingerprint: ' + fingerprint)
+
+            deleted = True
+        except Exception as ERROR:
+            self.logger.error(ERROR)
+
+        self.key_manager.invalidate_cached_key(fingerprint)
+
+        if deleted:
+            await self._sync_key_index()
+
+        return deleted
+
+    async def get_pgp_rsa_key_id(self, key_id, secret=True):
+        """
+        Searches PGP key either by keyid or either fingerprint and returns cryptography lib instance on success,
+            None otherwise (see KeyManager.get_pgp_rsa_key_id)
+
+        @developer: tnanoba
+
+        :param key_id: str
+        :param secret: bool (True for private key, False for public key)
+        :return: Object|None
+        """
+        try:
+            if key_id is None:
+                raise ValueError
+
+            cache_key = (self.key_manager._normalize_key_id(key_id), secret)
+
+            key = self.key_manager.key_cache.get(cache_key)
+
+            if key is not None:
+                return key
+
+            pgp_key, _ = await self._run_gpg('--export-secret-keys' if secret else '--export', key_id)
+
+            if pgp_key == b'':
+                raise ValueError('No PGP key found: ' + key_id)
+
+            key = self.key_manager._return_rsa_key_from_pgp(pgp_key, secret)
+
+            self.key_manager.key_cache.put(cache_key, key)
+
+            return key
+        except Exception as ERROR:
+            self.logger.error(ERROR)
+            return None
+
+    async def get_pgp_rsa_keys(self, limit=30, secret=True, key_ids=None):
+        """
+        Asynchronously yields RSA keys of PGP keys exported with a single gpg invocation
+            (see KeyManager.get_pgp_rsa_keys)
+
+        @developer: tnanoba
+
+        :param limit: int
+        :param secret: bool (True for private key, False for public key)
+        :param key_ids: list|None (keyids/fingerprints of keys to retrieve, None for the whole key chain)
+        :return: AsyncGenerator
+        """
+        try:
+            # Terminates process if limit is not a valid integer or it equals to 0
+            if not isinstance(limit, int) or limit == 0:
+                raise ValueError
+
+            if key_ids is None:
+                key_ids = []
+            else:
+                key_ids = list(key_ids)
+
+                # Empty key id list would make gpg export the whole key chain
+                if not key_ids:
+                    return
+
+            pgp_keys, _ = await self._run_gpg('--export-secret-keys' if secret else '--export', *key_ids)
+        except Exception as ERROR:
+            self.logger.error(ERROR)
+            return
+
+        count = 0
+
+        for pgp_key in pgp_parser.split_keys(pgp_keys):
+            # Keys which are not RSA ones (DSA, ECC) or can not be parsed are logged and skipped
+            try:
+                key = self.key_manager._return_rsa_key_from_pgp(pgp_key, secret)
+            except Exception as ERROR:
+                self.logger.error(ERROR)
+                continue
+
+            if key is None:
+                continue
+
+            yield key
+            count += 1
+
+            # Terminates on specified limit
+            if count == limit:
+                break
+
+    async def _sync_key_index(self):
+        """
+        Synchronizes PGP key index of the wrapped KeyManager (see KeyManager.sync_key_index) in an executor thread
+
+        :return: void
+        """
+        if self.key_manager._key_index is None:
+            return
+
+        await asyncio.get_running_loop().run_in_executor(None, self.key_manager.sync_key_index, True)
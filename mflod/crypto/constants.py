@@ -4,17 +4,46 @@ class Constants(object):
 
     # ASN.1 OIDs
     AES_128_CBC_OID = "2.16.840.1.101.3.4.1.2"
+    AES_128_GCM_OID = "2.16.840.1.101.3.4.1.6"
     SHA1_OID = '1.3.14.3.2.26'
     RSASSA_PSS_OID = '1.2.840.113549.1.1.10'
     ID_RSAES_OAEP = '1.2.840.113549.1.1.7'
     NO_SIGN_OID = '0.0.0.0.0.0.0'
+    X25519_OID = '1.3.101.110'
+    ED25519_OID = '1.3.101.112'
 
     # Crypto
     AES_BLOCK_SIZE = 128
+    STREAM_CHUNK_SIZE = 64 * 1024
+    AES_GCM_IV_SIZE = 12
+    AES_GCM_TAG_SIZE = 16
+
+    # X25519 header mode: raw public key length, KDF context and a length
+    # of random data standing for a signature in unsigned headers
+    X25519_KEY_SIZE = 32
+    X25519_KDF_INFO = b'FLOD X25519 header'
+    X25519_NO_SIGN_SIZE = 256
+
+    # signature algorithms (RSASSA-PSS with SHA1 or Ed25519)
+    SIGNATURE_ALGORITHMS = (RSASSA_PSS_OID, ED25519_OID)
+    ED25519_SIGNATURE_SIZE = 64
+
+    # content encryption algorithms (AES-128-CBC is HMAC-SHA1 protected,
+    # AES-128-GCM carries its authentication tag in the HMAC block)
+    CONTENT_ALGORITHMS = (AES_128_CBC_OID, AES_128_GCM_OID)
 
     # Initialization String
     IS = 'FLOD'
 
     # Version
-    PROTOCOL_VERSION = 0
+    # 0: MPHeader is RSA-encrypted in as many blocks as it takes
+    # 1: MPHeaderKey is RSA-encrypted in a single block, MPHeader is
+    #    AES-GCM encrypted with a key it carries (the RSA block is
+    #    authenticated as additional data) (opt-in, peers older than
+    #    version 1 support read version 0 packets only)
+    PROTOCOL_VERSION_RSA_HEADER = 0
+    PROTOCOL_VERSION_WRAPPED_KEY = 1
+    PROTOCOL_VERSION = PROTOCOL_VERSION_RSA_HEADER
+    SUPPORTED_PROTOCOL_VERSIONS = (PROTOCOL_VERSION_RSA_HEADER,
+                                   PROTOCOL_VERSION_WRAPPED_KEY)
 
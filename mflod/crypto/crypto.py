@@ -1,18 +1,19 @@
 # generic imports
+import io
 import logging
+import threading
+from itertools import chain
+from os import cpu_count
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # crypto module headers and helpers imports
 import mflod.crypto.exceptions as exc
-import mflod.crypto.asn1_structures as asn1_dec
+import mflod.crypto.der_codec as der_codec
 from mflod.crypto.constants import Constants as const
+from mflod.crypto.key_stats import KeyHitStats
 from mflod.crypto.log_strings import LogStrings as logstr
 
-# ASN.1 tools imports
-from pyasn1.type import univ
-from pyasn1.codec.der.encoder import encode as asn1_encode
-from pyasn1.codec.der.decoder import decode as asn1_decode
-
 # cryptography connected imports
 import hmac
 import hashlib
@@ -20,10 +21,17 @@ from os import urandom
 from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.primitives.hashes import SHA1
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
+from cryptography.hazmat.primitives.asymmetric.x25519 import \
+    X25519PublicKey, X25519PrivateKey
+from cryptography.hazmat.primitives.asymmetric.ed25519 import \
+    Ed25519PublicKey, Ed25519PrivateKey
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.serialization import Encoding, \
+    PublicFormat
 from cryptography.hazmat.primitives.asymmetric import padding as asym_padding
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
-from cryptography.exceptions import InvalidSignature, InvalidKey
+from cryptography.exceptions import InvalidSignature, InvalidKey, InvalidTag
 
 
 class Crypto(object):
@@ -44,13 +52,94 @@ class Crypto(object):
 
     """
 
-    def __init__(self):
-        """ Initialization method """
+    # possible AES-GCM part lengths of signed version 1 headers (built
+    # lazily by the key size filter)
+    __signed_header_lens = None
+
+    def __init__(self, trial_workers=None, adaptive_key_order=False,
+                 zero_copy=False, protocol_version=const.PROTOCOL_VERSION,
+                 content_algorithm=const.AES_128_CBC_OID,
+                 signature_algorithm=const.RSASSA_PSS_OID,
+                 key_order_policy=KeyHitStats.MOST_FREQUENT):
+        """ Initialization method
+
+        :param trial_workers=None:          integer number of threads to
+                                            spread header trial decryption
+                                            over during disassembly. None
+                                            (or 1) keeps the serial
+                                            brute-force loop
+        :param adaptive_key_order=False:    bool whether to try the keys
+                                            that matched most often first
+                                            (see key_stats attribute)
+        :param zero_copy=False:             bool whether disassembly should
+                                            return a message content as a
+                                            memoryview of a decrypted buffer
+                                            instead of a string copy of it
+        :param protocol_version=PROTOCOL_VERSION: integer protocolVersion
+                                            of assembled message packets
+                                            (disassembly accepts all
+                                            SUPPORTED_PROTOCOL_VERSIONS)
+        :param content_algorithm=AES_128_CBC_OID: string OID of content
+                                            encryption of assembled message
+                                            packets: AES-128-CBC with
+                                            HMAC-SHA1 or AES-128-GCM
+                                            (disassembly accepts both)
+        :param signature_algorithm=RSASSA_PSS_OID: string OID of a
+                                            signature scheme senders use.
+                                            Signing dispatches on a key
+                                            type, this only sets a length
+                                            of random data unsigned headers
+                                            carry in place of a signature
+                                            (64 bytes for Ed25519)
+        :param key_order_policy=MOST_FREQUENT: string KeyHitStats ordering
+                                            policy adaptive_key_order uses:
+                                            MOST_FREQUENT or MOST_RECENT
+
+        :raise mflod.crypto.exceptions.UnsupportedProtocolVersion,
+               ValueError if content_algorithm, signature_algorithm or
+               key_order_policy is not supported
+
+        """
 
         # init logger object
         self.logger = logging.getLogger(__name__)
         self.logger.debug(logstr.CRYPTO_CLASS_INIT)
 
+        # parallel trial decryption settings (pool is created lazily)
+        self.trial_workers = trial_workers
+        self.__trial_pool = None
+
+        # per-key hit statistics (used for ordering if enabled)
+        self.adaptive_key_order = adaptive_key_order
+        self.key_stats = KeyHitStats(key_order_policy)
+
+        # representation of recovered message content
+        self.zero_copy = zero_copy
+
+        # header block layout of assembled packets
+        if protocol_version not in const.SUPPORTED_PROTOCOL_VERSIONS:
+            raise exc.UnsupportedProtocolVersion(protocol_version)
+        self.protocol_version = protocol_version
+
+        # content block encryption of assembled packets
+        if content_algorithm not in const.CONTENT_ALGORITHMS:
+            raise ValueError("unsupported content encryption algorithm: %s"
+                             % content_algorithm)
+        self.content_algorithm = content_algorithm
+
+        # signature scheme unsigned headers have to look like
+        if signature_algorithm not in const.SIGNATURE_ALGORITHMS:
+            raise ValueError("unsupported signature algorithm: %s"
+                             % signature_algorithm)
+        self.signature_algorithm = signature_algorithm
+
+        # padding scheme objects are stateless so they are shared
+        self.__oaep_padding = asym_padding.OAEP(
+            mgf=asym_padding.MGF1(algorithm=SHA1()),
+            algorithm=SHA1(),
+            label=None
+        )
+
     def assemble_message_packet(self, msg_content, recipient_pk, sign=None):
         """ Assemble FLOD message packet
 
@@ -70,12 +159,17 @@ class Crypto(object):
                                     primitives.asymmetric.rsa.RSAPublicKey
                                     that is a public key of a recipient.
                                     Used to encrypt a header block of the
-                                    message packet.
+                                    message packet. An instance of
+                                    cryptography.hazmat.primitives.
+                                    asymmetric.x25519.X25519PublicKey
+                                    selects X25519 header mode.
         :param sign=None:           list
                                     [instance of cryptography.hazmat.
                                     primitives.asymmetric.rsa.RSAPrivateKey
-                                    that is used to create a signature in the
-                                    header block of FLOD message packet,
+                                    (RSASSA-PSS) or ed25519.
+                                    Ed25519PrivateKey (Ed25519) that is used
+                                    to create a signature in the header
+                                    block of FLOD message packet,
                                     string PGPKey_ID]
 
         :return: string DER-encoded ASN.1 structure that is FLOD message packet
@@ -87,115 +181,254 @@ class Crypto(object):
         # enable debug logging
         self.logger.debug("assembly flod message packet")
 
-        # generate key_lst = [iv, aes_key, hmac_key]
-        key_lst = self.__get_random_bytes([16, 16, 20])
+        return self.assemble_for_recipients(msg_content, [recipient_pk],
+                                            sign)[0]
 
-        # generate content block (AES encrypted )
-        content_block = self.__assemble_content_block(msg_content,
-                                                      key_lst[1], key_lst[0])
+    def assemble_for_recipients(self, msg_content, recipient_pks,
+                                sign=None):
+        """ Assemble FLOD message packets of a message for several recipients
 
-        # generate HMAC block
-        hmac_block = self.__assemble_hmac_block(asn1_encode(content_block),
-                                                key_lst[2])
+        @developer: vsmysle
 
-        # calculate the maximum length of RSA encryption
-        rsa_max_len = self.__get_rsa_max_bytestring_size(recipient_pk.key_size)
+        Every packet is the same as assemble_message_packet would produce for
+        a recipient, but the packets share AES and HMAC keys: the content
+        block, the HMAC block and a signature (it is made over the keys only)
+        are produced once and only a header block is assembled (encrypted)
+        per recipient.
 
-        # creating instance of AlgorithmIdentifier class for RSA signing
-        algo_identifier = asn1_dec.AlgorithmIdentifier()
+        Every recipient knows the shared keys, so one recipient can replace
+        the content of a packet sent to another one and keep a valid
+        signature of a sender. Send to recipients that trust each other
+        (e.g. a group) only, otherwise use assemble_message_packet per
+        recipient.
 
-        # set default parameters to univ.Null()
-        algo_identifier['parameters'] = univ.Null()
+        :param msg_content:         string message (see
+                                    assemble_message_packet)
+        :param recipient_pks:       iterable of recipient public keys (see
+                                    recipient_pk of assemble_message_packet)
+        :param sign=None:           see assemble_message_packet
 
-        if sign:
-            # logger for existence of sign list
-            self.logger.info("sign list is present")
+        :return: list of string DER-encoded FLOD message packets in the same
+                 order as recipient_pks
 
-            # generate signature using sender secret key and PGPKeyID
-            signature = self.__sign_content(key_lst[1]+key_lst[2], sign[0])
+        """
 
-            # assign PGPKeyID to a variable
-            pgp_key_id = sign[1]
+        # log entry
+        self.logger.debug(logstr.ASSEMBLE_FOR_RECIPIENTS_CALL)
 
-            # setting oid for the rsassa-pss
-            algo_identifier['algorithm'] = const.RSASSA_PSS_OID
+        recipient_pks = list(recipient_pks)
+        if not recipient_pks:
+            return []
 
-        else:
-            # logger for existence of sign list
-            self.logger.info("sign list is not present")
+        # generate key_lst = [iv, aes_key, hmac_key]
+        key_lst = self.__get_random_bytes([16, 16, 20])
 
-            # if there is no sign list - generate random signature
-            signature = urandom(rsa_max_len)
+        # generate content block (AES-GCM encrypted) in a single pass, its
+        # authentication tag takes place of an HMAC digest
+        if self.content_algorithm == const.AES_128_GCM_OID:
+            content_block, tag = self.__assemble_aead_content_block(
+                    msg_content, key_lst[1],
+                    key_lst[0][:const.AES_GCM_IV_SIZE])
+            hmac_block = const.AES_128_GCM_OID, tag
 
-            # generating random PGPKeyID
-            pgp_key_id = urandom(8)
+        else:
 
-            # setting signature oid to zeros
-            algo_identifier['algorithm'] = const.NO_SIGN_OID
+            # generate content block (AES encrypted )
+            content_block = self.__assemble_content_block(
+                    msg_content, key_lst[1], key_lst[0])
 
-        # creating instance of MPHeader class
-        mp_header = asn1_dec.MPHeader()
+            # generate HMAC block over the exact bytes that go into the packet
+            hmac_block = self.__assemble_hmac_block(content_block, key_lst[2])
 
-        # setting indentificationString to constant - FLOD
-        mp_header['identificationString'] = const.IS
+        # HMAC and content blocks are the tail of every packet
+        blocks = der_codec.encode_mp_hmac_container(*hmac_block) + \
+            content_block
 
-        # setting AlgorithmIdentifier as a parameter of MPHeader
-        mp_header['signatureAlgorithm'] = algo_identifier
+        # sign the keys once for all the recipients
+        signed = self.__sign_header_keys(key_lst[1], key_lst[2], sign) \
+            if sign else None
 
-        # setting PGPKeyID that was defined above
-        mp_header['PGPKeyID'] = pgp_key_id
+        # generate HEADER block per recipient and encode MessagePacket with
+        # the version of our protocol the header block was assembled for
+        packets = []
+        for recipient_pk in recipient_pks:
+            mp_header_container = self.__assemble_header_block(
+                    recipient_pk, key_lst[1], key_lst[2], signed=signed)
+            packets.append(der_codec.encode_message_packet_prefix(
+                    self.protocol_version, mp_header_container,
+                    len(blocks)) + blocks)
 
-        # setting signature that was calculated previously
-        mp_header['signature'] = signature
+        return packets
 
-        # setting HMACKey from the generated keys list
-        mp_header['HMACKey'] = key_lst[2]
+    def assemble_many(self, msg_specs, workers=None):
+        """ Assemble a batch of FLOD message packets
 
-        # setting AESKey from the generated keys list
-        mp_header['AESKey'] = key_lst[1]
+        @developer: vsmysle
 
-        # encoding header into ASN.1 DER-encoded structure
-        encoded_mp_header = asn1_encode(mp_header)
+        Every message packet is assembled as with assemble_message_packet but
+        the packets are processed on a thread pool. The heavy lifting (AES,
+        HMAC, RSA) is done by OpenSSL which releases the GIL so the threads
+        do run in parallel.
 
-        # encrypting parts of encoded header with RSA
-        # we encrypt several part due to restriction of the RSA max encryption
-        # length
+        :param msg_specs:       iterable of tuples (msg_content, recipient_pk)
+                                or (msg_content, recipient_pk, sign) where
+                                the items are the same as arguments of
+                                assemble_message_packet
+        :param workers=None:    integer amount of worker threads (defaults
+                                to a number of CPUs)
 
-        enc_header = bytes()
-        for rsa_block in [encoded_mp_header[i:i+rsa_max_len] for i in
-                          range(0, len(encoded_mp_header), rsa_max_len)]:
-            enc_header += self.__encrypt_with_rsa(rsa_block, recipient_pk)
+        :return: list of string DER-encoded FLOD message packets in the same
+                 order as msg_specs
 
-        # creating instance of AlgorithmIdentifier for RSA encryption OID
-        rsa_algo_identifier = asn1_dec.AlgorithmIdentifier()
+        """
 
-        # setting the OID for id-rsaes-oaep
-        rsa_algo_identifier['algorithm'] = const.ID_RSAES_OAEP
+        # log entry
+        self.logger.debug(logstr.ASSEMBLE_MANY_CALL)
 
-        # setting default parameters to univ.Null()
-        rsa_algo_identifier['parameters'] = univ.Null()
+        def assemble(msg_spec):
+            return self.assemble_message_packet(*msg_spec)
 
-        # creating the instance of MPHeaderContainer class
-        mp_header_container = asn1_dec.MPHeaderContainer()
+        with ThreadPoolExecutor(max_workers=workers or cpu_count() or 1) \
+                as pool:
+            return list(pool.map(assemble, msg_specs))
 
-        # setting AlgorithmIdentifier
-        mp_header_container['encryptionAlgorithm'] = rsa_algo_identifier
+    def assemble_message_packet_stream(self, source, length, recipient_pk,
+                                       sink, sign=None,
+                                       chunk_size=const.STREAM_CHUNK_SIZE):
+        """ Assemble FLOD message packet from a stream into a stream
 
-        # set encrypted header to the OCTET STRING
-        mp_header_container['encryptedHeader'] = enc_header
+        @developer: vsmysle
 
-        # creating the instance of MessagePacket class
-        message_packet = asn1_dec.MessagePacket()
+        Produces exactly the same packet as assemble_message_packet would do
+        for msg_content equal to the bytes read from a source, but AES-CBC
+        encryption and HMAC calculation are done in chunks so memory usage
+        does not depend on a message size.
+
+        HMAC block precedes content block in a packet while HMAC is only
+        known after the whole content was encrypted. Thus either a sink has
+        to be seekable (HMAC block is written as a placeholder and patched
+        afterwards) or a source has to be seekable (content is encrypted
+        twice: first pass calculates HMAC only).
+
+        :param source:              readable binary file-like object to read
+                                    a message content from
+        :param length:              integer amount of bytes of a content to
+                                    read from a source
+        :param recipient_pk:        see assemble_message_packet
+        :param sink:                writable binary file-like object to put
+                                    DER-encoded FLOD message packet to
+        :param sign=None:           see assemble_message_packet
+        :param chunk_size=STREAM_CHUNK_SIZE: integer size of a chunk to read
+                                    from a source at once
+
+        :return: integer amount of bytes written to a sink
+
+        :raise ValueError if neither a sink nor a source is seekable or a
+               source ends before length bytes were read
 
-        # setting the version of our protocol that is taken from constants
-        message_packet['protocolVersion'] = const.PROTOCOL_VERSION
+        """
 
-        # setting the instance of MPHeaderContainer to the header block
-        message_packet['headerBlock'] = mp_header_container
-        message_packet['hmacBlock'] = hmac_block
-        message_packet['contentBlock'] = content_block
+        # log entry
+        self.logger.debug(logstr.ASSEMBLE_STREAM_CALL)
+
+        sink_seekable = self.__is_seekable(sink)
+        if not sink_seekable and not self.__is_seekable(source):
+            raise ValueError("either a sink or a source has to be seekable")
+
+        # generate keys for content and HMAC blocks
+        iv, aes_key, hmac_key = self.__get_random_bytes([16, 16, 20])
+        aead = self.content_algorithm == const.AES_128_GCM_OID
+        if aead:
+            iv = iv[:const.AES_GCM_IV_SIZE]
+
+        # generate HEADER block
+        mp_header_container = self.__assemble_header_block(
+                recipient_pk, aes_key, hmac_key, sign)
+
+        # precalculate DER prefixes of the content block (all the lengths are
+        # known in advance as PKCS#7 always adds from 1 to 16 bytes and GCM
+        # does not pad at all)
+        mp_content_prefix = der_codec.encode_mp_content_prefix(
+                datetime.utcnow().strftime(const.TIMESTAMP_FORMAT), length)
+        block_len = const.AES_BLOCK_SIZE // 8
+        if aead:
+            enc_content_len = len(mp_content_prefix) + length
+        else:
+            enc_content_len = \
+                (len(mp_content_prefix) + length) // block_len * block_len + \
+                block_len
+        content_block_prefix = der_codec.encode_mp_content_container_prefix(
+                iv, self.content_algorithm, enc_content_len)
+
+        # HMAC block has a fixed length so it can be written as placeholder
+        if aead:
+            digest_oid, digest_len = self.content_algorithm, \
+                const.AES_GCM_TAG_SIZE
+        else:
+            digest_oid, digest_len = const.SHA1_OID, \
+                hashlib.sha1().digest_size
+        hmac_block_len = len(der_codec.encode_mp_hmac_container(
+                digest_oid, bytes(digest_len)))
+
+        packet_prefix = der_codec.encode_message_packet_prefix(
+                self.protocol_version, mp_header_container,
+                hmac_block_len + len(content_block_prefix) + enc_content_len)
+
+        # GCM authenticates the content block prefix itself, HMAC digest is
+        # fed with it and then with ciphertext chunks
+        def encrypt_content():
+            if not aead:
+                return None, self.__encrypt_stream_with_aes(
+                    mp_content_prefix, source, length, aes_key, iv,
+                    chunk_size)
+            aes = Cipher(algorithms.AES(aes_key), modes.GCM(iv),
+                         backend=default_backend()).encryptor()
+            aes.authenticate_additional_data(content_block_prefix)
+            return aes, self.__encrypt_stream(mp_content_prefix, source,
+                                              length, aes, chunk_size)
+
+        def content_digest(aes, hmac_digest):
+            return aes.tag if aead else hmac_digest.digest()
+
+        hmac_digest = hmac.new(hmac_key, content_block_prefix, hashlib.sha1)
+        aes, ct_chunks = encrypt_content()
+
+        sink.write(packet_prefix)
+
+        # write placeholder HMAC block and patch it in the end
+        if sink_seekable:
+            hmac_pos = sink.tell()
+            sink.write(bytes(hmac_block_len))
+            sink.write(content_block_prefix)
+
+            for ct_chunk in ct_chunks:
+                if not aead:
+                    hmac_digest.update(ct_chunk)
+                sink.write(ct_chunk)
+
+            end_pos = sink.tell()
+            sink.seek(hmac_pos)
+            sink.write(der_codec.encode_mp_hmac_container(
+                    digest_oid, content_digest(aes, hmac_digest)))
+            sink.seek(end_pos)
+
+        # encrypt content twice: calculate HMAC (or GCM tag) first, then
+        # write (the same key and IV produce the same ciphertext again)
+        else:
+            source_pos = source.tell()
+            for ct_chunk in ct_chunks:
+                if not aead:
+                    hmac_digest.update(ct_chunk)
+            source.seek(source_pos)
+
+            sink.write(der_codec.encode_mp_hmac_container(
+                    digest_oid, content_digest(aes, hmac_digest)))
+            sink.write(content_block_prefix)
+            for ct_chunk in encrypt_content()[1]:
+                sink.write(ct_chunk)
 
-        return asn1_encode(message_packet)
+        return len(packet_prefix) + hmac_block_len + \
+            len(content_block_prefix) + enc_content_len
 
     def disassemble_message_packet(self, msg_packet, key_manager):
         """ Attempt to disassemble FLOD message packet that was received
@@ -207,6 +440,10 @@ class Crypto(object):
         was addressed to the user. This does not means though that the
         signature verification will succeed as well as HMAC integrity check.
 
+        If the instance was created with trial_workers greater than 1, test
+        decryptions are spread over a thread pool and the remaining ones are
+        dropped as soon as some key matches.
+
         On successful decryption the method returns a recovered message
         together with a supplementary exit code which determines conditions
         that occur during disassembly process. The code can be one of the
@@ -233,15 +470,20 @@ class Crypto(object):
                                           cryptography.hazmat.primitives.
                                           asymmetric.rsa.RSAPrivateKey
                                         - get_pk_by_pgp_id(pgp_id) which
-                                          attempts to find a matching to an
-                                          string input ID PGP key. If the key
-                                          was found - return an instance of
-                                          cryptography.hazmat.primitives.
+                                          attempts to find a matching to a
+                                          raw 8 bytes input ID PGP key. If the
+                                          key was found - return an instance
+                                          of cryptography.hazmat.primitives.
                                           asymmetric.rsa.RSAPublicKey. If there
                                           is not such key - return None. If the
                                           ID passed is all 0s - return a list
                                           of all user plain RSA public keys.
 
+        The packet is parsed in place (through memoryview slices of
+        msg_packet) so the only large allocation is a buffer for decrypted
+        content. With zero_copy passed on initialization dec_msg is a
+        memoryview of that buffer, otherwise it is a string copy of it.
+
         :return: one of the following lists (see supplementary exit codes
                  paragraph for details):
                     - [timestamp, dec_msg, 0, pgp_key_id]
@@ -260,164 +502,755 @@ class Crypto(object):
 
         :raise mflod.crypto.exceptions.NoMatchingRSAKeyForMessage,
                mflod.crypto.exceptions.SignatureVerificationFailed,
-               mflod.crypto.exceptions.HMACVerificationFailed
+               mflod.crypto.exceptions.HMACVerificationFailed,
+               mflod.crypto.exceptions.HeaderVerificationFailed if a
+               version 1 header fails AES-GCM authentication
         """
 
         # log entry
         self.logger.debug(logstr.DISASSEMBLE_MESSAGE_PACKET_CALL)
 
-        # decode message packet from DER and get header block
-        message_packet_asn1 = asn1_decode(msg_packet)
-        header_block_asn1 = message_packet_asn1[0][1]
+        # decode message packet from DER
+        mp_decoded = self.__decode_message_packet(msg_packet)
+
+        return self.__disassemble_decoded_packet(
+                mp_decoded, key_manager.yield_keys(), key_manager,
+                self.trial_workers)
+
+    def disassemble_many(self, msg_packets, key_manager, workers=None):
+        """ Disassemble a batch of received FLOD message packets
+
+        @developer: ddnomad
+
+        Works as disassemble_message_packet called in a loop but the user
+        key chain is retrieved from a key manager only once, all packets are
+        decoded up front and the packets are processed on a thread pool.
+        Trial decryption of a single packet is serial in this mode as the
+        parallelism is already across packets.
+
+        A failure to disassemble some packet does not abort the batch: an
+        exception instance is put in place of a corresponding result.
+
+        :param msg_packets:     iterable of string DER-encoded ASN.1
+                                structures of FLOD message packets
+        :param key_manager:     instance of mflod.crypto.key_manager.
+                                KeyManager (see disassemble_message_packet)
+        :param workers=None:    integer amount of worker threads (defaults
+                                to a number of CPUs)
+
+        :return: list of the same length and order as msg_packets. Each
+                 item is either a tuple returned by disassemble_message_packet
+                 or an instance of an exception raised for that packet, e.g.
+                 mflod.crypto.exceptions.NoMatchingRSAKeyForMessage
+
+        """
+
+        # log entry
+        self.logger.debug(logstr.DISASSEMBLE_MANY_CALL)
+
+        # materialize user key chain once for the whole batch
+        user_keys = list(key_manager.yield_keys())
+
+        # decode all the packets up front
+        decoded = []
+        for msg_packet in msg_packets:
+            try:
+                decoded.append(self.__decode_message_packet(msg_packet))
+            except Exception as e:
+                self.logger.warning(logstr.PACKET_DECODING_FAILED)
+                decoded.append(e)
+
+        def disassemble(mp_decoded):
+            if isinstance(mp_decoded, Exception):
+                return mp_decoded
+            try:
+                return self.__disassemble_decoded_packet(
+                        mp_decoded, user_keys, key_manager)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=workers or cpu_count() or 1) \
+                as pool:
+            return list(pool.map(disassemble, decoded))
+
+    def disassemble_message_packet_stream(self, msg_packet, key_manager,
+                                          sink,
+                                          chunk_size=const.STREAM_CHUNK_SIZE):
+        """ Disassemble FLOD message packet into a writable in bounded memory
+
+        @developer: ddnomad
+
+        Streaming counterpart of disassemble_message_packet. Only the framing
+        of a packet is parsed up front, then the content block is read twice
+        in chunks: the first pass verifies its HMAC and the second one
+        decrypts it writing a recovered message into a sink. Nothing is
+        written unless the HMAC is valid.
+
+        A packet is either a bytes-like object (e.g. mmap.mmap of a packet
+        file, in which case chunks are zero-copy slices of it) or a seekable
+        binary file-like object positioned at the beginning of a packet that
+        spans up to its end.
+
+        :param msg_packet:          bytes-like object or seekable readable
+                                    binary file-like object with
+                                    DER-encoded FLOD message packet
+        :param key_manager:         see disassemble_message_packet
+        :param sink:                writable binary file-like object to
+                                    write a recovered message to
+        :param chunk_size=STREAM_CHUNK_SIZE: integer size of a chunk to read
+                                    from a packet at once
+
+        :return: same tuple as disassemble_message_packet returns with an
+                 integer amount of message bytes written to a sink in place
+                 of a message
+
+        :raise mflod.crypto.exceptions.DERDecodingError if a packet is
+               malformed or truncated
+
+        """
+
+        # log entry
+        self.logger.debug(logstr.DISASSEMBLE_STREAM_CALL)
+
+        # locate blocks without reading the encrypted content
+        read_at, size = self.__get_packet_reader(msg_packet)
+        (version, header_block, hmac_block, content_span, iv, content_oid,
+         enc_span) = der_codec.locate_message_packet(read_at, size)
+        digest_oid, digest = der_codec.decode_mp_hmac_container(hmac_block)
+        aead = self.__is_aead_content(content_oid, digest_oid)
+
+        # recover keys and verify a signature from the header block
+        hmac_key, aes_key, exit_code, signer_info = self.__open_header_block(
+                der_codec.decode_mp_header_container(header_block),
+                key_manager.yield_keys(), key_manager, self.trial_workers,
+                version)
+
+        # first pass (GCM): verify a tag decrypting content into nowhere
+        if aead:
+            tag = bytes(digest)
+            aad = bytes(read_at(content_span[0],
+                                enc_span[0] - content_span[0]))
+            for _ in self.__decrypt_stream_with_aes(
+                    self.__read_span(read_at, enc_span, chunk_size), aes_key,
+                    bytes(iv), tag=tag, aad=aad):
+                pass
+
+        # first pass: verify hmac over the content block as it was received
+        else:
+            tag, aad = None, None
+            self.logger.debug("verifying  HMAC")
+            hmac_digest = hmac.new(hmac_key, digestmod=hashlib.sha1)
+            for chunk in self.__read_span(read_at, content_span, chunk_size):
+                hmac_digest.update(chunk)
+
+            if not hmac.compare_digest(hmac_digest.digest(), bytes(digest)):
+                self.logger.warning("HMAC verification failed!")
+                # TODO: more verbose str
+                raise exc.HMACVerificationFailed("")
+            self.logger.info("successful HMAC verification")
+
+        # second pass: decrypt content (the first chunk holds at least the
+        # whole MPContent prefix)
+        pt_chunks = self.__decrypt_stream_with_aes(
+                self.__read_span(read_at, enc_span, chunk_size), aes_key,
+                bytes(iv), der_codec.MAX_MP_CONTENT_PREFIX_LEN, tag, aad)
+        pt_head = next(pt_chunks)
+        timestamp, content_len, prefix_len = \
+            der_codec.decode_mp_content_prefix(pt_head)
+        timestamp = datetime.strptime(timestamp, const.TIMESTAMP_FORMAT)
+
+        written = 0
+        for pt_chunk in chain([memoryview(pt_head)[prefix_len:]], pt_chunks):
+            sink.write(pt_chunk)
+            written += len(pt_chunk)
+
+        if written != content_len:
+            raise exc.DERDecodingError("MPContent length does not match "
+                                       "its content")
+
+        self.logger.info(logstr.MSG_CONTENT_WAS_RECOVERED)
+
+        # return correct result
+        if signer_info:
+            return timestamp, written, exit_code, signer_info
+        return timestamp, written, exit_code
+
+    def __disassemble_decoded_packet(self, mp_decoded, user_keys,
+                                     key_manager, trial_workers=None):
+        """ Disassemble already decoded FLOD message packet
+
+        @developer: ddnomad
+
+        :param mp_decoded:          tuple of decoded MessagePacket (see
+                                    __decode_message_packet)
+        :param user_keys:           iterable of user private keys
+        :param key_manager:         instance of mflod.crypto.key_manager.
+                                    KeyManager (used for signer lookup)
+        :param trial_workers=None:  integer number of threads to use for
+                                    header trial decryption
+
+        :return: see disassemble_message_packet
+
+        """
+
+        # recover keys and verify a signature from the header block
+        hmac_key, aes_key, exit_code, signer_info = self.__open_header_block(
+                mp_decoded[1], user_keys, key_manager, trial_workers,
+                mp_decoded[0])
+
+        # retrieve MPHMACContainer and MPContentContainer
+        mp_hmac_container = mp_decoded[2]
+        mp_content_block = mp_decoded[3]
+
+        # AES-GCM content is authenticated while it is decrypted
+        if mp_hmac_container[0] == const.AES_128_GCM_OID:
+            tag = bytes(mp_hmac_container[1])
+
+        else:
+            tag = None
+
+            # verify hmac over the content block exactly as it was received
+            hmac_ver_res = self.__verify_hmac(mp_hmac_container,
+                    hmac_key, mp_content_block)
+
+            if not hmac_ver_res:
+                # TODO: more verbose str
+                raise exc.HMACVerificationFailed("")
+
+        # all checks were successful - decrypt content
+        timestamp, message = self.__disassemble_content_block(
+                mp_content_block, aes_key, tag)
+
+        self.logger.info(logstr.MSG_CONTENT_WAS_RECOVERED)
+
+        # return correct result
+        if signer_info:
+            return timestamp, message, exit_code, signer_info
+        return timestamp, message, exit_code
+
+    def __open_header_block(self, header_block, user_keys, key_manager,
+                            trial_workers=None,
+                            version=const.PROTOCOL_VERSION_RSA_HEADER):
+        """ Decrypt a header block and verify a signature it carries
+
+        @developer: ddnomad
+
+        Only the first RSA block of a header is trial decrypted with user
+        keys. The rest of MPHeader is either decrypted block by block with
+        the matching key (version 0) or with the AES-GCM key of MPHeaderKey
+        that the first block holds (version 1).
+
+        :param header_block:        tuple of decoded MPHeaderContainer
+                                    components
+        :param user_keys:           iterable of user private keys
+        :param key_manager:         instance of mflod.crypto.key_manager.
+                                    KeyManager (used for signer lookup)
+        :param trial_workers=None:  integer number of threads to use for
+                                    header trial decryption
+        :param version=0:           integer protocolVersion of a packet
+
+        :return: tuple (HMAC key, AES key, exit code, signer info or None)
+
+        :raise mflod.crypto.exceptions.UnsupportedProtocolVersion,
+               mflod.crypto.exceptions.HeaderVerificationFailed
+
+        """
+
+        if version not in const.SUPPORTED_PROTOCOL_VERSIONS:
+            self.logger.warning(logstr.UNSUPPORTED_PROTOCOL_VERSION)
+            raise exc.UnsupportedProtocolVersion(version)
 
         # get encrypted from a header container
-        mp_header_ct = bytes(header_block_asn1[1])
+        mp_header_ct = bytes(header_block[1])
+        x25519 = header_block[0] == const.X25519_OID
 
         # entering brute-force loop
         self.logger.debug(logstr.ATTEMPT_DECRYPT_HEADER)
 
-        # try to decrypt a header with all available user keys
-        for user_sk in key_manager.yield_keys():
-
-            # determine a size of a current user secret key
+        # try to decrypt a header with all available user keys (X25519
+        # headers are tried with user X25519 keys instead of RSA ones)
+        if x25519:
+            user_keys = getattr(key_manager, 'yield_x25519_keys',
+                                lambda: ())()
+            try_key = self.__try_x25519_header_key
+        else:
+            user_keys = self.__filter_header_keys(
+                    user_keys, len(mp_header_ct), version)
+            try_key = self.__try_header_key
+        if self.adaptive_key_order:
+            user_keys = self.key_stats.order(user_keys)
+        match = self.__find_header_key(mp_header_ct, user_keys,
+                                       trial_workers, try_key)
+
+        # update hit/miss counters
+        self.key_stats.record_packet(match[0] if match else None)
+
+        if match is None:
+            # TODO: create more verbose exception
+            self.logger.info(logstr.MESSAGE_NOT_FOR_USER)
+            raise exc.NoMatchingRSAKeyForMessage("")
+
+        # found a matching key - message can be decrypted
+        user_sk, mp_header_pt_init_block = match
+
+        self.logger.info(logstr.MESSAGE_FOR_USER)
+
+        # init exit code (optimistic)
+        exit_code = 0
+        signer_info = None
+
+        # trial decryption recovered the whole MPHeader
+        if x25519:
+            mp_header_pt = mp_header_pt_init_block
+
+        # the first block holds MPHeaderKey, MPHeader is AES-GCM encrypted
+        # and authenticated together with the RSA block
+        elif version == const.PROTOCOL_VERSION_WRAPPED_KEY:
             key_size = user_sk.key_size // 8
-
-            # get decrypted first RSA block of MPHeader
+            _, header_iv, header_key = der_codec.decode_mp_header_key(
+                    mp_header_pt_init_block)
             try:
-                mp_header_pt_init_block = self.__decrypt_with_rsa(
-                        mp_header_ct[:key_size], user_sk)
-            except (InvalidKey, ValueError):
+                mp_header_pt = AESGCM(bytes(header_key)).decrypt(
+                        bytes(header_iv), mp_header_ct[key_size:],
+                        mp_header_ct[:key_size])
+            except (InvalidTag, ValueError):
+                self.logger.warning(logstr.GCM_TAG_VERIFICATION_FAILED)
+                raise exc.HeaderVerificationFailed("")
+
+        # the first block holds the beginning of MPHeader
+        else:
+            key_size = user_sk.key_size // 8
 
-                # probably key size doesn't match
-                self.logger.debug(logstr.INVALID_RSA_KEY)
-                continue
+            # create a variable to hold the MPHeader plaintext
+            mp_header_pt = mp_header_pt_init_block
 
-            # calculate identification string offset
-            offset = self.__calculate_der_id_string_offset(
-                    mp_header_pt_init_block)
+            # decrypt the whole MPHeader DER
+            for rsa_block in [mp_header_ct[i:i+key_size] for i in
+                              range(key_size, len(mp_header_ct), key_size)]:
 
-            # check whether id string matches
-            if not mp_header_pt_init_block[offset:offset + 4] == \
-                    bytes(const.IS, 'utf-8'):
+                # append decrypted chunks
+                mp_header_pt += self.__decrypt_with_rsa(rsa_block, user_sk)
 
-                # key doesn't fit
-                self.logger.debug(logstr.WRONG_RSA_KEY)
-                continue
+        # decode MPHeader from DER
+        mp_header_decoded = der_codec.decode_mp_header(mp_header_pt)
+
+        # determine whether the header was signed
+        sign_oid = mp_header_decoded[1]
+        raw_pgp_key_id = bytes(mp_header_decoded[2])
+        pgp_key_id = raw_pgp_key_id.decode(der_codec.STR_ENCODING)
+        signature = bytes(mp_header_decoded[3])
+        hmac_key = bytes(mp_header_decoded[4])
+        aes_key = bytes(mp_header_decoded[5])
+        sign_content = hmac_key + aes_key
+
+        # there is a signature
+        if sign_oid != const.NO_SIGN_OID:
 
-            # found a matching key - message can be decrypted
+            self.logger.info(logstr.MESSAGE_IS_SIGNED)
+
+            # get signer public key
+            signer_cands = key_manager.get_pk_by_pgp_id(raw_pgp_key_id)
+
+            # there is a public key
+            if isinstance(signer_cands, (RSAPublicKey, Ed25519PublicKey)):
+                if self.__verify_signature(signature, signer_cands,
+                                           sign_content, sign_oid):
+                    signer_info = pgp_key_id
+                else:
+                    # TODO: more verbose
+                    raise exc.SignatureVerificationFailed("")
+
+            # nothing found for this PGP ID
+            elif signer_cands is None:
+                self.logger.warn(logstr.SIGN_CANNOT_VERIF)
+                exit_code = 3
+
+            # the PGP ID is zeros so signer used non-PGP key
+            # get_pk_byid_func returned a list of all user's
+            # non-PGP public keys (from an internal key chain
             else:
 
-                self.logger.info(logstr.MESSAGE_FOR_USER)
+                # just in case
+                assert(isinstance(signer_cands, tuple))
+
+                self.logger.info(logstr.NON_PGP_KEY_SIGN)
+
+                # brute over all user non-PGP keys in attempt to verify
+                # (keys of another signature scheme are skipped)
+                verif_ok = False
+                for cand_key in signer_cands:
+
+                    # again just in case
+                    assert(isinstance(cand_key,
+                                      (RSAPublicKey, Ed25519PublicKey)))
+
+                    verif_ok = self.__verify_signature(signature,
+                                                       cand_key,
+                                                       sign_content,
+                                                       sign_oid)
+
+                    if verif_ok:
+                        break
+
+                # update exit code state
+                if verif_ok:
+                    exit_code = 1
+                    signer_info = cand_key
+                else:
+                    exit_code = 3
+
+        # there is no signature in MPHeader
+        else:
+
+            self.logger.info(logstr.NOT_SIGNED_MESSAGE)
+            exit_code = 2
 
-                # init exit code (optimistic)
-                exit_code = 0
-                signer_info = None
+        return hmac_key, aes_key, exit_code, signer_info
 
-                # create a variable to hold the MPHeader plaintext
-                mp_header_pt = mp_header_pt_init_block
+    def close(self):
+        """ Release worker threads used for parallel trial decryption
 
-                # decrypt the whole MPHeader DER
-                for rsa_block in [mp_header_ct[i:i+key_size] for i in
-                                  range(key_size, len(mp_header_ct), key_size)]:
+        @developer: ddnomad
 
-                    # append decrypted chunks
-                    mp_header_pt += self.__decrypt_with_rsa(rsa_block, user_sk)
+        The pool is created lazily on the first parallel disassembly so
+        calling this method is only necessary for instances created with
+        trial_workers greater than 1. The instance stays usable afterwards
+        (a new pool is spawned on demand).
 
-                # decode MPHeader from DER
-                mp_header_pt_asn1 = asn1_decode(mp_header_pt)
+        :return: void
 
-                # determine whether the header was signed
-                sign_oid = str(mp_header_pt_asn1[0][1][0])
-                pgp_key_id = str(mp_header_pt_asn1[0][2])
-                signature = bytes(mp_header_pt_asn1[0][3])
-                hmac_key = bytes(mp_header_pt_asn1[0][4])
-                aes_key = bytes(mp_header_pt_asn1[0][5])
-                sign_content = hmac_key + aes_key
+        """
 
-                # there is a signature
-                if sign_oid != const.NO_SIGN_OID:
+        if self.__trial_pool is not None:
+            self.__trial_pool.shutdown(wait=True)
+            self.__trial_pool = None
 
-                    self.logger.info(logstr.MESSAGE_IS_SIGNED)
+    def __find_header_key(self, mp_header_ct, user_keys, trial_workers=None,
+                          try_key=None):
+        """ Find a user private key that decrypts a header block
 
-                    # get signer public key
-                    signer_cands = key_manager.get_pk_by_pgp_id(pgp_key_id)
+        @developer: ddnomad
 
-                    # there is a public key
-                    if isinstance(signer_cands, RSAPublicKey):
-                        if self.__verify_signature(signature, signer_cands,
-                                                   sign_content):
-                            signer_info = pgp_key_id
-                        else:
-                            # TODO: more verbose
-                            raise exc.SignatureVerificationFailed("")
+        Depending on trial_workers either walks the keys one by one or
+        spreads trial decryptions over a thread pool. OpenSSL releases the
+        GIL while doing RSA so the threads do run concurrently.
 
-                    # nothing found for this PGP ID
-                    elif signer_cands is None:
-                        self.logger.warn(logstr.SIGN_CANNOT_VERIF)
-                        exit_code = 3
+        :param mp_header_ct:        bytes encrypted MPHeader from a header
+                                    container
+        :param user_keys:           iterable of cryptography.hazmat.
+                                    primitives.asymmetric.rsa.RSAPrivateKey
+                                    instances
+        :param trial_workers=None:  integer number of threads to use (None
+                                    or 1 for the serial loop)
+        :param try_key=None:        trial decryption method (defaults to
+                                    __try_header_key)
+
+        :return: tuple (user_sk, init_block) where init_block is the
+                 decryption of the first RSA block of a header or None if
+                 none of the keys fits
+
+        """
 
-                    # the PGP ID is zeros so signer used non-PGP key
-                    # get_pk_byid_func returned a list of all user's
-                    # non-PGP public keys (from an internal key chain
-                    else:
+        if try_key is None:
+            try_key = self.__try_header_key
 
-                        # just in case
-                        assert(isinstance(signer_cands, tuple))
+        # serial brute-force
+        if not trial_workers or trial_workers < 2:
+            for user_sk in user_keys:
+                match = try_key(mp_header_ct, user_sk)
+                if match is not None:
+                    return match
+            return None
 
-                        self.logger.info(logstr.NON_PGP_KEY_SIGN)
+        # parallel brute-force (first matching key wins)
+        found = threading.Event()
+        futures = [self.__get_trial_pool().submit(
+                       try_key, mp_header_ct, user_sk, found)
+                   for user_sk in user_keys]
+
+        try:
+            for future in as_completed(futures):
+                match = future.result()
+                if match is not None:
+                    return match
+        finally:
+            # stop the workers that have not started yet
+            found.set()
+            for future in futures:
+                future.cancel()
+
+        return None
+
+    def __decode_message_packet(self, msg_packet):
+        """ Decode FLOD message packet framing
+
+        @developer: ddnomad
 
-                        # brute over all user non-PGP keys in attempt to verify
-                        for cand_key in signer_cands:
+        The content block is not decoded here: it is kept as a DER span of
+        the received packet so that HMAC is computed over the exact bytes
+        that were sent and the block is decoded only once HMAC is verified.
 
-                            # again just in case
-                            assert(isinstance(cand_key, RSAPublicKey))
+        All the values returned are memoryview slices of msg_packet, no
+        data is copied.
 
-                            verif_ok = self.__verify_signature(signature,
-                                                               cand_key,
-                                                               sign_content)
+        :param msg_packet: bytes-like DER-encoded MessagePacket
 
-                            if verif_ok:
-                                break
+        :return: tuple (protocolVersion, decoded MPHeaderContainer,
+                 decoded MPHMACContainer, DER-encoded MPContentContainer)
 
-                        # update exit code state
-                        if verif_ok:
-                            exit_code = 1
-                            signer_info = cand_key
-                        else:
-                            exit_code = 3
+        :raise mflod.crypto.exceptions.DERDecodingError
+
+        """
+
+        version, header_block, hmac_block, content_block = \
+            der_codec.split_message_packet(memoryview(msg_packet))
+
+        return (version,
+                der_codec.decode_mp_header_container(header_block),
+                der_codec.decode_mp_hmac_container(hmac_block),
+                content_block)
+
+    def __filter_header_keys(self, user_keys, header_len,
+                             version=const.PROTOCOL_VERSION_RSA_HEADER):
+        """ Skip keys that cannot possibly decrypt a header block
+
+        @developer: ddnomad
+
+        Encrypted MPHeader is a concatenation of RSA blocks each of which is
+        exactly as long as a modulus of a recipient key. Thus there is no
+        point to pay for an RSA operation with a key whose modulus byte
+        length does not divide the header ciphertext length. Since version 1
+        a header is a single RSA block followed by AES-GCM ciphertext of
+        MPHeader, so the remainder has to be as long as an encrypted MPHeader
+        can be (see __fits_wrapped_header) instead.
+
+        :param user_keys:   iterable of cryptography.hazmat.primitives.
+                            asymmetric.rsa.RSAPrivateKey instances
+        :param header_len:  integer length of encrypted MPHeader
+        :param version=0:   integer protocolVersion of a packet
+
+        :return: generator of keys that passed the filter (order is kept)
+
+        """
 
-                # there is no signature in MPHeader
+        # verdicts per modulus byte length
+        size_fits = {}
+
+        for user_sk in user_keys:
+            key_size = (user_sk.key_size + 7) // 8
+
+            if key_size not in size_fits:
+                if version == const.PROTOCOL_VERSION_WRAPPED_KEY:
+                    size_fits[key_size] = self.__fits_wrapped_header(
+                            key_size, header_len - key_size)
                 else:
+                    size_fits[key_size] = header_len % key_size == 0
+
+            if not size_fits[key_size]:
+                self.logger.debug(logstr.RSA_KEY_SIZE_MISMATCH)
+                continue
+
+            yield user_sk
+
+    def __fits_wrapped_header(self, key_size, aes_len):
+        """ Check a length of AES-GCM part of a version 1 header
+
+        @developer: ddnomad
+
+        All MPHeader fields but a signature are of a fixed length (8 bytes
+        PGPKeyID, 20 bytes HMAC key and 16 bytes AES key). A signature is
+        either 64 bytes long (Ed25519 or its random stand-in) or as long as
+        a modulus of an RSASSA-PSS signer of 1024 to 8192 bits or, in an
+        unsigned header, as long as rsa_max_len of a recipient key. So only
+        the last one depends on a size of a key being tried.
+
+        :param key_size:    integer byte length of a recipient key modulus
+        :param aes_len:     integer length of AES-GCM part of a header
+
+        :return: bool whether an encrypted MPHeader can be aes_len long
+
+        """
+
+        def gcm_len(sign_oid, sign_len):
+            return len(der_codec.encode_mp_header(
+                const.IS, sign_oid, bytes(8), bytes(sign_len), bytes(20),
+                bytes(16))) + const.AES_GCM_TAG_SIZE
+
+        # lengths of signed headers do not depend on a key (shared by all
+        # the instances)
+        if Crypto.__signed_header_lens is None:
+            Crypto.__signed_header_lens = frozenset(
+                    [gcm_len(const.ED25519_OID,
+                             const.ED25519_SIGNATURE_SIZE),
+                     gcm_len(const.NO_SIGN_OID,
+                             const.ED25519_SIGNATURE_SIZE)] +
+                    [gcm_len(const.RSASSA_PSS_OID, sign_len)
+                     for sign_len in range(128, 1024 + 1)])
+
+        return aes_len in Crypto.__signed_header_lens or \
+            aes_len == gcm_len(const.NO_SIGN_OID,
+                               self.__get_rsa_max_bytestring_size(
+                                   key_size * 8))
+
+    def __try_header_key(self, mp_header_ct, user_sk, found=None):
+        """ Attempt to decrypt the first RSA block of a header with a key
+
+        @developer: ddnomad
+
+        :param mp_header_ct:    bytes encrypted MPHeader
+        :param user_sk:         instance of cryptography.hazmat.primitives.
+                                asymmetric.rsa.RSAPrivateKey to try
+        :param found=None:      threading.Event that is set once another
+                                worker found a matching key (parallel mode)
+
+        :return: tuple (user_sk, init_block) on success, None otherwise
+
+        """
+
+        # another worker already got the key
+        if found is not None and found.is_set():
+            return None
+
+        # determine a size of a current user secret key
+        key_size = user_sk.key_size // 8
+
+        # get decrypted first RSA block of MPHeader
+        self.key_stats.count_trial()
+        try:
+            mp_header_pt_init_block = self.__decrypt_with_rsa(
+                    mp_header_ct[:key_size], user_sk)
+        except (InvalidKey, ValueError):
+
+            # probably key size doesn't match
+            self.logger.debug(logstr.INVALID_RSA_KEY)
+            return None
 
-                    self.logger.info(logstr.NOT_SIGNED_MESSAGE)
-                    exit_code = 2
+        if mp_header_pt_init_block is None:
+            self.logger.debug(logstr.INVALID_RSA_KEY)
+            return None
 
-                    # retrieve MPHMACContainer and MPContentContainer
-                    mp_hmac_container = message_packet_asn1[0][2]
-                    mp_content_container = message_packet_asn1[0][3]
+        # calculate identification string offset
+        offset = self.__calculate_der_id_string_offset(
+                mp_header_pt_init_block)
 
-                    # verify hmac
-                    hmac_ver_res = self.__verify_hmac(mp_hmac_container,
-                            hmac_key, asn1_encode(mp_content_container))
+        # check whether id string matches
+        if not mp_header_pt_init_block[offset:offset + 4] == \
+                bytes(const.IS, 'utf-8'):
 
-                    if not hmac_ver_res:
-                        # TODO: more verbose str
-                        raise exc.HMACVerificationFailed("")
+            # key doesn't fit
+            self.logger.debug(logstr.WRONG_RSA_KEY)
+            return None
 
-                    # all checks were successful - decrypt content
-                    timestamp, message = self.__disassemble_content_block(
-                            mp_content_container, aes_key)
+        if found is not None:
+            found.set()
+
+        return user_sk, mp_header_pt_init_block
+
+    def __try_x25519_header_key(self, mp_header_ct, user_sk, found=None):
+        """ Attempt to decrypt an X25519 mode header with a key
+
+        @developer: ddnomad
+
+        A trial costs a single X25519 key agreement and a hash: the masked
+        identification string that follows an ephemeral public key is
+        compared with the one derived from a shared secret. AES-GCM
+        decryption of MPHeader is done for a matching key only.
+
+        :param mp_header_ct:    bytes encrypted header (ephemeral X25519
+                                public key, masked identification string
+                                and AES-GCM ciphertext of MPHeader)
+        :param user_sk:         instance of cryptography.hazmat.primitives.
+                                asymmetric.x25519.X25519PrivateKey to try
+        :param found=None:      threading.Event that is set once another
+                                worker found a matching key (parallel mode)
+
+        :return: tuple (user_sk, DER-encoded MPHeader) on success, None
+                 otherwise
+
+        """
+
+        # another worker already got the key
+        if found is not None and found.is_set():
+            return None
+
+        self.key_stats.count_trial()
+        ephemeral_pk = mp_header_ct[:const.X25519_KEY_SIZE]
+        id_check_end = const.X25519_KEY_SIZE + len(const.IS)
+        try:
+            header_key, id_check = self.__derive_x25519_header_key(
+                    user_sk.exchange(
+                        X25519PublicKey.from_public_bytes(ephemeral_pk)),
+                    ephemeral_pk,
+                    user_sk.public_key().public_bytes(Encoding.Raw,
+                                                      PublicFormat.Raw))
+        except ValueError:
+
+            # invalid ephemeral key
+            self.logger.debug(logstr.WRONG_X25519_KEY)
+            return None
+
+        # check whether id string matches
+        if not hmac.compare_digest(
+                id_check, mp_header_ct[const.X25519_KEY_SIZE:id_check_end]):
+
+            # key doesn't fit
+            self.logger.debug(logstr.WRONG_X25519_KEY)
+            return None
+
+        try:
+            mp_header_pt = AESGCM(header_key).decrypt(
+                    bytes(const.AES_GCM_IV_SIZE), mp_header_ct[id_check_end:],
+                    mp_header_ct[:id_check_end])
+        except InvalidTag:
+            self.logger.warning(logstr.GCM_TAG_VERIFICATION_FAILED)
+            return None
+
+        if found is not None:
+            found.set()
+
+        return user_sk, mp_header_pt
+
+    def __derive_x25519_header_key(self, shared_key, ephemeral_pk,
+                                   recipient_pk):
+        """ Derive an AES key and an identification check of X25519 header
+
+        @developer: ddnomad
+
+        Keys are derived with ANSI X9.63 KDF (single SHA-256 block) from
+        X25519 shared secret and are bound to both the ephemeral and the
+        recipient public keys. The identification check is the string FLOD
+        XORed with derived bytes. As every header uses a fresh ephemeral
+        key, the AES key is never reused and a zero GCM nonce is safe.
+
+        :param shared_key:      bytes X25519 shared secret
+        :param ephemeral_pk:    bytes raw ephemeral X25519 public key
+        :param recipient_pk:    bytes raw recipient X25519 public key
+
+        :return: tuple (bytes 16 byte AES key, bytes identification check)
+
+        """
 
-                    self.logger.info(logstr.MSG_CONTENT_WAS_RECOVERED)
+        key_material = hashlib.sha256(
+                shared_key + b'\x00\x00\x00\x01' + const.X25519_KDF_INFO +
+                ephemeral_pk + recipient_pk).digest()
+        id_mask = key_material[16:16 + len(const.IS)]
 
-                    # return correct result
-                    if signer_info:
-                        return timestamp, message, exit_code, signer_info
-                    return timestamp, message, exit_code
+        return key_material[:16], bytes(
+                a ^ b for a, b in zip(bytes(const.IS, 'utf-8'), id_mask))
 
-        # TODO: create more verbose exception
-        self.logger.info(logstr.MESSAGE_NOT_FOR_USER)
-        raise exc.NoMatchingRSAKeyForMessage("")
+    def __get_trial_pool(self):
+        """ Lazily create a thread pool for parallel trial decryption
+
+        @developer: ddnomad
+
+        :return: concurrent.futures.ThreadPoolExecutor instance
+
+        """
+
+        if self.__trial_pool is None:
+            self.__trial_pool = ThreadPoolExecutor(
+                    max_workers=self.trial_workers)
+        return self.__trial_pool
 
     def __calculate_der_id_string_offset(self, der):
         """ Determine an offset to identification string in header fragment
@@ -438,6 +1271,188 @@ class Crypto(object):
             return len_of_len + 4
         return 4
 
+    def __assemble_header_block(self, recipient_pk, aes_key, hmac_key,
+                                sign=None, signed=None):
+        """ Create an ASN.1 DER-encoded structure of a header block
+
+        @developer: vsmysle
+
+        The corresponding ASN.1 structure from a documentation is
+        MPHeaderContainer that holds encrypted MPHeader. Depending on
+        protocol_version of the instance MPHeader is either RSA-encrypted
+        block by block (version 0) or AES-encrypted with a fresh key that is
+        RSA-encrypted in a single block as MPHeaderKey (version 1).
+
+        For an X25519 recipient key MPHeader is AES-GCM encrypted with a key
+        agreed with a fresh ephemeral X25519 key instead (the header mode is
+        then determined by encryptionAlgorithm regardless of a version).
+
+        :param recipient_pk:    instance of cryptography.hazmat.primitives.
+                                asymmetric.rsa.RSAPublicKey or X25519PublicKey
+                                of a recipient
+        :param aes_key:         bytes AES key used for a content block
+        :param hmac_key:        bytes HMAC key used for an HMAC block
+        :param sign=None:       list [RSAPrivateKey or Ed25519PrivateKey,
+                                string PGPKey_ID] (see
+                                assemble_message_packet)
+        :param signed=None:     tuple (sign_oid, PGPKey_ID, signature) of
+                                __sign_header_keys made in advance, takes
+                                place of sign
+
+        :return: bytes DER-encoding of MPHeaderContainer ASN.1 structure
+
+        """
+
+        # X25519 mode is selected by a type of a recipient key
+        x25519 = isinstance(recipient_pk, X25519PublicKey)
+
+        # calculate the maximum length of RSA encryption
+        if not x25519:
+            rsa_max_len = self.__get_rsa_max_bytestring_size(
+                    recipient_pk.key_size)
+
+        if sign and signed is None:
+            signed = self.__sign_header_keys(aes_key, hmac_key, sign)
+
+        if signed:
+            sign_oid, pgp_key_id, signature = signed
+
+        else:
+            # logger for existence of sign list
+            self.logger.info("sign list is not present")
+
+            # if there is no sign list - generate random signature as long
+            # as a signature of the scheme in use
+            if self.signature_algorithm == const.ED25519_OID:
+                signature = urandom(const.ED25519_SIGNATURE_SIZE)
+            else:
+                signature = urandom(const.X25519_NO_SIGN_SIZE if x25519 else
+                                    rsa_max_len)
+
+            # generating random PGPKeyID
+            pgp_key_id = urandom(8)
+
+            # setting signature oid to zeros
+            sign_oid = const.NO_SIGN_OID
+
+        # encoding MPHeader into ASN.1 DER-encoded structure: identification
+        # string, signature AlgorithmIdentifier, PGPKeyID, signature and keys
+        encoded_mp_header = der_codec.encode_mp_header(
+                const.IS, sign_oid, pgp_key_id, signature, hmac_key, aes_key)
+
+        # encrypting the header with AES-GCM under a key agreed with an
+        # ephemeral X25519 key which is prepended to the ciphertext together
+        # with a masked identification string
+        if x25519:
+            ephemeral_sk = X25519PrivateKey.generate()
+            ephemeral_pk = ephemeral_sk.public_key().public_bytes(
+                    Encoding.Raw, PublicFormat.Raw)
+            header_key, id_check = self.__derive_x25519_header_key(
+                    ephemeral_sk.exchange(recipient_pk), ephemeral_pk,
+                    recipient_pk.public_bytes(Encoding.Raw, PublicFormat.Raw))
+            enc_header = ephemeral_pk + id_check + AESGCM(header_key).encrypt(
+                    bytes(const.AES_GCM_IV_SIZE), encoded_mp_header,
+                    ephemeral_pk + id_check)
+
+            return der_codec.encode_mp_header_container(const.X25519_OID,
+                                                        enc_header)
+
+        # wrapping a header key with RSA and encrypting the header with
+        # AES-GCM so a single RSA operation is needed whatever the header
+        # length is (the RSA block is authenticated as additional data)
+        if self.protocol_version == const.PROTOCOL_VERSION_WRAPPED_KEY:
+            header_iv = urandom(const.AES_GCM_IV_SIZE)
+            header_key = urandom(16)
+            key_block = self.__encrypt_with_rsa(
+                    der_codec.encode_mp_header_key(const.IS, header_iv,
+                                                   header_key),
+                    recipient_pk)
+            enc_header = key_block + AESGCM(header_key).encrypt(
+                    header_iv, encoded_mp_header, key_block)
+
+        # encrypting parts of encoded header with RSA
+        # we encrypt several part due to restriction of the RSA max encryption
+        # length
+        else:
+            enc_header = bytes()
+            for rsa_block in [encoded_mp_header[i:i+rsa_max_len] for i in
+                              range(0, len(encoded_mp_header), rsa_max_len)]:
+                enc_header += self.__encrypt_with_rsa(rsa_block, recipient_pk)
+
+        # encoding MPHeaderContainer with id-rsaes-oaep OID
+        mp_header_container = der_codec.encode_mp_header_container(
+                const.ID_RSAES_OAEP, enc_header)
+
+        return mp_header_container
+
+    def __sign_header_keys(self, aes_key, hmac_key, sign):
+        """ Sign AES and HMAC keys for a header block
+
+        @developer: vsmysle
+
+        :param aes_key:         bytes AES key used for a content block
+        :param hmac_key:        bytes HMAC key used for an HMAC block
+        :param sign:            list [RSAPrivateKey or Ed25519PrivateKey,
+                                string PGPKey_ID] (see
+                                assemble_message_packet)
+
+        :return: tuple (string signature OID, PGPKey_ID, bytes signature)
+
+        """
+
+        # logger for existence of sign list
+        self.logger.info("sign list is present")
+
+        # sign concatenated HMAC and AES keys with sender secret key
+        # (the same order a recipient verifies)
+        signature = self.__sign_content(hmac_key + aes_key, sign[0])
+
+        # setting oid for the ed25519 or rsassa-pss
+        if isinstance(sign[0], Ed25519PrivateKey):
+            sign_oid = const.ED25519_OID
+        else:
+            sign_oid = const.RSASSA_PSS_OID
+
+        return sign_oid, sign[1], signature
+
+    def __assemble_aead_content_block(self, content, key, iv):
+        """ Create an ASN.1 DER-encoded structure of an AES-GCM content block
+
+        @developer: ddnomad
+
+        Counterpart of __assemble_content_block for AES-128-GCM. The DER
+        prefix of MPContentContainer (IV, algorithm and ciphertext length)
+        is authenticated as additional data and the resulting tag replaces
+        an HMAC digest, so content is processed in a single pass.
+
+        :param content: string content to encapsulate
+        :param key:     bytes AES key to use for encryption
+        :param iv:      bytes 12 byte GCM mode initialization vector
+
+        :return: tuple (string DER-encoding of MPContentContainer ASN.1
+                 structure, bytes authentication tag)
+
+        """
+
+        # logger entry
+        self.logger.debug(logstr.ASSEMBLE_CONTENT_BLOCK_CALL)
+
+        # DER-encode MPContent
+        mp_content_pt_der = der_codec.encode_mp_content(
+                datetime.utcnow().strftime(const.TIMESTAMP_FORMAT), content)
+
+        # GCM does not pad so the container prefix is known in advance
+        content_block_prefix = der_codec.encode_mp_content_container_prefix(
+                iv, const.AES_128_GCM_OID, len(mp_content_pt_der))
+
+        # encrypt MPContent DER authenticating the container prefix
+        aes = Cipher(algorithms.AES(key), modes.GCM(iv),
+                     backend=default_backend()).encryptor()
+        aes.authenticate_additional_data(content_block_prefix)
+        mp_content_ct = aes.update(mp_content_pt_der) + aes.finalize()
+
+        return content_block_prefix + mp_content_ct, aes.tag
+
     def __assemble_content_block(self, content, key, iv):
         """ Create an ASN.1 DER-encoded structure of a content block
 
@@ -457,37 +1472,31 @@ class Crypto(object):
         # logger entry
         self.logger.debug(logstr.ASSEMBLE_CONTENT_BLOCK_CALL)
 
-        # create an ASN.1 structure of MPContent and DER-encode it
-        mp_content_pt = asn1_dec.MPContent()
-        mp_content_pt['timestamp'] = datetime.utcnow(). \
-            strftime(const.TIMESTAMP_FORMAT)
-        mp_content_pt['content'] = content
-        mp_content_pt_der = asn1_encode(mp_content_pt)
+        # DER-encode MPContent
+        mp_content_pt_der = der_codec.encode_mp_content(
+                datetime.utcnow().strftime(const.TIMESTAMP_FORMAT), content)
 
         # encrypt MPContent DER
         mp_content_ct = self.__encrypt_with_aes(mp_content_pt_der, key, iv)
 
-        # wrap MPContent into MPContentContainer
-        mp_content_container = asn1_dec.MPContentContainer()
-        mp_content_container['initializationVector'] = iv
-        mp_content_container['encryptionAlgorithm'] = \
-            self.__get_asn1_algorithm_identifier(const.AES_128_CBC_OID)
-        mp_content_container['encryptedContent'] = mp_content_ct
-
-        # encode MPContentContainer and return it
-        return mp_content_container
+        # wrap MPContent into MPContentContainer, encode and return it
+        return der_codec.encode_mp_content_container(
+                iv, const.AES_128_CBC_OID, mp_content_ct)
 
-    def __disassemble_content_block(self, content, key):
+    def __disassemble_content_block(self, content, key, tag=None):
         """ Decrypt and decode content from a content block
 
         @developer: ddnomad
 
-        :param content: instance of MPContentContainer class
-        :param key:     string AES key to be used for decryption
+        :param content:     bytes-like DER-encoded MPContentContainer
+        :param key:         string AES key to be used for decryption
+        :param tag=None:    bytes GCM authentication tag for AES-128-GCM
+                            content (None for HMAC-verified AES-128-CBC)
 
         :return: list of the following values:
                     [0] datetime.datetime timestamp object
-                    [1] string decrypted message
+                    [1] string decrypted message (memoryview if the
+                        instance was created with zero_copy)
 
         """
 
@@ -495,21 +1504,30 @@ class Crypto(object):
         self.logger.debug(logstr.DISASSEMBLE_CONTENT_BLOCK_CALL)
 
         # decode MPContentContainer from DER
-        # TODO: try-except in a case when decoding failed
-        mp_content_container_asn1 = content
-        # recover values that are necessary for decryption
-        # TODO: verify encryptionAlgorithm OID
-        iv = bytes(mp_content_container_asn1[0])
-        enc_content = bytes(mp_content_container_asn1[2])
+        mp_content_container = der_codec.decode_mp_content_container(content)
 
-        # decrypt DER-encoded MPContent
-        mp_content_pt_der = self.__decrypt_with_aes(enc_content, key, iv)
+        # recover values that are necessary for decryption
+        iv = bytes(mp_content_container[0])
+        enc_content = mp_content_container[2]
+
+        # decrypt DER-encoded MPContent (GCM authenticates the container
+        # prefix that precedes the ciphertext)
+        if self.__is_aead_content(
+                mp_content_container[1],
+                const.AES_128_GCM_OID if tag is not None else None):
+            aad = bytes(content[:len(content) - len(enc_content)])
+            mp_content_pt_der = self.__decrypt_with_aes_gcm(
+                    enc_content, key, iv, aad, tag)
+        else:
+            mp_content_pt_der = self.__decrypt_with_aes(enc_content, key, iv)
 
         # recover timestamp and message from DER-encoded MPContent
-        mp_content_pt_asn1 = asn1_decode(mp_content_pt_der)
-        timestamp = datetime.strptime(str(mp_content_pt_asn1[0][0]),
+        mp_content_pt = der_codec.decode_mp_content(mp_content_pt_der)
+        timestamp = datetime.strptime(mp_content_pt[0],
                                       const.TIMESTAMP_FORMAT)
-        message = str(mp_content_pt_asn1[0][1])
+        message = mp_content_pt[1]
+        if not self.zero_copy:
+            message = str(message, der_codec.STR_ENCODING)
 
         # return the resulting data
         return timestamp, message
@@ -523,8 +1541,9 @@ class Crypto(object):
                         encapsulate into HMAC FLOD block
         :param key:     bytes key to use for HMAC generation
 
-        :return: DER-encoded ASN.1 structure that encapsulates HMAC
-                 block
+        :return: tuple of MPHMACContainer components (digestAlgorithm OID,
+                 digest) which can be DER-encoded with mflod.crypto.
+                 der_codec.encode_mp_hmac_container
 
         """
         # TODO: add exceptions
@@ -534,24 +1553,8 @@ class Crypto(object):
         # calculating hmac digest of content
         digest = self.__generate_hmac(content, key)
 
-        # oid for SHA1 hash function
-        oid = const.SHA1_OID
-
-        # creating instance of AlgorithmIdentifier class
-        ai = asn1_dec.AlgorithmIdentifier()
-
-        # setting corresponding parameters
-        ai['algorithm'] = oid
-        ai['parameters'] = univ.Null()
-
-        # creating instance of MPHMACContainer class
-        hmac_block = asn1_dec.MPHMACContainer()
-
-        # setting corresponding parameters
-        hmac_block['digestAlgorithm'] = ai
-        hmac_block['digest'] = digest
-
-        return hmac_block
+        # MPHMACContainer components: OID for SHA1 hash function and digest
+        return const.SHA1_OID, digest
 
     def __verify_hmac(self, hmac_blk, key, content_blk):
         """ Verify content HMAC
@@ -559,7 +1562,7 @@ class Crypto(object):
 
         @developer: vsmysle
 
-        :param hmac_blk:        instance of MPHMACContainer class
+        :param hmac_blk:        tuple of decoded MPHMACContainer components
         :param key:             bytes HMAC secret key
         :param content_blk:     bytes DER-encoded ASN.1 structure of content
                                 block
@@ -639,16 +1642,251 @@ class Crypto(object):
         # return the resulting ciphertext
         return content_ct
 
+    def __encrypt_stream_with_aes(self, prefix, source, length, key, iv,
+                                  chunk_size):
+        """ Encrypt a stream with AES-128-CBC (with PCKS#7 padding) in chunks
+
+        @developer: vsmysle
+
+        Produces the same ciphertext as __encrypt_with_aes for prefix
+        followed by length bytes read from a source.
+
+        :param prefix:      bytes to encrypt before a source content (e.g.
+                            DER prefix of MPContent)
+        :param source:      readable binary file-like object
+        :param length:      integer amount of bytes to read from a source
+        :param key:         bytes key to use for encryption
+        :param iv:          bytes CBC mode initialization vector
+        :param chunk_size:  integer size of a single read
+
+        :return: generator of bytes ciphertext chunks
+
+        :raise ValueError if a source ends prematurely
+
+        """
+
+        padder = padding.PKCS7(const.AES_BLOCK_SIZE).padder()
+        aes = Cipher(algorithms.AES(key), modes.CBC(iv),
+                     backend=default_backend()).encryptor()
+
+        yield from self.__encrypt_stream(prefix, source, length, aes,
+                                         chunk_size, padder)
+
+    def __encrypt_stream(self, prefix, source, length, aes, chunk_size,
+                         padder=None):
+        """ Encrypt a stream in chunks with a ready cipher context
+
+        @developer: vsmysle
+
+        Used as is for AES-128-GCM (the caller reads a tag off the context
+        once the generator is exhausted) and by __encrypt_stream_with_aes
+        with a PKCS#7 padder for AES-128-CBC.
+
+        :param prefix:      bytes to encrypt before a source content
+        :param source:      readable binary file-like object
+        :param length:      integer amount of bytes to read from a source
+        :param aes:         cryptography encryption context
+        :param chunk_size:  integer size of a single read
+        :param padder=None: cryptography padding context (None to not pad)
+
+        :return: generator of bytes ciphertext chunks
+
+        :raise ValueError if a source ends prematurely
+
+        """
+
+        # log entry
+        self.logger.debug(logstr.AES_ENC_CALL)
+
+        def pad(chunk):
+            return padder.update(chunk) if padder is not None else chunk
+
+        yield aes.update(pad(prefix))
+
+        remaining = length
+        while remaining:
+            chunk = source.read(min(chunk_size, remaining))
+            if not chunk:
+                raise ValueError("source ended %d bytes prematurely"
+                                 % remaining)
+            remaining -= len(chunk)
+            yield aes.update(pad(chunk))
+
+        if padder is not None:
+            yield aes.update(padder.finalize()) + aes.finalize()
+        else:
+            yield aes.finalize()
+
+    def __is_aead_content(self, content_oid, digest_oid):
+        """ Check whether a content block is AES-GCM encrypted
+
+        The HMAC block of AES-GCM content carries a tag under the same OID,
+        any other combination is rejected so that a packet cannot be made
+        to skip HMAC verification.
+
+        :param content_oid: string OID of a content encryption algorithm
+        :param digest_oid:  string OID of an HMAC block digest algorithm
+
+        :return: bool
+
+        :raise mflod.crypto.exceptions.HMACVerificationFailed
+
+        """
+
+        aead = content_oid == const.AES_128_GCM_OID
+        if aead != (digest_oid == const.AES_128_GCM_OID):
+            self.logger.warning(logstr.CONTENT_ALGORITHM_MISMATCH)
+            raise exc.HMACVerificationFailed("")
+        return aead
+
+    def __get_packet_reader(self, msg_packet):
+        """ Get random access to a packet for streaming disassembly
+
+        :param msg_packet: bytes-like object or seekable readable binary
+                           file-like object
+
+        :return: tuple (callable (offset, amount) -> bytes-like, integer
+                 packet length)
+
+        """
+
+        # buffers (bytes, mmap, ...) are sliced without copying
+        try:
+            view = memoryview(msg_packet)
+        except TypeError:
+            view = None
+
+        if view is not None:
+            def read_at(offset, amount):
+                return view[offset:offset + amount]
+            return read_at, len(view)
+
+        # file-like objects are read relative to their current position
+        base = msg_packet.tell()
+        size = msg_packet.seek(0, io.SEEK_END) - base
+
+        def read_at(offset, amount):
+            msg_packet.seek(base + offset)
+            chunk = msg_packet.read(amount)
+            if len(chunk) != amount:
+                raise exc.DERDecodingError("truncated message packet")
+            return chunk
+
+        return read_at, size
+
+    def __read_span(self, read_at, span, chunk_size):
+        """ Read a packet span in chunks
+
+        :param read_at:     callable returned by __get_packet_reader
+        :param span:        tuple (start, end) offsets
+        :param chunk_size:  integer size of a single read
+
+        :return: generator of bytes-like chunks
+
+        """
+
+        start, end = span
+        for offset in range(start, end, chunk_size):
+            yield read_at(offset, min(chunk_size, end - offset))
+
+    def __is_seekable(self, stream):
+        """ Check whether a file-like object supports seek() and tell()
+
+        :param stream: file-like object
+
+        :return: bool
+
+        """
+
+        try:
+            return stream.seekable()
+        except AttributeError:
+            return False
+
+    def __decrypt_stream_with_aes(self, ct_chunks, key, iv, head_len=0,
+                                  tag=None, aad=None):
+        """ Decrypt AES-128-CBC ciphertext (PCKS#7 padded) chunk by chunk
+
+        @developer: ddnomad
+
+        Counterpart of __encrypt_stream_with_aes. Padding is stripped from
+        the last chunk only so the last ciphertext block is held back until
+        the input is exhausted.
+
+        With a tag passed the ciphertext is AES-128-GCM one instead. Note
+        that the tag is verified after the last chunk only, so plaintext
+        chunks must not be used before the generator is exhausted.
+
+        :param ct_chunks:   iterable of bytes-like ciphertext chunks
+        :param key:         bytes AES secret key
+        :param iv:          bytes CBC (or GCM) mode initialization vector
+        :param head_len=0:  integer minimal length of the first plaintext
+                            chunk (unless the whole plaintext is shorter)
+        :param tag=None:    bytes GCM authentication tag
+        :param aad=None:    bytes GCM additional authenticated data
+
+        :return: generator of bytes plaintext chunks (at least one)
+
+        :raise ValueError on invalid padding,
+               mflod.crypto.exceptions.HMACVerificationFailed on invalid tag
+
+        """
+
+        # log entry
+        self.logger.debug(logstr.AES_DEC_CALL)
+
+        if tag is None:
+            unpadder = padding.PKCS7(const.AES_BLOCK_SIZE).unpadder()
+            aes = Cipher(algorithms.AES(key), modes.CBC(iv),
+                         backend=default_backend()).decryptor()
+        else:
+            unpadder = None
+            aes = Cipher(algorithms.AES(key), modes.GCM(iv, tag),
+                         backend=default_backend()).decryptor()
+            if aad:
+                aes.authenticate_additional_data(aad)
+
+        head = bytearray()
+        for ct_chunk in ct_chunks:
+            pt_chunk = aes.update(ct_chunk)
+            if unpadder is not None:
+                pt_chunk = unpadder.update(pt_chunk)
+
+            # collect the first chunk until it is long enough
+            if head_len:
+                head += pt_chunk
+                if len(head) < head_len:
+                    continue
+                pt_chunk, head_len = bytes(head), 0
+
+            if pt_chunk:
+                yield pt_chunk
+
+        try:
+            pt_chunk = aes.finalize()
+        except InvalidTag:
+            self.logger.warning(logstr.GCM_TAG_VERIFICATION_FAILED)
+            raise exc.HMACVerificationFailed("")
+        if unpadder is not None:
+            pt_chunk = unpadder.update(pt_chunk) + unpadder.finalize()
+        if head_len:
+            pt_chunk = bytes(head) + pt_chunk
+        yield pt_chunk
+
     def __decrypt_with_aes(self, content, key, iv):
         """ Decrypt AES-128-CBC encrypted content (PCKS#7 padded)
 
         @developer: ddnomad
 
-        :param content: bytes ciphertext of MPContent ASN.1 structure
+        Decryption is done into a single preallocated buffer and padding is
+        stripped by slicing it so no extra copies of content are made.
+
+        :param content: bytes-like ciphertext of MPContent ASN.1 structure
         :param key:     bytes AES secret key
         :param iv:      bytes CBC mode initialization vector
 
-        :return: string decrypted DER-encoded MPContent ASN.1 structure
+        :return: memoryview of decrypted DER-encoded MPContent ASN.1
+                 structure
 
         """
 
@@ -660,16 +1898,60 @@ class Crypto(object):
         aes = Cipher(algorithms.AES(key), modes.CBC(iv),
                      backend=backend).decryptor()
 
-        # decrypt content
-        dec_content = aes.update(content) + aes.finalize()
+        # decrypt content (the buffer has to be one block minus one byte
+        # longer than the input)
+        block_len = const.AES_BLOCK_SIZE // 8
+        dec_buf = bytearray(len(content) + block_len - 1)
+        dec_len = aes.update_into(content, dec_buf)
+        dec_len += len(aes.finalize())
+        dec_content = memoryview(dec_buf)[:dec_len]
 
-        # unpad content
-        unpadder = padding.PKCS7(const.AES_BLOCK_SIZE).unpadder()
-        dec_content_unpadded = unpadder.update(dec_content) + \
-            unpadder.finalize()
+        # unpad content (PKCS#7)
+        pad_len = dec_content[-1] if dec_len else 0
+        if not 0 < pad_len <= min(block_len, dec_len) or \
+                dec_content[-pad_len:] != bytes([pad_len]) * pad_len:
+            raise ValueError("Invalid padding bytes.")
 
         # return the resulting plaintext content
-        return dec_content_unpadded
+        return dec_content[:-pad_len]
+
+    def __decrypt_with_aes_gcm(self, content, key, iv, aad, tag):
+        """ Decrypt and authenticate AES-128-GCM encrypted content
+
+        @developer: ddnomad
+
+        :param content: bytes-like ciphertext of MPContent ASN.1 structure
+        :param key:     bytes AES secret key
+        :param iv:      bytes GCM mode initialization vector
+        :param aad:     bytes additional authenticated data
+        :param tag:     bytes authentication tag
+
+        :return: memoryview of decrypted DER-encoded MPContent ASN.1
+                 structure
+
+        :raise mflod.crypto.exceptions.HMACVerificationFailed
+
+        """
+
+        # log entry
+        self.logger.debug(logstr.AES_DEC_CALL)
+
+        aes = Cipher(algorithms.AES(key), modes.GCM(iv, tag),
+                     backend=default_backend()).decryptor()
+        aes.authenticate_additional_data(aad)
+
+        # decrypt into a preallocated buffer (see __decrypt_with_aes)
+        block_len = const.AES_BLOCK_SIZE // 8
+        dec_buf = bytearray(len(content) + block_len - 1)
+        dec_len = aes.update_into(content, dec_buf)
+
+        try:
+            aes.finalize()
+        except InvalidTag:
+            self.logger.warning(logstr.GCM_TAG_VERIFICATION_FAILED)
+            raise exc.HMACVerificationFailed("")
+
+        return memoryview(dec_buf)[:dec_len]
 
     def __encrypt_with_rsa(self, content, recipient_pk):
         """ Encrypt content with RSAES-OAEP scheme
@@ -696,13 +1978,7 @@ class Crypto(object):
         # TODO: add exceptions
         self.logger.debug("rsa encryption")
 
-        ciphertext = recipient_pk.encrypt(
-            content, asym_padding.OAEP(
-                mgf=asym_padding.MGF1(algorithm=SHA1()),
-                algorithm=SHA1(),
-                label=None
-            )
-        )
+        ciphertext = recipient_pk.encrypt(content, self.__oaep_padding)
         self.logger.info("encrypted")
         return ciphertext
 
@@ -724,13 +2000,7 @@ class Crypto(object):
 
         self.logger.debug("rsa decryption")
         try:
-            plaintext = user_sk.decrypt(
-                content, asym_padding.OAEP(
-                    mgf=asym_padding.MGF1(algorithm=SHA1()),
-                    algorithm=SHA1(),
-                    label=None
-                )
-            )
+            plaintext = user_sk.decrypt(content, self.__oaep_padding)
         except InvalidKey:
             self.logger.warning("Invalid key!")
             return
@@ -738,12 +2008,13 @@ class Crypto(object):
 
     def __sign_content(self, content, user_sk):
         """ Produce a signature of an input content using RSASSA-PSS scheme
+            (or Ed25519 for Ed25519 keys)
 
         @developer: vsmysle
 
         :param content: bytes content to sign
         :param user_sk: instance of cryptography.hazmat.primitives.rsa.
-                        RSAPrivateKey
+                        RSAPrivateKey or ed25519.Ed25519PrivateKey
 
         :return: bytes of signature of the input content
 
@@ -752,6 +2023,12 @@ class Crypto(object):
         # TODO: add exceptions
 
         self.logger.debug("generating a signature of an input content")
+
+        # Ed25519 signs a message as is (no prehashing)
+        if isinstance(user_sk, Ed25519PrivateKey):
+            signature = user_sk.sign(content)
+            self.logger.info("signature generation finished")
+            return signature
         # creating signer that will sign our content
         try:
             signer = user_sk.signer(
@@ -770,20 +2047,39 @@ class Crypto(object):
         self.logger.info("signature generation finished")
         return signature
 
-    def __verify_signature(self, signature, signer_pk, content):
-        """ Verify RSASSA-PSS signature
+    def __verify_signature(self, signature, signer_pk, content,
+                           sign_oid=const.RSASSA_PSS_OID):
+        """ Verify RSASSA-PSS or Ed25519 signature
 
         @developer: vsmysle
 
         :param signature: signature bytes to verify
         :param signer_pk: instance of cryptography.hazmat.primitives.
-                          rsa.RSAPublicKey that is a public key of a signer
+                          rsa.RSAPublicKey or ed25519.Ed25519PublicKey that
+                          is a public key of a signer
         :param content:   content to verify a signature of
+        :param sign_oid=RSASSA_PSS_OID: string OID of a signature scheme
 
-        :return: bool verification result
+        :return: bool verification result (False if a key does not belong
+                 to a signature scheme)
 
         """
         self.logger.debug("starting signature verification routine")
+
+        if sign_oid == const.ED25519_OID:
+            if not isinstance(signer_pk, Ed25519PublicKey):
+                return False
+            try:
+                signer_pk.verify(signature, content)
+            except InvalidSignature:
+                self.logger.warning("signature verification failed")
+                return False
+            self.logger.info("signature OK")
+            return True
+
+        if not isinstance(signer_pk, RSAPublicKey):
+            return False
+
         try:
             signer_pk.verify(
                 signature,
@@ -800,33 +2096,6 @@ class Crypto(object):
         self.logger.info("signature OK")
         return True
 
-    def __get_asn1_algorithm_identifier(self, oid_str):
-        """ Generate ASN.1 structure for algorithm identifier
-
-        @developer: vsmysle
-
-        :param oid_str: string OID to encapsulate
-
-        :return: pyasn1.type.univ.Sequence object
-
-        """
-
-        # TODO: add exceptions
-
-        # log entry
-        self.logger.debug("creating AlgorithmIdentifier ASN.1 "
-                          "structure with OID=%s" % oid_str)
-
-        # create the instance of AlgorithmIdentifier
-        ai = asn1_dec.AlgorithmIdentifier()
-
-        # set corresponding parameters
-        ai['algorithm'] = oid_str
-        ai['parameters'] = univ.Null()
-
-        # return the result
-        return ai
-
     def __get_random_bytes(self, spec_lst):
         """ Generate random bytes
 
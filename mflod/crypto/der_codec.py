@@ -0,0 +1,770 @@
+""" Fast-path DER codec for FLOD message packet structures
+
+The structures of a message packet are fixed (see asn1_structures.py which
+holds the reference pyasn1 definitions) so there is no need for a generic
+ASN.1 machinery on a hot path. Functions of this module produce DER that is
+byte-identical to pyasn1 encoding of the same structures and decode it back
+to plain Python values.
+
+Encoders accept already DER-encoded nested blocks where it is convenient
+(e.g. MessagePacket is assembled from encoded header, HMAC and content
+blocks) so the caller never has to encode a block twice.
+
+Decoders return tuples with the same component order as in ASN.1
+definitions. OCTET STRING values are returned as slices of the input buffer
+(bytes for bytes input, memoryview for memoryview input), OBJECT IDENTIFIER
+values as dotted strings, AlgorithmIdentifier as its OID only (parameters
+are always NULL).
+
+Developers:
+    - ddnomad (Artem Fliunt)
+
+"""
+from mflod.crypto.constants import Constants as const
+from mflod.crypto.exceptions import DERDecodingError
+
+
+# universal tags used by FLOD structures
+TAG_INTEGER = 0x02
+TAG_OCTET_STRING = 0x04
+TAG_NULL = 0x05
+TAG_OID = 0x06
+TAG_UTC_TIME = 0x17
+TAG_SEQUENCE = 0x30
+
+# OCTET STRING encoding pyasn1 uses for str values
+STR_ENCODING = 'iso-8859-1'
+
+# upper bound of identifier and length octets (8 length octets at most)
+MAX_TLV_HEADER_LEN = 10
+
+# upper bound of an MPContent prefix (see decode_mp_content_prefix)
+MAX_MP_CONTENT_PREFIX_LEN = 64
+
+# cache of encoded AlgorithmIdentifier structures (OID string -> DER)
+_algorithm_identifiers = {}
+
+# decoded OIDs the protocol uses (DER content -> OID string), filled once
+# encode_oid is defined. OIDs of received packets are never added: they are
+# chosen by a peer before anything is authenticated
+_oids = {}
+
+
+# ---------------------------------------------------------------------------
+# encoding
+# ---------------------------------------------------------------------------
+
+def encode_length(length):
+    """ Encode DER length octets
+
+    :param length: non-negative integer length of a content
+
+    :return: bytes length octets
+
+    """
+
+    if length < 0x80:
+        return bytes((length,))
+    length_bytes = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes((0x80 | len(length_bytes),)) + length_bytes
+
+
+def encode_tlv_header(tag, length):
+    """ Encode identifier and length octets of a TLV triplet
+
+    Used when content octets are streamed separately.
+
+    :param tag:     integer identifier octet
+    :param length:  integer length of content octets
+
+    :return: bytes DER encoding of a header
+
+    """
+
+    return bytes((tag,)) + encode_length(length)
+
+
+def encode_tlv(tag, content):
+    """ Encode a single DER TLV triplet
+
+    :param tag:     integer identifier octet
+    :param content: bytes-like content octets
+
+    :return: bytes DER encoding
+
+    """
+
+    return encode_tlv_header(tag, len(content)) + content
+
+
+def encode_octet_string(value):
+    """ Encode OCTET STRING (str values are encoded as pyasn1 does it)
+
+    :param value: bytes or str value
+
+    :return: bytes DER encoding
+
+    """
+
+    if isinstance(value, str):
+        value = value.encode(STR_ENCODING)
+    return encode_tlv(TAG_OCTET_STRING, bytes(value))
+
+
+def encode_integer(value):
+    """ Encode INTEGER (two's complement, minimal amount of octets)
+
+    :param value: integer to encode
+
+    :return: bytes DER encoding
+
+    """
+
+    length = value.bit_length() // 8 + 1
+    return encode_tlv(TAG_INTEGER, value.to_bytes(length, 'big', signed=True))
+
+
+def encode_oid(oid_str):
+    """ Encode OBJECT IDENTIFIER
+
+    :param oid_str: string dotted OID representation
+
+    :return: bytes DER encoding
+
+    """
+
+    arcs = [int(arc) for arc in oid_str.split('.')]
+    if len(arcs) < 2:
+        raise ValueError("OID must have at least two arcs: %s" % oid_str)
+
+    content = bytearray()
+    for arc in [arcs[0] * 40 + arcs[1]] + arcs[2:]:
+
+        # base-128 with a continuation bit in all but the last octet
+        chunk = [arc & 0x7F]
+        arc >>= 7
+        while arc:
+            chunk.append(0x80 | (arc & 0x7F))
+            arc >>= 7
+        content.extend(reversed(chunk))
+
+    return encode_tlv(TAG_OID, bytes(content))
+
+
+_oids.update((encode_oid(oid_str)[2:], oid_str) for oid_str in (
+    const.AES_128_CBC_OID, const.AES_128_GCM_OID, const.SHA1_OID,
+    const.RSASSA_PSS_OID, const.ID_RSAES_OAEP, const.NO_SIGN_OID,
+    const.X25519_OID, const.ED25519_OID))
+
+
+def encode_algorithm_identifier(oid_str):
+    """ Encode AlgorithmIdentifier with NULL parameters
+
+    :param oid_str: string dotted OID representation
+
+    :return: bytes DER encoding
+
+    """
+
+    der = _algorithm_identifiers.get(oid_str)
+    if der is None:
+        der = encode_tlv(TAG_SEQUENCE,
+                         encode_oid(oid_str) + bytes((TAG_NULL, 0)))
+        _algorithm_identifiers[oid_str] = der
+    return der
+
+
+def encode_mp_content(timestamp, content):
+    """ Encode MPContent structure
+
+    :param timestamp:   string UTCTime value (YYMMDDhhmmssZ)
+    :param content:     bytes or str message content
+
+    :return: bytes DER encoding
+
+    """
+
+    return encode_tlv(TAG_SEQUENCE,
+                      encode_tlv(TAG_UTC_TIME, timestamp.encode('ascii')) +
+                      encode_octet_string(content))
+
+
+def encode_mp_content_prefix(timestamp, content_len):
+    """ Encode MPContent up to the content octets
+
+    The result followed by content_len octets of content is exactly an
+    encode_mp_content output.
+
+    :param timestamp:   string UTCTime value (YYMMDDhhmmssZ)
+    :param content_len: integer length of bytes content
+
+    :return: bytes DER prefix
+
+    """
+
+    timestamp_der = encode_tlv(TAG_UTC_TIME, timestamp.encode('ascii'))
+    content_header = encode_tlv_header(TAG_OCTET_STRING, content_len)
+    return encode_tlv_header(TAG_SEQUENCE, len(timestamp_der) +
+                             len(content_header) + content_len) + \
+        timestamp_der + content_header
+
+
+def encode_mp_content_container_prefix(iv, algorithm_oid, enc_content_len):
+    """ Encode MPContentContainer up to the encrypted content octets
+
+    The result followed by enc_content_len octets of ciphertext is exactly
+    an encode_mp_content_container output.
+
+    :param iv:              bytes initialization vector
+    :param algorithm_oid:   string OID of content encryption algorithm
+    :param enc_content_len: integer length of encrypted MPContent
+
+    :return: bytes DER prefix
+
+    """
+
+    head = encode_octet_string(iv) + \
+        encode_algorithm_identifier(algorithm_oid) + \
+        encode_tlv_header(TAG_OCTET_STRING, enc_content_len)
+    return encode_tlv_header(TAG_SEQUENCE,
+                             len(head) + enc_content_len) + head
+
+
+def encode_mp_content_container(iv, algorithm_oid, enc_content):
+    """ Encode MPContentContainer structure
+
+    :param iv:              bytes initialization vector
+    :param algorithm_oid:   string OID of content encryption algorithm
+    :param enc_content:     bytes encrypted MPContent
+
+    :return: bytes DER encoding
+
+    """
+
+    return encode_tlv(TAG_SEQUENCE,
+                      encode_octet_string(iv) +
+                      encode_algorithm_identifier(algorithm_oid) +
+                      encode_octet_string(enc_content))
+
+
+def encode_mp_hmac_container(algorithm_oid, digest):
+    """ Encode MPHMACContainer structure
+
+    :param algorithm_oid:   string OID of HMAC digest algorithm
+    :param digest:          bytes HMAC digest
+
+    :return: bytes DER encoding
+
+    """
+
+    return encode_tlv(TAG_SEQUENCE,
+                      encode_algorithm_identifier(algorithm_oid) +
+                      encode_octet_string(digest))
+
+
+def encode_mp_header(id_string, sign_algorithm_oid, pgp_key_id, signature,
+                     hmac_key, aes_key):
+    """ Encode MPHeader structure
+
+    :param id_string:           bytes or str identification string
+    :param sign_algorithm_oid:  string OID of a signature algorithm
+    :param pgp_key_id:          bytes or str PGPKeyID
+    :param signature:           bytes signature
+    :param hmac_key:            bytes HMAC key
+    :param aes_key:             bytes AES key
+
+    :return: bytes DER encoding
+
+    """
+
+    return encode_tlv(TAG_SEQUENCE,
+                      encode_octet_string(id_string) +
+                      encode_algorithm_identifier(sign_algorithm_oid) +
+                      encode_octet_string(pgp_key_id) +
+                      encode_octet_string(signature) +
+                      encode_octet_string(hmac_key) +
+                      encode_octet_string(aes_key))
+
+
+def encode_mp_header_key(id_string, iv, aes_key):
+    """ Encode MPHeaderKey structure (protocol version 1)
+
+    :param id_string:   bytes or str identification string
+    :param iv:          bytes GCM mode nonce
+    :param aes_key:     bytes AES key MPHeader is encrypted with
+
+    :return: bytes DER encoding
+
+    """
+
+    return encode_tlv(TAG_SEQUENCE,
+                      encode_octet_string(id_string) +
+                      encode_octet_string(iv) +
+                      encode_octet_string(aes_key))
+
+
+def encode_mp_header_container(algorithm_oid, enc_header):
+    """ Encode MPHeaderContainer structure
+
+    :param algorithm_oid:   string OID of header encryption algorithm
+    :param enc_header:      bytes encrypted MPHeader
+
+    :return: bytes DER encoding
+
+    """
+
+    return encode_tlv(TAG_SEQUENCE,
+                      encode_algorithm_identifier(algorithm_oid) +
+                      encode_octet_string(enc_header))
+
+
+def encode_message_packet_prefix(version, header_block, blocks_len):
+    """ Encode MessagePacket up to the HMAC block
+
+    The result followed by DER-encoded HMAC and content blocks (blocks_len
+    octets in total) is exactly an encode_message_packet output.
+
+    :param version:         integer protocol version
+    :param header_block:    bytes DER-encoded MPHeaderContainer
+    :param blocks_len:      integer length of encoded HMAC and content
+                            blocks together
+
+    :return: bytes DER prefix
+
+    """
+
+    head = encode_integer(version) + header_block
+    return encode_tlv_header(TAG_SEQUENCE, len(head) + blocks_len) + head
+
+
+def encode_message_packet(version, header_block, hmac_block, content_block):
+    """ Encode MessagePacket structure from encoded blocks
+
+    :param version:         integer protocol version
+    :param header_block:    bytes DER-encoded MPHeaderContainer
+    :param hmac_block:      bytes DER-encoded MPHMACContainer
+    :param content_block:   bytes DER-encoded MPContentContainer
+
+    :return: bytes DER encoding
+
+    """
+
+    return encode_tlv(TAG_SEQUENCE,
+                      encode_integer(version) + header_block + hmac_block +
+                      content_block)
+
+
+# ---------------------------------------------------------------------------
+# decoding
+# ---------------------------------------------------------------------------
+
+def read_tlv_header(der, offset, tag, end=None):
+    """ Read identifier and length octets of a TLV triplet
+
+    Unlike read_tlv the content octets do not have to be present in the
+    buffer which allows to parse the framing of a packet that is read
+    piece by piece.
+
+    :param der:         bytes-like buffer
+    :param offset:      integer offset of an identifier octet
+    :param tag:         integer expected identifier octet
+    :param end=None:    integer offset the header must not cross (defaults
+                        to a buffer length)
+
+    :return: tuple (content_start offset, content length)
+
+    :raise mflod.crypto.exceptions.DERDecodingError
+
+    """
+
+    if end is None:
+        end = len(der)
+
+    if offset + 2 > end:
+        raise DERDecodingError("truncated DER at offset %d" % offset)
+    if der[offset] != tag:
+        raise DERDecodingError("expected tag 0x%02x at offset %d, got 0x%02x"
+                               % (tag, offset, der[offset]))
+
+    length = der[offset + 1]
+    offset += 2
+
+    # long form length
+    if length & 0x80:
+        len_of_len = length & 0x7F
+        if not 0 < len_of_len <= 8 or offset + len_of_len > end:
+            raise DERDecodingError("invalid length octets")
+        length = int.from_bytes(bytes(der[offset:offset + len_of_len]), 'big')
+        if length < 0x80 or der[offset] == 0:
+            raise DERDecodingError("non-minimal length encoding")
+        offset += len_of_len
+
+    return offset, length
+
+
+def read_tlv(der, offset, tag, end=None):
+    """ Read a header of a TLV triplet with an expected tag
+
+    :param der:         bytes-like buffer
+    :param offset:      integer offset of an identifier octet
+    :param tag:         integer expected identifier octet
+    :param end=None:    integer offset the triplet must not cross (defaults
+                        to a buffer length)
+
+    :return: tuple (content_start, content_end) offsets
+
+    :raise mflod.crypto.exceptions.DERDecodingError
+
+    """
+
+    if end is None:
+        end = len(der)
+
+    offset, length = read_tlv_header(der, offset, tag, end)
+
+    if offset + length > end:
+        raise DERDecodingError("content of 0x%02x exceeds its container"
+                               % tag)
+
+    return offset, offset + length
+
+
+def _expect_end(offset, end):
+    """ Make sure a constructed value has no trailing components """
+
+    if offset != end:
+        raise DERDecodingError("unexpected trailing data at offset %d"
+                               % offset)
+
+
+def _read_octet_string(der, offset, end):
+    """ Read OCTET STRING and return (value, next offset) """
+
+    start, stop = read_tlv(der, offset, TAG_OCTET_STRING, end)
+    return der[start:stop], stop
+
+
+def _read_oid(der, offset, end):
+    """ Read OBJECT IDENTIFIER and return (dotted string, next offset) """
+
+    start, stop = read_tlv(der, offset, TAG_OID, end)
+    content = bytes(der[start:stop])
+
+    oid_str = _oids.get(content)
+    if oid_str is None:
+        if not content or content[-1] & 0x80:
+            raise DERDecodingError("malformed OID")
+
+        arcs = []
+        arc = 0
+        for octet in content:
+            if arc == 0 and octet == 0x80:
+                raise DERDecodingError("non-minimal OID arc encoding")
+            arc = (arc << 7) | (octet & 0x7F)
+            if not octet & 0x80:
+                arcs.append(arc)
+                arc = 0
+
+        # split the first sub-identifier into two arcs
+        first = arcs[0]
+        if first < 80:
+            arcs[0:1] = [first // 40, first % 40]
+        else:
+            arcs[0:1] = [2, first - 80]
+
+        oid_str = '.'.join(str(a) for a in arcs)
+
+    return oid_str, stop
+
+
+def _read_algorithm_identifier(der, offset, end):
+    """ Read AlgorithmIdentifier and return (OID string, next offset) """
+
+    start, stop = read_tlv(der, offset, TAG_SEQUENCE, end)
+    oid_str, offset = _read_oid(der, start, stop)
+
+    # parameters are always NULL
+    null_start, offset = read_tlv(der, offset, TAG_NULL, stop)
+    if null_start != offset:
+        raise DERDecodingError("NULL with non-empty content")
+    _expect_end(offset, stop)
+
+    return oid_str, stop
+
+
+def _read_integer(der, offset, end):
+    """ Read INTEGER and return (value, next offset) """
+
+    start, stop = read_tlv(der, offset, TAG_INTEGER, end)
+    if start == stop:
+        raise DERDecodingError("empty INTEGER")
+    return int.from_bytes(bytes(der[start:stop]), 'big', signed=True), stop
+
+
+def _open_sequence(der):
+    """ Read an outermost SEQUENCE and return its (start, end) offsets """
+
+    start, stop = read_tlv(der, 0, TAG_SEQUENCE)
+    _expect_end(stop, len(der))
+    return start, stop
+
+
+def split_message_packet(der):
+    """ Split MessagePacket into the version and encoded blocks
+
+    The blocks are returned exactly as they are present in the input so an
+    HMAC can be computed over the received content block without encoding
+    it again.
+
+    :param der: bytes-like DER-encoded MessagePacket
+
+    :return: tuple (protocolVersion, headerBlock DER, hmacBlock DER,
+             contentBlock DER)
+
+    :raise mflod.crypto.exceptions.DERDecodingError
+
+    """
+
+    offset, end = _open_sequence(der)
+    version, offset = _read_integer(der, offset, end)
+
+    blocks = []
+    for _ in range(3):
+        _, stop = read_tlv(der, offset, TAG_SEQUENCE, end)
+        blocks.append(der[offset:stop])
+        offset = stop
+    _expect_end(offset, end)
+
+    return (version,) + tuple(blocks)
+
+
+def _peek_tlv(read_at, offset, tag, end):
+    """ Read a TLV header through read_at and return absolute (start, end) """
+
+    window = read_at(offset, min(MAX_TLV_HEADER_LEN, end - offset))
+    start, length = read_tlv_header(window, 0, tag)
+    start += offset
+
+    if start + length > end:
+        raise DERDecodingError("content of 0x%02x exceeds its container"
+                               % tag)
+
+    return start, start + length
+
+
+def locate_message_packet(read_at, size):
+    """ Split MessagePacket without reading its encrypted content
+
+    Only the framing is read: the version, header and HMAC blocks (which are
+    small) are returned as they are while the content block is described by
+    offsets so a caller can process it in chunks.
+
+    :param read_at: callable (offset, amount) returning exactly amount
+                    bytes of an encoded packet starting at offset
+    :param size:    integer length of an encoded packet
+
+    :return: tuple (protocolVersion, headerBlock DER, hmacBlock DER,
+             (contentBlock start, end) offsets, initializationVector,
+             encryptionAlgorithm OID, (encryptedContent start, end) offsets)
+
+    :raise mflod.crypto.exceptions.DERDecodingError
+
+    """
+
+    offset, end = _peek_tlv(read_at, 0, TAG_SEQUENCE, size)
+    _expect_end(end, size)
+
+    # protocol version
+    _, stop = _peek_tlv(read_at, offset, TAG_INTEGER, end)
+    version, _ = _read_integer(read_at(offset, stop - offset), 0,
+                               stop - offset)
+    offset = stop
+
+    # header and HMAC blocks are read as they are
+    blocks = []
+    for _ in range(2):
+        _, stop = _peek_tlv(read_at, offset, TAG_SEQUENCE, end)
+        blocks.append(read_at(offset, stop - offset))
+        offset = stop
+
+    # content block must be the last one
+    content_span = (offset, end)
+    offset, stop = _peek_tlv(read_at, offset, TAG_SEQUENCE, end)
+    _expect_end(stop, end)
+
+    # everything in front of the encrypted content
+    _, iv_stop = _peek_tlv(read_at, offset, TAG_OCTET_STRING, end)
+    _, ai_stop = _peek_tlv(read_at, iv_stop, TAG_SEQUENCE, end)
+    head = read_at(offset, ai_stop - offset)
+    iv, head_offset = _read_octet_string(head, 0, len(head))
+    oid_str, _ = _read_algorithm_identifier(head, head_offset, len(head))
+
+    enc_span = _peek_tlv(read_at, ai_stop, TAG_OCTET_STRING, end)
+    _expect_end(enc_span[1], end)
+
+    return (version,) + tuple(blocks) + (content_span, iv, oid_str, enc_span)
+
+
+def decode_mp_header_container(der):
+    """ Decode MPHeaderContainer
+
+    :param der: bytes-like DER encoding
+
+    :return: tuple (encryptionAlgorithm OID, encryptedHeader)
+
+    """
+
+    offset, end = _open_sequence(der)
+    oid_str, offset = _read_algorithm_identifier(der, offset, end)
+    enc_header, offset = _read_octet_string(der, offset, end)
+    _expect_end(offset, end)
+    return oid_str, enc_header
+
+
+def decode_mp_hmac_container(der):
+    """ Decode MPHMACContainer
+
+    :param der: bytes-like DER encoding
+
+    :return: tuple (digestAlgorithm OID, digest)
+
+    """
+
+    offset, end = _open_sequence(der)
+    oid_str, offset = _read_algorithm_identifier(der, offset, end)
+    digest, offset = _read_octet_string(der, offset, end)
+    _expect_end(offset, end)
+    return oid_str, digest
+
+
+def decode_mp_content_container(der):
+    """ Decode MPContentContainer
+
+    :param der: bytes-like DER encoding
+
+    :return: tuple (initializationVector, encryptionAlgorithm OID,
+             encryptedContent)
+
+    """
+
+    offset, end = _open_sequence(der)
+    iv, offset = _read_octet_string(der, offset, end)
+    oid_str, offset = _read_algorithm_identifier(der, offset, end)
+    enc_content, offset = _read_octet_string(der, offset, end)
+    _expect_end(offset, end)
+    return iv, oid_str, enc_content
+
+
+def decode_mp_header(der):
+    """ Decode MPHeader
+
+    :param der: bytes-like DER encoding
+
+    :return: tuple (identificationString, signatureAlgorithm OID, PGPKeyID,
+             signature, HMACKey, AESKey)
+
+    """
+
+    offset, end = _open_sequence(der)
+    id_string, offset = _read_octet_string(der, offset, end)
+    sign_oid, offset = _read_algorithm_identifier(der, offset, end)
+
+    values = [id_string, sign_oid]
+    for _ in range(4):
+        value, offset = _read_octet_string(der, offset, end)
+        values.append(value)
+    _expect_end(offset, end)
+
+    return tuple(values)
+
+
+def decode_mp_header_key(der):
+    """ Decode MPHeaderKey
+
+    :param der: bytes-like DER encoding
+
+    :return: tuple (identificationString, initializationVector, AESKey)
+
+    """
+
+    offset, end = _open_sequence(der)
+
+    values = []
+    for _ in range(3):
+        value, offset = _read_octet_string(der, offset, end)
+        values.append(value)
+    _expect_end(offset, end)
+
+    return tuple(values)
+
+
+def decode_mp_content(der):
+    """ Decode MPContent
+
+    :param der: bytes-like DER encoding
+
+    :return: tuple (timestamp string, content)
+
+    """
+
+    offset, end = _open_sequence(der)
+    start, stop = read_tlv(der, offset, TAG_UTC_TIME, end)
+    try:
+        timestamp = bytes(der[start:stop]).decode('ascii')
+    except UnicodeDecodeError:
+        raise DERDecodingError("UTCTime is not an ASCII string")
+    content, offset = _read_octet_string(der, stop, end)
+    _expect_end(offset, end)
+    return timestamp, content
+
+
+def decode_mp_content_prefix(der):
+    """ Decode MPContent up to the content octets
+
+    Counterpart of encode_mp_content_prefix: the input has to hold at least
+    the whole prefix (MAX_MP_CONTENT_PREFIX_LEN octets are always enough for
+    MPContent produced by FLOD) and may carry any amount of content after it.
+
+    :param der: bytes-like beginning of DER-encoded MPContent
+
+    :return: tuple (timestamp string, content length, prefix length)
+
+    :raise mflod.crypto.exceptions.DERDecodingError
+
+    """
+
+    offset, length = read_tlv_header(der, 0, TAG_SEQUENCE)
+    end = offset + length
+
+    start, stop = read_tlv(der, offset, TAG_UTC_TIME)
+    try:
+        timestamp = bytes(der[start:stop]).decode('ascii')
+    except UnicodeDecodeError:
+        raise DERDecodingError("UTCTime is not an ASCII string")
+
+    offset, content_len = read_tlv_header(der, stop, TAG_OCTET_STRING)
+    _expect_end(offset + content_len, end)
+
+    return timestamp, content_len, offset
+
+
+def decode_message_packet(der):
+    """ Fully decode MessagePacket
+
+    :param der: bytes-like DER encoding
+
+    :return: tuple (protocolVersion,
+                    (encryptionAlgorithm OID, encryptedHeader),
+                    (digestAlgorithm OID, digest),
+                    (initializationVector, encryptionAlgorithm OID,
+                     encryptedContent))
+
+    """
+
+    version, header_block, hmac_block, content_block = \
+        split_message_packet(der)
+
+    return (version,
+            decode_mp_header_container(header_block),
+            decode_mp_hmac_container(hmac_block),
+            decode_mp_content_container(content_block))
@@ -8,3 +8,23 @@ class SignatureVerificationFailed(Exception):
 
 class HMACVerificationFailed(Exception):
     pass
+
+
+class DERDecodingError(Exception):
+    pass
+
+
+class PGPParsingError(Exception):
+    pass
+
+
+class UnsupportedProtocolVersion(Exception):
+    pass
+
+
+class HeaderVerificationFailed(Exception):
+    pass
+
+
+class GPGError(Exception):
+    pass
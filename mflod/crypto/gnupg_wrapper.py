@@ -1,5 +1,7 @@
 import logging
-import gnupg
+import subprocess
+from mflod.crypto.gpg_pool import GPGPool
+from mflod.crypto.exceptions import GPGError
 
 
 class GnuPGWrapper(object):
@@ -10,21 +12,26 @@ class GnuPGWrapper(object):
 
     Currently it is possible to generate/delete/retrieve RSA key pair from a local environment.
 
+    Every operation runs on a gnupg.GPG handle taken from a bounded pool (see GPGPool), so the wrapper is safe
+    to be used from several threads and handles are reused across calls.
+
     @todo Pulls down RSA key pair from RSA key server, etc.
 
     Developers:
         - (tnanoba) Tornike Nanobashvili
     """
 
-    def __init__(self, gnupg_home_dir):
+    def __init__(self, gnupg_home_dir, gpg_pool_size=4):
         """
         Instantiate GnuPGWrapper class and creates following sub instances:
-            - Defines GnuPG instance
+            - Defines GnuPG handles pool and its primary GnuPG instance
             - Defines logging instance
 
         @:param gnupg_home_dir: str (Full pathname to directory containing the public and private keyrings.)
+        @:param gpg_pool_size: int (maximal amount of GnuPG instances, i.e. concurrently running gpg processes)
         """
-        self.gpg = gnupg.GPG(homedir=gnupg_home_dir)
+        self.gpg_pool = GPGPool(gnupg_home_dir, gpg_pool_size)
+        self.gpg = self.gpg_pool.primary
 
         self.logger = logging.getLogger(__name__)
         self.logger.debug('GnuPGWrapper instance is being created.')
@@ -43,9 +50,10 @@ class GnuPGWrapper(object):
 
         :return: str (RSA key fingerprint (SHA1))
         """
-        input_data = self.gpg.gen_key_input(key_type='RSA', key_length=key_length, name_real=user_name,
-                                            name_comment=user_comment, name_email=user_email)
-        key = self.gpg.gen_key(input_data)
+        with self.gpg_pool.handle() as gpg:
+            input_data = gpg.gen_key_input(key_type='RSA', key_length=key_length, name_real=user_name,
+                                           name_comment=user_comment, name_email=user_email)
+            key = gpg.gen_key(input_data)
 
         self.logger.info('RSA ' + '(' + str(key_length) + ' bits) key pair is being generated. Fingerprint: ' +
                          str(key))
@@ -54,20 +62,30 @@ class GnuPGWrapper(object):
 
     def delete_pgp_key(self, fingerprint):
         """
-        Deletes PGP key pair based on provided fingerprint
+        Deletes PGP key pair (or public key without private one) based on provided fingerprint with a single gpg
+            invocation, the key chain is not listed (see delete_pgp_keys)
 
         @developer: tnanoba
 
         :param fingerprint: str (key HEX SHA1 fingerprint)
-        :return: void
+        :return: bool (True if the key was deleted)
         """
         try:
-            self.gpg.delete_keys(fingerprint, True)
-            self.gpg.delete_keys(fingerprint, False)
+            _, status = self._run_gpg(['--yes', '--delete-secret-and-public-key', fingerprint.replace(' ', '').upper()],
+                                      expected=('DELETE_PROBLEM',))
+
+            problem = next((fields for keyword, fields in status if keyword == 'DELETE_PROBLEM'), None)
+
+            if problem is not None:
+                raise ValueError('gpg did not delete a key: ' +
+                                 self.DELETE_PROBLEMS.get(problem[0] if problem else '', 'deletion problem'))
 
             self.logger.info('RSA key pair is being deleted. Fingerprint: ' + fingerprint)
+
+            return True
         except Exception as ERROR:
             self.logger.error(ERROR)
+            return False
 
     def _retrieve_local_pgp_keys(self, secret_key=True):
         """
@@ -100,8 +118,387 @@ class GnuPGWrapper(object):
         :param secret_key: bool
         :return: Generator
         """
-        for key in self.gpg.list_keys(secret=secret_key):
-            yield self.gpg.export_keys(key['fingerprint'], secret=secret_key)
+        with self.gpg_pool.handle() as gpg:
+            keys = gpg.list_keys(secret=secret_key)
+
+        for key in keys:
+            with self.gpg_pool.handle() as gpg:
+                pgp_key = gpg.export_keys(key['fingerprint'], secret=secret_key)
+
+            yield pgp_key
+
+    def _list_pgp_fingerprints(self, secret_key=True):
+        """
+        Lists fingerprints of user PGP keys (private/public based on secret_key, defaults to private) without
+            exporting any key material
+
+        @developer: tnanoba
+
+        :param secret_key: bool
+        :return: list (of HEX SHA1 fingerprints)
+        """
+        return self._list_key_chain_fingerprints()['secret' if secret_key else 'public']
+
+    def _list_key_chain_fingerprints(self):
+        """
+        Lists fingerprints of public and private keys of the key chain with a single gpg invocation
+
+        @developer: tnanoba
+
+        gpg --with-secret marks public keys whose private key is present (15th field of a pub record, "#" stands
+            for a missing private key of a stub). Primary key fingerprint is the fpr record following a pub record.
+
+        :return: dict ({'public': list, 'secret': list})
+        """
+        listing, _ = self._run_gpg(['--with-colons', '--with-secret', '--list-keys'])
+
+        fingerprints = {'public': [], 'secret': []}
+        secret = None
+
+        for line in listing.decode('utf-8', 'replace').splitlines():
+            fields = line.split(':')
+
+            if fields[0] == 'pub':
+                secret = len(fields) > 14 and fields[14] not in ('', '#')
+            elif fields[0] == 'fpr' and secret is not None and len(fields) > 9:
+                fingerprints['public'].append(fields[9])
+
+                if secret:
+                    fingerprints['secret'].append(fields[9])
+
+                secret = None
+
+        return fingerprints
+
+    def _retrieve_local_pgp_keys_bulk(self, secret_key=True, key_ids=None):
+        """
+        Exports user PGP keys (private/public based on secret_key, defaults to private) with a single gpg invocation
+            and returns them as binary (non-armored) packet stream, None if there is nothing to export.
+
+        @developer: tnanoba
+
+        Unlike _retrieve_local_pgp_keys it does not list the key chain and does not spawn gpg per key.
+
+        :param secret_key: bool
+        :param key_ids: list|None (keyids/fingerprints of keys to export, None exports all of them)
+        :return: bytes|None
+        """
+        try:
+            if key_ids is not None:
+                key_ids = list(key_ids)
+
+                # Empty key id list would make gpg export the whole key chain
+                if not key_ids:
+                    return None
+
+            keys = self._export_pgp_keys([] if key_ids is None else key_ids, secret_key)
+
+            return None if keys == b'' else keys
+        except Exception as ERROR:
+            self.logger.error(ERROR)
+
+    def _export_pgp_keys(self, key_ids, secret_key=True):
+        """
+        Runs gpg --export (or --export-secret-keys) without ASCII armor and returns its output
+
+        @developer: tnanoba
+
+        GPG.export_keys always asks for ASCII armor, so gpg is run through _run_gpg.
+
+        :param key_ids: list (keyids/fingerprints, empty list exports the whole key chain)
+        :param secret_key: bool
+        :return: bytes
+        """
+        return self._run_gpg(['--export-secret-keys' if secret_key else '--export'] + list(key_ids))[0]
+
+    def _gpg_command(self, *args):
+        """
+        Builds gpg command line using the same binary and key chain files as GnuPG handles of the pool do. Status
+            lines are written to stderr.
+
+        :param args: str
+        :return: list
+        """
+        gpg = self.gpg
+
+        return [gpg.binary, '--no-options', '--no-emit-version', '--no-tty', '--batch', '--status-fd', '2',
+                '--homedir', gpg.homedir, '--no-default-keyring', '--keyring', gpg.keyring,
+                '--secret-keyring', gpg.secring] + list(args)
+
+    def _run_gpg(self, args, input_data=None, expected=()):
+        """
+        Runs gpg and returns its output along with its parsed status lines
+
+        @developer: tnanoba
+
+        Unlike GPG methods it does not fail on status lines unknown to the python gnupg wrapper, which bulk
+            operations produce plenty of. Runs while holding a pool handle, so the amount of concurrently running gpg
+            processes stays bounded by the pool size.
+
+        gpg exits with a non-zero code both when it can not run at all (dead or locked agent, bad home directory)
+            and when some of the keys it processed failed. The latter is told by the expected status lines, the
+            caller reports them, so GPGError is raised only when none of them was emitted.
+
+        :param args: list (gpg arguments)
+        :param input_data: bytes|None (standard input)
+        :param expected: tuple (status keywords a caller handles failures by)
+        :return: tuple (bytes stdout, list of status tuples (keyword, list of arguments))
+        """
+        with self.gpg_pool.handle():
+            process = subprocess.run(self._gpg_command(*args), input=input_data, stdout=subprocess.PIPE,
+                                     stderr=subprocess.PIPE, stdin=None if input_data is not None else subprocess.DEVNULL)
+
+        status = self._check_gpg_exit(args, process.returncode, process.stderr, expected)
+
+        return process.stdout, status
+
+    @staticmethod
+    def _check_gpg_exit(args, returncode, stderr, expected=()):
+        """
+        Parses gpg status lines and raises GPGError when gpg exited with a non-zero code without emitting any of the
+            expected status lines (see _run_gpg)
+
+        :param args: list (gpg arguments)
+        :param returncode: int
+        :param stderr: bytes (status lines are written to stderr, see _gpg_command)
+        :param expected: tuple (status keywords)
+        :return: list (of status tuples (keyword, list of arguments))
+        """
+        status = []
+        messages = []
+
+        for line in stderr.decode('utf-8', 'replace').splitlines():
+            if line.startswith('[GNUPG:] '):
+                fields = line[len('[GNUPG:] '):].split()
+
+                if fields:
+                    status.append((fields[0], fields[1:]))
+            elif line.strip():
+                messages.append(line.strip())
+
+        if returncode != 0 and not any(keyword in expected for keyword, _ in status):
+            raise GPGError('gpg ' + ' '.join(args[:1]) + ' exited with code ' + str(returncode) +
+                           (': ' + messages[-1] if messages else ''))
+
+        return status
+
+    def generate_pgp_keys(self, specs):
+        """
+        Generates several PGP key pairs with a single gpg invocation (one batch file, a %commit per key)
+
+        @developer: tnanoba
+
+            Spec dict structure (all the keys are optional, see generate_pgp_key for defaults):
+                {
+                    'key_length': 2048,
+                    'user_name': 'Auto Generated Key',
+                    'user_comment': 'Generated by KeyManager',
+                    'user_email': '',
+                }
+
+            Report list structure (same order as specs):
+                [
+                    {'spec': {...}, 'fingerprint': 'D94FC56AFD1D1AD8B56D35EA9FB10119E057B48F', 'ok': True},
+                    {'spec': {...}, 'fingerprint': None, 'ok': False, 'error': '...'},
+                ]
+
+        :param specs: list (of spec dicts)
+        :return: list (of report dicts)
+        """
+        specs = list(specs)
+        report = [{'spec': spec, 'fingerprint': None, 'ok': False, 'error': 'gpg did not create a key'}
+                  for spec in specs]
+        batch = ''
+
+        for handle, spec in enumerate(specs):
+            try:
+                batch += self._gen_key_batch(handle, **spec)
+            except Exception as ERROR:
+                report[handle]['error'] = 'Invalid key spec: ' + str(ERROR)
+
+        if batch:
+            try:
+                _, status = self._run_gpg(['--gen-key'], batch.encode('utf-8'), ('KEY_CREATED', 'KEY_NOT_CREATED'))
+
+                for keyword, fields in status:
+                    if keyword == 'KEY_CREATED' and len(fields) > 2 and fields[2].isdigit():
+                        entry = report[int(fields[2])]
+                        entry.update(fingerprint=fields[1], ok=True)
+                        del entry['error']
+            except Exception as ERROR:
+                self.logger.error(ERROR)
+
+        self.logger.info('PGP key pairs are being generated: ' + str(sum(entry['ok'] for entry in report)) + ' of ' +
+                         str(len(report)) + '.')
+
+        return report
+
+    @staticmethod
+    def _gen_key_batch(handle, key_length=2048, user_name='Auto Generated Key', user_comment='Generated by KeyManager',
+                       user_email=''):
+        """
+        Builds unattended key generation batch block of a single key
+
+        @link https://www.gnupg.org/documentation/manuals/gnupg/Unattended-GPG-key-generation.html
+
+        :param handle: int (reported back by gpg in KEY_CREATED status line)
+        :param key_length: int
+        :param user_name: str
+        :param user_comment: str
+        :param user_email: str
+        :return: str
+        """
+        fields = [('Key-Type', 'RSA'), ('Key-Length', str(int(key_length))), ('Name-Real', user_name)]
+
+        if user_comment:
+            fields.append(('Name-Comment', user_comment))
+
+        if user_email:
+            fields.append(('Name-Email', user_email))
+
+        fields.append(('Handle', str(handle)))
+
+        # Line breaks would inject batch file commands
+        if any('\n' in value or '\r' in value for _, value in fields):
+            raise ValueError('line breaks are not allowed')
+
+        return ''.join(name + ': ' + value + '\n' for name, value in fields) + '%no-protection\n%commit\n'
+
+    def delete_pgp_keys(self, fingerprints):
+        """
+        Deletes several PGP key pairs (or public keys without private ones) with a single gpg deletion invocation
+
+        @developer: tnanoba
+
+        gpg stops at the first key it fails to delete, so the key chain is listed before the deletion (only present
+            keys are passed to gpg): two gpg invocations in total. The key chain is listed once more to report the
+            outcome per key only if gpg reports a deletion problem.
+
+            Report list structure (same order as fingerprints):
+                [
+                    {'fingerprint': 'D94FC56AFD1D1AD8B56D35EA9FB10119E057B48F', 'ok': True, 'status': 'deleted'},
+                    {'fingerprint': '...', 'ok': False, 'status': 'not found'},
+                    {'fingerprint': '...', 'ok': False, 'status': 'failed'},
+                ]
+
+        :param fingerprints: list (of key HEX SHA1 fingerprints, keyids are refused by gpg in batch mode)
+        :return: list (of report dicts)
+        """
+        fingerprints = [fingerprint.replace(' ', '').upper() for fingerprint in fingerprints]
+
+        try:
+            # Private keys always come with public ones
+            present = set(self._list_key_chain_fingerprints()['public'])
+            to_delete = sorted(set(fingerprints) & present)
+
+            if to_delete:
+                _, status = self._run_gpg(['--yes', '--delete-secret-and-public-key'] + to_delete,
+                                          expected=('DELETE_PROBLEM',))
+
+                if any(keyword == 'DELETE_PROBLEM' for keyword, _ in status):
+                    remaining = set(self._list_key_chain_fingerprints()['public'])
+                else:
+                    remaining = present - set(to_delete)
+            else:
+                remaining = present
+        except Exception as ERROR:
+            self.logger.error(ERROR)
+            return [{'fingerprint': fingerprint, 'ok': False, 'status': 'failed'} for fingerprint in fingerprints]
+
+        report = []
+
+        for fingerprint in fingerprints:
+            if fingerprint not in present:
+                report.append({'fingerprint': fingerprint, 'ok': False, 'status': 'not found'})
+            elif fingerprint in remaining:
+                report.append({'fingerprint': fingerprint, 'ok': False, 'status': 'failed'})
+            else:
+                report.append({'fingerprint': fingerprint, 'ok': True, 'status': 'deleted'})
+
+        self.logger.info('PGP key pairs are being deleted: ' + str(sum(entry['ok'] for entry in report)) + ' of ' +
+                         str(len(report)) + '.')
+
+        return report
+
+    # gpg DELETE_PROBLEM reasons
+    DELETE_PROBLEMS = {
+        '1': 'no such key',
+        '2': 'must delete secret key first',
+        '3': 'ambiguous specification',
+        '4': 'key is stored on a smartcard',
+    }
+
+    # gpg IMPORT_OK reason flags and IMPORT_PROBLEM reasons
+    IMPORT_NEW_KEY = 1
+    IMPORT_CHANGED = 2 | 4 | 8
+    IMPORT_SECRET = 16
+    IMPORT_PROBLEMS = {
+        '0': 'no specific reason given',
+        '1': 'invalid certificate',
+        '2': 'issuer certificate missing',
+        '3': 'certificate chain too long',
+        '4': 'error storing certificate',
+    }
+
+    def import_keys(self, key_data):
+        """
+        Imports binary or ASCII armored PGP keys (any amount of them) with a single gpg invocation
+
+        @developer: tnanoba
+
+            Report list structure (a dict per key gpg reported on):
+                [
+                    {'fingerprint': 'D94FC56AFD1D1AD8B56D35EA9FB10119E057B48F', 'ok': True, 'status': 'new',
+                     'secret': True},
+                    {'fingerprint': '...', 'ok': True, 'status': 'updated'|'unchanged', 'secret': False},
+                    {'fingerprint': '...'|None, 'ok': False, 'status': 'invalid certificate', 'secret': False},
+                ]
+
+        :param key_data: bytes|str
+        :return: list (of report dicts)
+        """
+        if isinstance(key_data, str):
+            key_data = key_data.encode('ascii')
+
+        try:
+            _, status = self._run_gpg(['--import'], key_data, ('IMPORT_RES',))
+        except Exception as ERROR:
+            self.logger.error(ERROR)
+            return []
+
+        report = []
+        by_fingerprint = {}
+
+        for keyword, fields in status:
+            if keyword == 'IMPORT_OK' and len(fields) > 1:
+                flags = int(fields[0])
+                entry = by_fingerprint.get(fields[1])
+
+                if entry is None:
+                    entry = by_fingerprint[fields[1]] = {'fingerprint': fields[1], 'ok': True, 'flags': 0}
+                    report.append(entry)
+
+                entry['flags'] |= flags
+            elif keyword == 'IMPORT_PROBLEM' and fields:
+                report.append({'fingerprint': fields[1] if len(fields) > 1 else None, 'ok': False,
+                               'status': self.IMPORT_PROBLEMS.get(fields[0], 'import problem ' + fields[0]),
+                               'secret': False})
+
+        for entry in by_fingerprint.values():
+            flags = entry.pop('flags')
+
+            if flags & self.IMPORT_NEW_KEY:
+                entry['status'] = 'new'
+            elif flags & self.IMPORT_CHANGED:
+                entry['status'] = 'updated'
+            else:
+                entry['status'] = 'unchanged'
+
+            entry['secret'] = bool(flags & self.IMPORT_SECRET)
+
+        self.logger.info('PGP keys are being imported: ' + str(sum(entry['ok'] for entry in report)) + ' keys.')
+
+        return report
 
     def _retrieve_local_pgp_key_id(self, key_id, secret_key=True):
         """
@@ -122,7 +519,8 @@ class GnuPGWrapper(object):
             if key_id is None:
                 raise ValueError
 
-            key = self.gpg.export_keys(key_id, secret=secret_key)
+            with self.gpg_pool.handle() as gpg:
+                key = gpg.export_keys(key_id, secret=secret_key)
 
             return None if key == '' else key
         except Exception as ERROR:
@@ -0,0 +1,157 @@
+import queue
+import threading
+import contextlib
+import gnupg
+
+
+class GPGPool(object):
+    """
+    Class keeps a bounded pool of reusable gnupg.GPG handles of a single GnuPG home directory
+
+    gnupg.GPG instance is not safe to be shared among threads (gen_key, for instance, changes instance keyring
+    attributes), while creating one per call costs a gpg --version run and home directory checks. The pool hands
+    out every handle to one thread at a time, creates handles lazily up to size of the pool and blocks further
+    callers until a handle is returned, so no more than size gpg processes are run by a pool at once.
+
+    The most recently returned handle is handed out first, single threaded callers always get the same one.
+
+    Developers:
+        - (tnanoba) Tornike Nanobashvili
+    """
+
+    def __init__(self, gnupg_home_dir, size=4, factory=None):
+        """
+        Initialize GPGPool and creates its first handle
+
+        @:param gnupg_home_dir: str
+        @:param size: int (maximal amount of handles)
+        @:param factory: callable|None (creates a handle of a home directory, defaults to gnupg.GPG)
+        """
+        if size < 1:
+            raise ValueError('GPG pool size has to be positive')
+
+        self.gnupg_home_dir = gnupg_home_dir
+        self.size = size
+        self.factory = factory or (lambda home_dir: gnupg.GPG(homedir=home_dir))
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._handles = []
+
+        # Handles created or being created, slots are reserved under the lock and handles are created outside it
+        self._reserved = 1
+
+        self.created = 0
+        self.acquisitions = 0
+        self.waits = 0
+
+        self._idle.put(self._create())
+
+    def _create(self):
+        """
+        Creates a new handle in a slot reserved by the caller (see acquire), the slot is freed if creation fails
+
+        :return: gnupg.GPG
+        """
+        try:
+            handle = self.factory(self.gnupg_home_dir)
+        except Exception:
+            with self._lock:
+                self._reserved -= 1
+            raise
+
+        with self._lock:
+            self._handles.append(handle)
+            self.created += 1
+
+        return handle
+
+    @property
+    def primary(self):
+        """
+        The first handle of the pool, the one single threaded callers get
+
+        :return: gnupg.GPG
+        """
+        return self._handles[0]
+
+    def acquire(self, timeout=None):
+        """
+        Takes an idle handle out of the pool, creates a new one if there is none and the pool is not full yet,
+            waits for a returned one otherwise
+
+        @developer: tnanoba
+
+        :param timeout: int|float|None (seconds to wait for a handle, None waits forever)
+        :return: gnupg.GPG
+        """
+        with self._lock:
+            self.acquisitions += 1
+
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                create = self._reserved < self.size
+
+                if create:
+                    self._reserved += 1
+                else:
+                    self.waits += 1
+
+        # gnupg.GPG runs gpg, other callers do not wait for it
+        if create:
+            return self._create()
+
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError('No GPG handle got available in ' + str(timeout) + ' seconds')
+
+    def release(self, handle):
+        """
+        Returns a handle taken by acquire back to the pool
+
+        @developer: tnanoba
+
+        :param handle: gnupg.GPG
+        :return: void
+        """
+        self._idle.put(handle)
+
+    @contextlib.contextmanager
+    def handle(self, timeout=None):
+        """
+        Context manager form of acquire and release
+
+        @developer: tnanoba
+
+            E.g
+                with gpg_pool.handle() as gpg:
+                    gpg.list_keys()
+
+        :param timeout: int|float|None
+        :return: Generator
+        """
+        handle = self.acquire(timeout)
+
+        try:
+            yield handle
+        finally:
+            self.release(handle)
+
+    def get_stats(self):
+        """
+        Returns pool usage statistics
+
+        @developer: tnanoba
+
+        :return: dict
+        """
+        with self._lock:
+            return {
+                'size': self.size,
+                'created': self.created,
+                'idle': self._idle.qsize(),
+                'acquisitions': self.acquisitions,
+                'waits': self.waits,
+            }
@@ -0,0 +1,173 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class KeyCache(object):
+    """
+    Bounded in-memory cache of materialized key objects with LRU eviction and optional TTL
+
+    Building a cryptography lib key from a PGP key involves a gpg subprocess, ASCII armor parsing and
+    RSA CRT parameters computation, while the same handful of keys is looked up over and over again.
+    KeyCache keeps ready-to-use key instances so that repeated lookups cost a dictionary access.
+
+    Entries are kept in a least recently used order, once max_size is exceeded the least recently used
+    one is evicted. If ttl is set, entries older than ttl seconds are treated as absent and dropped.
+
+    Developers:
+        - (tnanoba) Tornike Nanobashvili
+    """
+
+    def __init__(self, max_size=128, ttl=None, clock=time.monotonic):
+        """
+        Initialize an empty cache
+
+        :param max_size: int (maximal amount of entries, has to be positive)
+        :param ttl: int|float|None (entry time to live in seconds, None means entries never expire)
+        :param clock: callable (returns current time in seconds, monotonic clock by default)
+        """
+        if not isinstance(max_size, int) or max_size < 1:
+            raise ValueError('Cache size has to be a positive integer: ' + str(max_size))
+
+        if ttl is not None and ttl <= 0:
+            raise ValueError('Cache TTL has to be positive: ' + str(ttl))
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        # key -> (value, insertion time), ordered from least to most recently used
+        self._entries = OrderedDict()
+
+        self.reset_stats()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns cached value and marks it as the most recently used one, None if there is no live entry
+
+        @developer: tnanoba
+
+        :param key: hashable
+        :return: object|None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and self._is_expired(entry):
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return entry[0]
+
+    def put(self, key, value):
+        """
+        Stores value as the most recently used entry evicting the least recently used one on overflow
+
+        @developer: tnanoba
+
+        :param key: hashable
+        :param value: object (None values are not cached)
+        :return: void
+        """
+        if value is None:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, self._clock())
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, match):
+        """
+        Drops all entries which keys satisfy the match predicate
+
+        @developer: tnanoba
+
+        :param match: callable (accepts a key, returns bool)
+        :return: int (amount of dropped entries)
+        """
+        with self._lock:
+            stale = [key for key in self._entries if match(key)]
+
+            for key in stale:
+                del self._entries[key]
+
+            self.invalidations += len(stale)
+
+            return len(stale)
+
+    def clear(self):
+        """
+        Drops all entries (statistics are kept)
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self):
+        """
+        Resets hit/miss statistics
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+            self.invalidations = 0
+
+    def get_stats(self):
+        """
+        Returns cache statistics
+
+        @developer: tnanoba
+
+            E.g
+                {'size': 2, 'hits': 10, 'misses': 2, 'evictions': 0, 'expirations': 0, 'invalidations': 0,
+                 'hit_ratio': 0.8333333333333334}
+
+        :return: dict
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _is_expired(self, entry):
+        """
+        Checks whether a cache entry outlived TTL
+
+        :param entry: tuple (value, insertion time)
+        :return: bool
+        """
+        return self.ttl is not None and self._clock() - entry[1] >= self.ttl
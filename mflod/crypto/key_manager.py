@@ -1,8 +1,12 @@
-import pgpdump
 import os
+import threading
+import mflod.crypto.pgp_parser as pgp_parser
+import mflod.crypto.pgp_builder as pgp_builder
 from mflod.crypto.gnupg_wrapper import GnuPGWrapper
+from mflod.crypto.key_cache import KeyCache
+from mflod.crypto.keyring_watcher import KeyringWatcher
 from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import rsa, x25519, ed25519
 from cryptography.hazmat.primitives import serialization
 
 
@@ -19,14 +23,45 @@ class KeyManager(GnuPGWrapper):
         - (tnanoba) Tornike Nanobashvili
     """
 
-    def __init__(self, gnupg_home_dir='' + os.environ['HOME'] + '/.gnupg/'):
+    def __init__(self, gnupg_home_dir='' + os.environ['HOME'] + '/.gnupg/', cache_size=128, cache_ttl=None,
+                 keyring_poll_interval=1.0, gpg_pool_size=4, key_stock=None):
         """
         Initialize KeyManager and parent GnuPGWrapper classes
 
         @:param gnupg_home_dir: str (Default is whatever GnuPG defaults to)
+        @:param cache_size: int (maximal amount of RSA key instances kept by get_pgp_rsa_key_id)
+        @:param cache_ttl: int|float|None (seconds a cached RSA key instance stays valid, None for no expiration)
+        @:param keyring_poll_interval: int|float|None (minimal seconds between key chain files change checks made on
+            PGP key index lookups, see sync_key_index, None disables them)
+        @:param gpg_pool_size: int (maximal amount of concurrently running gpg processes, see GPGPool)
+        @:param key_stock: KeyStock|None (pre-generated RSA keys generate_plain_rsa_key and generate_pgp_key take)
         """
 
-        GnuPGWrapper.__init__(self, gnupg_home_dir)
+        GnuPGWrapper.__init__(self, gnupg_home_dir, gpg_pool_size)
+
+        # Materialized RSA keys, (normalized keyid/fingerprint, secret) => cryptography lib instance
+        self.key_cache = KeyCache(cache_size, cache_ttl)
+
+        # Plain (non-PGP) RSA private keys of a user, see add_plain_rsa_key
+        self.plain_keys = []
+
+        # X25519 private keys of a user (X25519 header mode), see add_x25519_key
+        self.x25519_keys = []
+
+        # Ed25519 private keys of a user (Ed25519 signatures), see add_ed25519_key
+        self.ed25519_keys = []
+
+        # PGP key index, raw 8 bytes keyid and 20 bytes fingerprint => key entry, built lazily by build_key_index
+        self._key_index = None
+        self._key_entries = []
+        self._key_index_lock = threading.Lock()
+
+        # Fingerprints of key chain public and private keys the PGP key index is up to date with
+        self._key_chain_fingerprints = None
+
+        self.keyring_watcher = KeyringWatcher(gnupg_home_dir, keyring_poll_interval)
+
+        self.key_stock = key_stock
 
         self.logger.debug('KeyManager instance is being created.')
 
@@ -37,6 +72,8 @@ class KeyManager(GnuPGWrapper):
 
         @developer: tnanoba
 
+        With key_stock set the key is taken out of the stock of pre-generated keys.
+
         Response example:
             cryptography.hazmat.backends.openssl.rsa._RSAPrivateKey object
 
@@ -44,6 +81,9 @@ class KeyManager(GnuPGWrapper):
         :return: object
         """
         try:
+            if self.key_stock is not None:
+                return self.key_stock.take(key_size)
+
             # Generates plain RSA key pair
             key = rsa.generate_private_key(
                 public_exponent=65537,
@@ -68,33 +108,692 @@ class KeyManager(GnuPGWrapper):
                 keyid format => 4E2ADFB8D4C78B63
                 fingerprint format => D94FC56AFD1D1AD8B56D35EA9FB10119E057B48F
 
+        Keys are taken from PGP key index when it is already built (building it here would export the whole key
+            chain for a single key), other found keys are kept in key_cache, so repeated lookups of the same key do
+            not invoke gpg.
+
         :param key_id: str
         :param secret: bool (True for private key, False for public key)
         :return: Object|None
         """
         try:
+            if key_id is None:
+                raise ValueError
+
+            if self._key_index is not None:
+                entry = self.get_pgp_key_entry(key_id)
+
+                if entry is not None and (entry['private_key'] is not None or not secret):
+                    return entry['private_key' if secret else 'public_key']
+
+            cache_key = (self._normalize_key_id(key_id), secret)
+
+            key = self.key_cache.get(cache_key)
+
+            if key is not None:
+                return key
+
             pgp_key = self._retrieve_local_pgp_key_id(key_id, secret)
 
             if isinstance(pgp_key, type(None)):
                 raise ValueError
 
-            return self._return_rsa_key_from_pgp(
+            key = self._return_rsa_key_from_pgp(
                 pgp_key.encode('utf-8'),
                 secret
             )
+
+            self.key_cache.put(cache_key, key)
+
+            return key
         except Exception as ERROR:
             self.logger.error(ERROR)
             return None
 
-    def get_pgp_rsa_keys(self, limit=30, secret=True):
+    def generate_pgp_key(self, key_length=2048, user_name='Auto Generated Key', user_comment='Generated by KeyManager',
+                         user_email=''):
+        """
+        Generates PGP key pair on local environment (see GnuPGWrapper.generate_pgp_key) and adds it to PGP key index
+
+        @developer: tnanoba
+
+        With key_stock set gpg does not generate the key: RSA key taken out of the stock is turned into a PGP key
+            (see pgp_builder) and imported into the key chain.
+
+        :param key_length: int (defaults to 2048 bits)
+        :param user_name: str (defaults to Auto Generated Key)
+        :param user_comment: str (defaults to Generated by KeyManager)
+        :param user_email: str (no email if empty)
+
+        :return: str (RSA key fingerprint (SHA1))
+        """
+        if self.key_stock is None:
+            fingerprint = GnuPGWrapper.generate_pgp_key(self, key_length, user_name, user_comment, user_email)
+        else:
+            fingerprint = self._import_stock_pgp_key(key_length, user_name, user_comment, user_email)
+
+        self.sync_key_index(True)
+
+        return fingerprint
+
+    def generate_pgp_keys(self, specs):
+        """
+        Generates several PGP key pairs (see GnuPGWrapper.generate_pgp_keys) and adds them to PGP key index
+
+        @developer: tnanoba
+
+        With key_stock set all the keys are built of stocked RSA keys and imported with a single gpg invocation.
+
+        :param specs: list (of spec dicts)
+        :return: list (of report dicts)
+        """
+        if self.key_stock is None:
+            report = GnuPGWrapper.generate_pgp_keys(self, specs)
+        else:
+            report = self._import_stock_pgp_keys(specs)
+
+        self.sync_key_index(True)
+
+        return report
+
+    def _import_stock_pgp_key(self, key_length, user_name, user_comment, user_email):
+        """
+        Takes RSA key out of key_stock, builds PGP key of it and imports it into the key chain
+
+        :param key_length: int
+        :param user_name: str
+        :param user_comment: str
+        :param user_email: str
+        :return: str|None (RSA key fingerprint (SHA1))
+        """
+        entry = self._import_stock_pgp_keys([{
+            'key_length': key_length,
+            'user_name': user_name,
+            'user_comment': user_comment,
+            'user_email': user_email,
+        }])[0]
+
+        if not entry['ok']:
+            self.logger.error(entry['error'])
+            return None
+
+        self.logger.info('RSA (' + str(key_length) + ' bits) key pair is being imported from key stock. Fingerprint: ' +
+                         entry['fingerprint'])
+
+        return entry['fingerprint']
+
+    def _import_stock_pgp_keys(self, specs):
+        """
+        Builds PGP keys of RSA keys taken out of key_stock (see pgp_builder) and imports them with a single gpg
+            invocation
+
+        :param specs: list (of spec dicts, see GnuPGWrapper.generate_pgp_keys)
+        :return: list (of report dicts, see GnuPGWrapper.generate_pgp_keys)
+        """
+        report = []
+        pgp_keys = []
+
+        for spec in specs:
+            entry = {'spec': spec, 'fingerprint': None, 'ok': False, 'error': 'gpg did not import the key'}
+            report.append(entry)
+
+            try:
+                pgp_key, entry['fingerprint'] = self._build_stock_pgp_key(spec)
+                pgp_keys.append(pgp_key)
+            except Exception as ERROR:
+                entry['error'] = 'Invalid key spec: ' + str(ERROR)
+
+        if pgp_keys:
+            imported = {entry['fingerprint'] for entry in self.import_keys(b''.join(pgp_keys))
+                        if entry['ok'] and entry['secret']}
+
+            for entry in report:
+                if entry['fingerprint'] in imported:
+                    entry['ok'] = True
+                    del entry['error']
+
+        return report
+
+    def _build_stock_pgp_key(self, spec):
+        """
+        Takes RSA key out of key_stock and builds PGP key of it (see pgp_builder)
+
+        :param spec: dict (see GnuPGWrapper.generate_pgp_keys)
+        :return: tuple (bytes binary key, str HEX fingerprint)
+        """
+        user_id = spec.get('user_name', 'Auto Generated Key')
+
+        if spec.get('user_comment', 'Generated by KeyManager'):
+            user_id += ' (' + spec.get('user_comment', 'Generated by KeyManager') + ')'
+
+        if spec.get('user_email'):
+            user_id += ' <' + spec['user_email'] + '>'
+
+        return pgp_builder.build_secret_key(self.key_stock.take(spec.get('key_length', 2048)), user_id)
+
+    def delete_pgp_key(self, fingerprint):
+        """
+        Deletes PGP key pair based on provided fingerprint, drops its cached RSA key instances and PGP key index entry
+            (two gpg invocations: the deletion and a key chain listing of the index synchronization)
+
+        @developer: tnanoba
+
+        :param fingerprint: str (key HEX SHA1 fingerprint)
+        :return: bool (True if the key was deleted)
+        """
+        deleted = GnuPGWrapper.delete_pgp_key(self, fingerprint)
+
+        self.invalidate_cached_key(fingerprint)
+
+        if deleted:
+            self.sync_key_index(True)
+
+        return deleted
+
+    def delete_pgp_keys(self, fingerprints):
+        """
+        Deletes several PGP key pairs (see GnuPGWrapper.delete_pgp_keys), drops their cached RSA key instances and
+            PGP key index entries
+
+        @developer: tnanoba
+
+        :param fingerprints: list (of key HEX SHA1 fingerprints)
+        :return: list (of report dicts)
+        """
+        report = GnuPGWrapper.delete_pgp_keys(self, fingerprints)
+
+        for entry in report:
+            self.invalidate_cached_key(entry['fingerprint'])
+
+        self.sync_key_index(True)
+
+        return report
+
+    def import_keys(self, key_data):
+        """
+        Imports PGP keys (see GnuPGWrapper.import_keys) and adds them to PGP key index
+
+        @developer: tnanoba
+
+        :param key_data: bytes|str
+        :return: list (of report dicts)
+        """
+        report = GnuPGWrapper.import_keys(self, key_data)
+
+        for entry in report:
+            self.invalidate_cached_key(entry['fingerprint'])
+
+        self.sync_key_index(True)
+
+        return report
+
+    def invalidate_cached_key(self, fingerprint):
+        """
+        Drops cached RSA key instances (both private and public) which were looked up either by the fingerprint
+            or by a keyid derived from it.
+
+        @developer: tnanoba
+
+        :param fingerprint: str (key HEX SHA1 fingerprint)
+        :return: int (amount of dropped cache entries)
+        """
+        if not isinstance(fingerprint, str):
+            return 0
+
+        fingerprint = self._normalize_key_id(fingerprint)
+
+        # keyid is a suffix of the fingerprint (16 hex digits long keyid, 8 hex digits short one)
+        return self.key_cache.invalidate(lambda cache_key: fingerprint.endswith(cache_key[0]))
+
+    def add_plain_rsa_key(self, rsa_key):
+        """
+        Adds plain (non-PGP) RSA private key to a user key chain, so it is yielded by yield_keys and its public key
+            is returned by get_pk_by_pgp_id for an all-zero PGP key ID.
+
+        @developer: tnanoba
+
+        :param rsa_key: object (cryptography lib RSA private key instance)
+        :return: void
+        """
+        self.plain_keys.append(rsa_key)
+
+    def generate_x25519_key(self):
+        """
+        Generates X25519 key pair and returns cryptography lib object, packets for its public key are assembled in
+            X25519 header mode (see Crypto.assemble_message_packet)
+
+        @developer: tnanoba
+
+        Response example:
+            cryptography.hazmat.backends.openssl.x25519._X25519PrivateKey object
+
+        :return: object|None
+        """
+        try:
+            key = x25519.X25519PrivateKey.generate()
+
+            self.logger.info('X25519 key pair is being generated: ' + str(key))
+
+            return key
+        except Exception as ERROR:
+            self.logger.error(ERROR)
+
+    def add_x25519_key(self, x25519_key):
+        """
+        Adds X25519 private key to a user key chain, so it is yielded by yield_x25519_keys
+
+        @developer: tnanoba
+
+        :param x25519_key: object (cryptography lib X25519 private key instance)
+        :return: void
+        """
+        self.x25519_keys.append(x25519_key)
+
+    def yield_x25519_keys(self):
+        """
+        Yields all user X25519 private keys, used by Crypto.disassemble_message_packet for trial decryption of
+            X25519 mode headers
+
+        @developer: tnanoba
+
+        :return: Generator
+        """
+        for x25519_key in list(self.x25519_keys):
+            yield x25519_key
+
+    def generate_ed25519_key(self):
+        """
+        Generates Ed25519 key pair and returns cryptography lib object, packets signed with it carry Ed25519
+            signatures (see Crypto.assemble_message_packet)
+
+        @developer: tnanoba
+
+        Response example:
+            cryptography.hazmat.backends.openssl.ed25519._Ed25519PrivateKey object
+
+        :return: object|None
+        """
+        try:
+            key = ed25519.Ed25519PrivateKey.generate()
+
+            self.logger.info('Ed25519 key pair is being generated: ' + str(key))
+
+            return key
+        except Exception as ERROR:
+            self.logger.error(ERROR)
+
+    def add_ed25519_key(self, ed25519_key):
+        """
+        Adds Ed25519 private key to a user key chain, so its public key is returned by get_pk_by_pgp_id for an
+            all-zero PGP key ID
+
+        @developer: tnanoba
+
+        :param ed25519_key: object (cryptography lib Ed25519 private key instance)
+        :return: void
+        """
+        self.ed25519_keys.append(ed25519_key)
+
+    def build_key_index(self, fingerprints=None):
+        """
+        Builds PGP key index: raw 8 bytes keyid and 20 bytes fingerprint => key entry. Public key chain is exported
+            with a single gpg invocation, private keys (another one) are attached to entries by fingerprint.
+
+        @developer: tnanoba
+
+            Key entry dict structure:
+                {
+                    'keyid': '07B4DE9999065238',
+                    'fingerprint': 'A7F154AA151349A1D3E5637F07B4DE9999065238',
+                    'public_key': cryptography.hazmat.backends.openssl.rsa._RSAPublicKey object,
+                    'private_key': cryptography.hazmat.backends.openssl.rsa._RSAPrivateKey object|None,
+                }
+
+        Non-RSA and v3 keys are skipped.
+
+        :param fingerprints: dict|None ({'public': list, 'secret': list} current key chain fingerprints, None lists
+            them now)
+        :return: int (amount of indexed PGP keys)
         """
-        Iterates through retrieved PGP private keys, get the RSA semi-primes information (from pgpdump),
+        # Key chain files state the index is up to date with, taken before the key chain is read, so changes made
+        # meanwhile are picked up by the next sync_key_index
+        keyring_state = self.keyring_watcher.stat()
+
+        if fingerprints is None:
+            fingerprints = self._list_key_chain_fingerprints()
+
+        index = {}
+        entries = self._parse_public_key_entries(self._retrieve_local_pgp_keys_bulk(False))
+
+        for entry in entries:
+            index[bytes.fromhex(entry['keyid'])] = entry
+            index[bytes.fromhex(entry['fingerprint'])] = entry
+
+        if entries:
+            self._attach_private_keys(index, entries, self._retrieve_local_pgp_keys_bulk(True))
+
+        with self._key_index_lock:
+            self._key_index = index
+            self._key_entries = entries
+            self._key_chain_fingerprints = {kind: set(fingerprints[kind]) for kind in ('public', 'secret')}
+            self.keyring_watcher.reset(keyring_state)
+
+        self.logger.info('PGP key index is built: ' + str(len(entries)) + ' keys.')
+
+        return len(entries)
+
+    def sync_key_index(self, force=False):
+        """
+        Brings PGP key index up to date with the key chain changed by this or any other process. Key chain
+            fingerprints are listed and compared with the indexed ones, only added keys are exported and parsed,
+            entries (and cached RSA key instances) of removed keys are dropped.
+
+        @developer: tnanoba
+
+        Unless force is True nothing is done when key chain files did not change (see KeyringWatcher).
+            Not yet built index is left to be built on the next lookup.
+
+        :param force: bool
+        :return: dict|None ({'added': int, 'removed': int} amount of changed entries, None if nothing was checked)
+        """
+        changed = self.keyring_watcher.changed()
+
+        if self._key_index is None or not (changed or force):
+            return None
+
+        fingerprints = self._list_key_chain_fingerprints()
+        current = {kind: set(fingerprints[kind]) for kind in ('public', 'secret')}
+
+        with self._key_index_lock:
+            index = dict(self._key_index)
+            entries = list(self._key_entries)
+            known = self._key_chain_fingerprints or {'public': set(), 'secret': set()}
+
+        removed_public = known['public'] - current['public']
+        removed_secret = known['secret'] - current['secret']
+        added_public = current['public'] - known['public']
+        added_secret = current['secret'] - known['secret']
+
+        removed = 0
+
+        for fingerprint in removed_public | removed_secret:
+            self.invalidate_cached_key(fingerprint)
+
+            entry = index.get(bytes.fromhex(fingerprint))
+
+            if entry is None:
+                continue
+
+            entries.remove(entry)
+
+            if fingerprint in removed_public:
+                del index[bytes.fromhex(entry['keyid'])]
+                del index[bytes.fromhex(entry['fingerprint'])]
+                removed += 1
+            else:
+                # Public key stays in the key chain, its private key is gone
+                entry = dict(entry, private_key=None)
+                entries.append(entry)
+                index[bytes.fromhex(entry['keyid'])] = entry
+                index[bytes.fromhex(entry['fingerprint'])] = entry
+
+        added = []
+
+        if added_public:
+            added = self._parse_public_key_entries(self._retrieve_local_pgp_keys_bulk(False, sorted(added_public)))
+
+            for entry in added:
+                entries.append(entry)
+                index[bytes.fromhex(entry['keyid'])] = entry
+                index[bytes.fromhex(entry['fingerprint'])] = entry
+
+        # Private keys of the added public keys and the ones imported for already indexed public keys
+        secret_ids = sorted(fingerprint for fingerprint in current['secret']
+                            if fingerprint in added_secret or fingerprint in added_public)
+
+        if secret_ids:
+            self._attach_private_keys(index, entries, self._retrieve_local_pgp_keys_bulk(True, secret_ids))
+
+        with self._key_index_lock:
+            self._key_index = index
+            self._key_entries = entries
+            self._key_chain_fingerprints = current
+
+        self.logger.info('PGP key index is synchronized: ' + str(len(added)) + ' keys added, ' + str(removed) +
+                         ' keys removed.')
+
+        return {'added': len(added), 'removed': removed}
+
+    def _parse_public_key_entries(self, public_keys):
+        """
+        Parses binary public keys export into PGP key index entries (see build_key_index)
+
+        :param public_keys: bytes|None
+        :return: list
+        """
+        entries = []
+
+        for pgp_key in self._split_pgp_keys(public_keys) if public_keys else []:
+            try:
+                key = pgp_parser.parse_rsa_key(pgp_key)
+
+                if key.version != 4:
+                    continue
+
+                entries.append({
+                    'keyid': key.key_id.hex().upper(),
+                    'fingerprint': key.fingerprint.hex().upper(),
+                    'public_key': self.compute_rsa_public_key(key.e, key.n),
+                    'private_key': None,
+                })
+            except Exception as ERROR:
+                self.logger.error(ERROR)
+
+        return entries
+
+    def _attach_private_keys(self, index, entries, secret_keys):
+        """
+        Parses binary private keys export and sets private keys of PGP key index entries. Entries are replaced by
+            their copies in both index and entries list, so entries already handed out to other threads do not change.
+
+        :param index: dict
+        :param entries: list
+        :param secret_keys: bytes|None
+        :return: int (amount of attached private keys)
+        """
+        attached = 0
+
+        for pgp_key in self._split_pgp_keys(secret_keys) if secret_keys else []:
+            try:
+                key = pgp_parser.parse_rsa_key(pgp_key)
+                entry = index.get(key.fingerprint)
+
+                if entry is None:
+                    continue
+
+                private_key = self.compute_rsa_private_key(key.p, key.q, key.e, key.n, key.d)
+            except Exception as ERROR:
+                self.logger.error(ERROR)
+                continue
+
+            copy = dict(entry, private_key=private_key)
+            entries[entries.index(entry)] = copy
+            index[key.key_id] = copy
+            index[key.fingerprint] = copy
+            attached += 1
+
+        return attached
+
+    def reset_key_index(self):
+        """
+        Drops PGP key index, it is rebuilt on the next lookup
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        with self._key_index_lock:
+            self._key_index = None
+            self._key_entries = []
+            self._key_chain_fingerprints = None
+
+    def get_pgp_key_entry(self, pgp_id):
+        """
+        Looks PGP key entry (see build_key_index) up in the index by its keyid or fingerprint
+
+        @developer: tnanoba
+
+            E.g
+                raw keyid => b'\\x07\\xb4\\xde\\x99\\x99\\x06\\x52\\x38' (bytes as Crypto.disassemble_message_packet
+                    passes it)
+                short keyid format => 99065238 (the first matching key is returned, as gpg does)
+                keyid format => 07B4DE9999065238
+                fingerprint format => A7F154AA151349A1D3E5637F07B4DE9999065238 (or 20 raw bytes)
+
+        :param pgp_id: bytes|str
+        :return: dict|None
+        """
+        try:
+            pgp_id = self._parse_pgp_id(pgp_id)
+            index = self._get_key_index()
+
+            if len(pgp_id) != 4:
+                return index.get(pgp_id)
+
+            with self._key_index_lock:
+                entries = list(self._key_entries)
+
+            return next((entry for entry in entries if entry['keyid'].endswith(pgp_id.hex().upper())), None)
+        except Exception as ERROR:
+            self.logger.error(ERROR)
+            return None
+
+    def get_pk_by_pgp_id(self, pgp_id):
+        """
+        Returns RSA public key of PGP key with provided keyid/fingerprint (see get_pgp_key_entry), None if there is
+            no such key. For an all-zero keyid returns a tuple of public keys of all plain (non-PGP) RSA and Ed25519
+            user keys.
+
+        @developer: tnanoba
+
+        :param pgp_id: bytes|str
+        :return: object|tuple|None
+        """
+        try:
+            if not any(self._parse_pgp_id(pgp_id)):
+                return tuple(plain_key.public_key() for plain_key in self.plain_keys + self.ed25519_keys)
+        except Exception as ERROR:
+            self.logger.error(ERROR)
+            return None
+
+        entry = self.get_pgp_key_entry(pgp_id)
+
+        return None if entry is None else entry['public_key']
+
+    def get_sign_list(self, pgp_id):
+        """
+        Returns sign list for Crypto.assemble_message_packet: [RSA private key, raw 8 bytes keyid], None if there is
+            no such PGP private key.
+
+        @developer: tnanoba
+
+        :param pgp_id: bytes|str (see get_pgp_key_entry)
+        :return: list|None
+        """
+        entry = self.get_pgp_key_entry(pgp_id)
+
+        if entry is None or entry['private_key'] is None:
+            return None
+
+        return [entry['private_key'], bytes.fromhex(entry['keyid'])]
+
+    def yield_keys(self):
+        """
+        Yields all user RSA private keys, PGP ones (from PGP key index) followed by plain ones
+
+        @developer: tnanoba
+
+        :return: Generator
+        """
+        self._get_key_index()
+
+        with self._key_index_lock:
+            entries = list(self._key_entries)
+
+        for entry in entries:
+            if entry['private_key'] is not None:
+                yield entry['private_key']
+
+        for plain_key in list(self.plain_keys):
+            yield plain_key
+
+    def _get_key_index(self):
+        """
+        Returns PGP key index building it on the first call, synchronizes it with the key chain when key chain files
+            have changed (polled every keyring_poll_interval seconds)
+
+        :return: dict
+        """
+        if self._key_index is not None and self.keyring_watcher.poll():
+            self.sync_key_index(True)
+
+        index = self._key_index
+
+        if index is None:
+            self.build_key_index()
+
+            index = self._key_index
+
+        return index
+
+    @staticmethod
+    def _parse_pgp_id(pgp_id):
+        """
+        Converts PGP key ID to raw bytes. Bytes are taken as raw keyid/fingerprint, strings as hexadecimal short
+            keyid (8 digits), keyid (16 digits) or fingerprint (40 digits).
+
+        @developer: tnanoba
+
+        :param pgp_id: bytes|str
+        :return: bytes
+        """
+        if isinstance(pgp_id, str):
+            key_id = KeyManager._normalize_key_id(pgp_id)
+
+            if len(key_id) not in (8, 16, 40):
+                raise ValueError('Invalid PGP key ID: ' + pgp_id)
+
+            return bytes.fromhex(key_id)
+
+        return bytes(pgp_id)
+
+    @staticmethod
+    def _normalize_key_id(key_id):
+        """
+        Converts keyid/fingerprint to a canonical form (upper case hexadecimal without "0x" prefix and spaces)
+
+        @developer: tnanoba
+
+        :param key_id: str
+        :return: str
+        """
+        key_id = key_id.replace(' ', '').upper()
+
+        return key_id[2:] if key_id.startswith('0X') else key_id
+
+    def get_pgp_rsa_keys(self, limit=30, secret=True, key_ids=None):
+        """
+        Iterates through retrieved PGP private keys, get the RSA semi-primes information (see pgp_parser),
         invokes _return_rsa_key_from_pgp private method and yields returned data.
 
         @developer: tnanoba
 
+        All the keys (or the ones listed in key_ids) are exported with a single gpg invocation,
+            the exported packet stream is then split per key (see _split_pgp_keys).
+
         :param limit: int
         :param secret: bool (True for private key, False for public key)
+        :param key_ids: list|None (keyids/fingerprints of keys to retrieve, None for the whole key chain)
         :return: Generator
         """
         try:
@@ -102,8 +801,13 @@ class KeyManager(GnuPGWrapper):
             if not isinstance(limit, int) or limit == 0:
                 raise ValueError
 
-            for count, gpg_key in enumerate(self._retrieve_local_pgp_keys(secret)):
-                yield self._return_rsa_key_from_pgp(gpg_key.encode('utf-8'), secret)
+            pgp_keys = self._retrieve_local_pgp_keys_bulk(secret, key_ids)
+
+            if isinstance(pgp_keys, type(None)):
+                return None
+
+            for count, pgp_key in enumerate(self._split_pgp_keys(pgp_keys)):
+                yield self._return_rsa_key_from_pgp(pgp_key, secret)
 
                 # Terminates on specified limit
                 if count == limit - 1:
@@ -112,74 +816,76 @@ class KeyManager(GnuPGWrapper):
             self.logger.error(ERROR)
             return None
 
-    def _return_rsa_key_from_pgp(self, pgp_key, secret):
+    @staticmethod
+    def _split_pgp_keys(pgp_keys):
         """
-        Accepts pgp_key bytes, process it to pgpdump packets, which is a Generator class with following
-        consisting objects:
+        Splits export of several PGP keys into binary packet streams of separate keys (see pgp_parser.split_keys).
 
         @developer: tnanoba
 
-            SecretKeyPacket object
-            UserIDPacket object
-            SignaturePacket object
+        Every stream starts with a primary key packet (secret key, tag 5 or public key, tag 6) and holds
+            all the following packets (user IDs, signatures, subkeys) up to the next primary key.
+            Only packet headers are parsed here.
 
-            SecretKeyPacket object dict structure:
+        :param pgp_keys: bytes (binary or ASCII armored PGP keys)
+        :return: Generator (of bytes)
+        """
+        return pgp_parser.split_keys(KeyManager._dearmor_pgp_key(pgp_keys))
 
-                {
-                    'prime_p': '...', (p)
-                    'prime_q': '...', (q)
-                    'exponent': '...', (e)
-                    'modulus': '...', (p * q = n)
-                    'exponent_d': '...', (d)
-                    'data': '...',
-                    'raw_creation_time': '...',
-                    's2k_type': '...',
-                    'checksum': '...',
-                    'pubkey_version': '...',
-                    'exponent_x': '...',
-                    's2k_id': '...',
-                    's2k_cipher': '...',
-                    'new': '...',
-                    'creation_time': '...',
-                    'fingerprint': '...',
-                    'multiplicative_inverse': '...',
-                    'raw': '...',
-                    'prime': '...',
-                    'length': '...',
-                    'group_gen': '...',
-                    'pub_algorithm_type': '...',
-                    'raw_days_valid': '...',
-                    'name': '...',
-                    'key_id': '...',
-                    's2k_hash': '...',
-                    'raw_pub_algorithm': '...',
-                    'expiration_time': '...',
-                    's2k_iv': '...',
-                    'group_order': '...'
-                }
+    @staticmethod
+    def _dearmor_pgp_key(pgp_key):
+        """
+        Converts ASCII armored PGP data to binary one, binary data is returned as it is
+
+        @developer: tnanoba
+
+        :param pgp_key: bytes|str
+        :return: bytes
+        """
+        # Binary packet streams always start with the 7th bit set, armor starts with "-----BEGIN"
+        if isinstance(pgp_key, (bytes, bytearray)) and pgp_key[:1] and pgp_key[0] & 0x80:
+            return bytes(pgp_key)
+
+        return pgp_parser.dearmor(pgp_key)
+
+    def _return_rsa_key_from_pgp(self, pgp_key, secret):
+        """
+        Accepts pgp_key bytes (binary or ASCII armored), parses its first key packet with pgp_parser and returns RSA
+            (private|public) key of it.
+
+        @developer: tnanoba
+
+            Only the RSA numbers are read out of the key packet (pgp_parser.RSAKey):
+
+                RSAKey(
+                    tag=5,
+                    version=4,
+                    creation_time=...,
+                    key_id=b'...', (8 bytes)
+                    fingerprint=b'...', (20 bytes)
+                    n=..., (p * q = n)
+                    e=..., (e)
+                    d=..., (d, None for public key packets)
+                    p=..., (p, None for public key packets)
+                    q=..., (q, None for public key packets)
+                    u=..., (p ^ -1 mod q, None for public key packets)
+                )
+
+            Packets following the first key packet (user IDs, signatures, subkeys) are not parsed at all.
 
         :param pgp_key: bytes
         :param secret: bool
         :return: object
         """
         try:
-            packets = list(pgpdump.AsciiData(pgp_key).packets())
+            key = pgp_parser.parse_rsa_key(self._dearmor_pgp_key(pgp_key))
 
             if secret:
                 # Returns RSA private key instance
-                return self.compute_rsa_private_key(
-                    packets[0].__dict__['prime_p'],
-                    packets[0].__dict__['prime_q'],
-                    packets[0].__dict__['exponent'],
-                    packets[0].__dict__['modulus'],
-                    packets[0].__dict__['exponent_d']
-                )
+                return self.compute_rsa_private_key(key.p, key.q, key.e, key.n, key.d)
             else:
                 # Returns RSA public key instance
-                return self.compute_rsa_public_key(
-                    packets[0].__dict__['exponent'],
-                    packets[0].__dict__['modulus'],
-                )
+                return self.compute_rsa_public_key(key.e, key.n)
         except Exception as ERROR:
             self.logger.error(ERROR)
 
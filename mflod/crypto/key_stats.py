@@ -0,0 +1,164 @@
+import threading
+from cryptography.hazmat.primitives.serialization import Encoding, \
+    PublicFormat
+
+
+class KeyHitStats(object):
+    """ Per-key hit statistics for header trial decryption
+
+    Disassembly of a message packet tries user private keys one by one until
+    one of them decrypts a header. As traffic is usually skewed towards a
+    couple of keys, the statistics collected here allow to try those first.
+    The counters are also useful on their own to see how many RSA operations
+    an average packet costs.
+
+    Keys are identified by their RSA modulus (raw public key for X25519 keys)
+    so the statistics survive key objects being recreated by a key manager
+    between calls.
+
+    Developers:
+        - ddnomad (Artem Fliunt)
+
+    """
+
+    # ordering policies
+    MOST_FREQUENT = 'mfu'
+    MOST_RECENT = 'mru'
+
+    def __init__(self, policy=MOST_FREQUENT):
+        """ Initialization method
+
+        :param policy:  string ordering policy: MOST_FREQUENT puts keys that
+                        matched most often first, MOST_RECENT puts the keys
+                        that matched last first
+
+        """
+
+        if policy not in (self.MOST_FREQUENT, self.MOST_RECENT):
+            raise ValueError("unknown key ordering policy: %s" % policy)
+
+        self.policy = policy
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ Drop all collected statistics
+
+        :return: void
+
+        """
+
+        with self.__lock:
+
+            # modulus -> [hit count, sequence number of the last hit]
+            self.__key_hits = {}
+
+            # packet level counters
+            self.packets = 0
+            self.hits = 0
+            self.misses = 0
+            self.trial_decryptions = 0
+
+    def order(self, user_keys):
+        """ Sort user keys so the most promising ones go first
+
+        Keys that never matched keep their relative order and go last.
+
+        :param user_keys: iterable of cryptography.hazmat.primitives.
+                          asymmetric.rsa.RSAPrivateKey instances
+
+        :return: list of the same keys in a trial order
+
+        """
+
+        with self.__lock:
+            key_hits = dict(self.__key_hits)
+
+        if not key_hits:
+            return list(user_keys)
+
+        # sort key that corresponds to a selected policy
+        if self.policy == self.MOST_FREQUENT:
+            def rank(user_sk):
+                hits = key_hits.get(self.__key_id(user_sk), (0, 0))
+                return -hits[0], -hits[1]
+        else:
+            def rank(user_sk):
+                hits = key_hits.get(self.__key_id(user_sk), (0, 0))
+                return -hits[1]
+
+        # sorted() is stable so untouched keys preserve their order
+        return sorted(user_keys, key=rank)
+
+    def count_trial(self):
+        """ Account a single RSA trial decryption
+
+        :return: void
+
+        """
+
+        with self.__lock:
+            self.trial_decryptions += 1
+
+    def record_packet(self, user_sk):
+        """ Account a result of a header trial decryption
+
+        :param user_sk: matching instance of cryptography.hazmat.primitives.
+                        asymmetric.rsa.RSAPrivateKey or None if the packet
+                        was not addressed to a user
+
+        :return: void
+
+        """
+
+        with self.__lock:
+            self.packets += 1
+
+            if user_sk is None:
+                self.misses += 1
+                return
+
+            self.hits += 1
+            hits = self.__key_hits.setdefault(self.__key_id(user_sk), [0, 0])
+            hits[0] += 1
+            hits[1] = self.packets
+
+    def get_key_hits(self, user_sk):
+        """ Get amount of packets a particular key has decrypted
+
+        :param user_sk: instance of cryptography.hazmat.primitives.
+                        asymmetric.rsa.RSAPrivateKey
+
+        :return: integer hit count
+
+        """
+
+        with self.__lock:
+            return self.__key_hits.get(self.__key_id(user_sk), [0])[0]
+
+    def trials_per_packet(self):
+        """ Average amount of RSA trial decryptions per packet
+
+        :return: float (0.0 if no packets were processed yet)
+
+        """
+
+        with self.__lock:
+            if not self.packets:
+                return 0.0
+            return self.trial_decryptions / self.packets
+
+    @staticmethod
+    def __key_id(user_sk):
+        """ Get a stable identifier of a private key
+
+        :param user_sk: RSA or X25519 private key instance
+
+        :return: integer RSA modulus or bytes raw X25519 public key
+
+        """
+
+        public_key = user_sk.public_key()
+        if hasattr(public_key, 'public_numbers'):
+            return public_key.public_numbers().n
+        return public_key.public_bytes(Encoding.Raw, PublicFormat.Raw)
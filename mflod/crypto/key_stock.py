@@ -0,0 +1,218 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def generate_rsa_key_der(key_size, public_exponent=65537):
+    """
+    Generates RSA private key and returns it DER (PKCS#8) encoded, cryptography lib instances can not be passed
+        between processes
+
+    @developer: tnanoba
+
+    :param key_size: int
+    :param public_exponent: int
+    :return: bytes
+    """
+    key = rsa.generate_private_key(public_exponent=public_exponent, key_size=key_size, backend=default_backend())
+
+    return key.private_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+
+class KeyStock(object):
+    """
+    Class keeps a stock of pre-generated RSA private keys per key size
+
+    Keys are generated in a background process pool, so take hands a ready key out instantly and schedules
+    a replacement. When the stock of a size runs out, the key is generated inline (and counted as a miss).
+
+    Developers:
+        - (tnanoba) Tornike Nanobashvili
+    """
+
+    # Completion times kept per key size for refill rate computation
+    RATE_WINDOW = 32
+
+    def __init__(self, stock_size=4, key_sizes=(2048,), max_workers=None, executor=None):
+        """
+        Initialize KeyStock and starts filling the stock
+
+        @:param stock_size: int|dict (amount of ready keys kept per key size, or key size => amount)
+        @:param key_sizes: tuple (stocked key sizes, ignored when stock_size is a dict)
+        @:param max_workers: int|None (process pool size, defaults to amount of CPUs)
+        @:param executor: concurrent.futures.Executor|None (defaults to a new ProcessPoolExecutor)
+        """
+        if isinstance(stock_size, dict):
+            self.targets = dict(stock_size)
+        else:
+            self.targets = {key_size: stock_size for key_size in key_sizes}
+
+        self.executor = executor if executor is not None else ProcessPoolExecutor(max_workers)
+
+        # Re-entrant, a done callback runs in the submitting thread if the key is already generated
+        self._lock = threading.RLock()
+        self._keys = {key_size: deque() for key_size in self.targets}
+        self._pending = {key_size: set() for key_size in self.targets}
+        self._completed = {key_size: deque(maxlen=self.RATE_WINDOW) for key_size in self.targets}
+        self._closed = False
+
+        self.generated = dict.fromkeys(self.targets, 0)
+        self.taken = dict.fromkeys(self.targets, 0)
+        self.misses = dict.fromkeys(self.targets, 0)
+        self.failures = dict.fromkeys(self.targets, 0)
+
+        self.logger = logging.getLogger(__name__)
+
+        for key_size in self.targets:
+            self.refill(key_size)
+
+    def take(self, key_size=2048):
+        """
+        Hands a stocked RSA private key of key_size bits out and schedules a replacement, generates the key inline
+            if the stock is empty
+
+        @developer: tnanoba
+
+        :param key_size: int
+        :return: object (cryptography lib RSA private key instance)
+        """
+        with self._lock:
+            keys = self._keys.get(key_size)
+            key = keys.popleft() if keys else None
+
+            if key_size in self.targets:
+                self.taken[key_size] += 1
+
+                if key is None:
+                    self.misses[key_size] += 1
+
+        if key_size in self.targets:
+            self.refill(key_size)
+
+        if key is None:
+            key = rsa.generate_private_key(public_exponent=65537, key_size=key_size, backend=default_backend())
+
+        return key
+
+    def refill(self, key_size):
+        """
+        Schedules generation of as many keys as the stock of key_size lacks (pending ones included)
+
+        @developer: tnanoba
+
+        :param key_size: int
+        :return: int (amount of scheduled keys)
+        """
+        with self._lock:
+            if self._closed:
+                return 0
+
+            missing = self.targets[key_size] - len(self._keys[key_size]) - len(self._pending[key_size])
+
+            for _ in range(missing):
+                future = self.executor.submit(generate_rsa_key_der, key_size)
+                self._pending[key_size].add(future)
+                future.add_done_callback(lambda done, size=key_size: self._on_generated(size, done))
+
+        return max(missing, 0)
+
+    def _on_generated(self, key_size, future):
+        """
+        Moves a generated key into the stock
+
+        :param key_size: int
+        :param future: concurrent.futures.Future
+        :return: void
+        """
+        try:
+            key = serialization.load_der_private_key(future.result(), None, default_backend())
+        except Exception as ERROR:
+            self.logger.error(ERROR)
+            key = None
+
+        with self._lock:
+            self._pending[key_size].discard(future)
+
+            if key is None:
+                self.failures[key_size] += 1
+                return
+
+            self._keys[key_size].append(key)
+            self._completed[key_size].append(time.monotonic())
+            self.generated[key_size] += 1
+
+    def wait(self, timeout=None):
+        """
+        Waits until the stock of every key size is full
+
+        @developer: tnanoba
+
+        :param timeout: int|float|None (seconds, None waits forever)
+        :return: bool (True if the stock is full)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                if all(len(self._keys[key_size]) >= target for key_size, target in self.targets.items()):
+                    return True
+
+                if not any(self._pending.values()):
+                    return False
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+            time.sleep(0.01)
+
+    def get_stats(self):
+        """
+        Returns stock metrics per key size: stock level and target, pending generations, generated, taken and
+            missed (generated inline) keys and refill rate (keys per second over the last RATE_WINDOW generations)
+
+        @developer: tnanoba
+
+        :return: dict
+        """
+        stats = {}
+
+        with self._lock:
+            for key_size, target in self.targets.items():
+                completed = self._completed[key_size]
+                span = completed[-1] - completed[0] if len(completed) > 1 else 0
+
+                stats[key_size] = {
+                    'level': len(self._keys[key_size]),
+                    'target': target,
+                    'pending': len(self._pending[key_size]),
+                    'generated': self.generated[key_size],
+                    'taken': self.taken[key_size],
+                    'misses': self.misses[key_size],
+                    'failures': self.failures[key_size],
+                    'refill_rate': (len(completed) - 1) / span if span else 0.0,
+                }
+
+        return stats
+
+    def close(self, wait=True):
+        """
+        Stops refilling and shuts the executor down, stocked keys can still be taken
+
+        @developer: tnanoba
+
+        :param wait: bool (wait for pending generations to finish)
+        :return: void
+        """
+        with self._lock:
+            self._closed = True
+
+        self.executor.shutdown(wait=wait)
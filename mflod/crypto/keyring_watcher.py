@@ -0,0 +1,95 @@
+import os
+import time
+
+
+class KeyringWatcher(object):
+    """
+    Class detects changes of GnuPG key chain files by polling their modification time and size
+
+    Watched are both GnuPG 2.1+ (pubring.kbx, private-keys-v1.d directory) and legacy (pubring.gpg, secring.gpg)
+    key chain files, missing ones are watched for appearing. A key import or deletion made by any process
+    (gpg command line included) touches at least one of them.
+
+    Developers:
+        - (tnanoba) Tornike Nanobashvili
+    """
+
+    KEYRING_FILES = ('pubring.kbx', 'pubring.gpg', 'secring.gpg', 'private-keys-v1.d')
+
+    def __init__(self, gnupg_home_dir, poll_interval=1.0, clock=time.monotonic):
+        """
+        Initialize KeyringWatcher and records current state of key chain files
+
+        @:param gnupg_home_dir: str
+        @:param poll_interval: int|float|None (minimal seconds between two polls made by poll, None disables polling)
+        @:param clock: callable (returns current time in seconds, defaults to time.monotonic)
+        """
+        self.paths = [os.path.join(gnupg_home_dir, name) for name in self.KEYRING_FILES]
+        self.poll_interval = poll_interval
+        self.clock = clock
+
+        self._state = self.stat()
+        self._last_poll = clock()
+
+    def stat(self):
+        """
+        Returns modification time and size of every watched file (None for missing ones)
+
+        @developer: tnanoba
+
+        :return: tuple
+        """
+        state = []
+
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                state.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                state.append(None)
+
+        return tuple(state)
+
+    def changed(self):
+        """
+        Checks whether key chain files have changed since the previous check and records their current state
+
+        @developer: tnanoba
+
+        :return: bool
+        """
+        state = self.stat()
+        self._last_poll = self.clock()
+
+        if state == self._state:
+            return False
+
+        self._state = state
+
+        return True
+
+    def poll(self):
+        """
+        Same as changed, but checks key chain files at most once per poll_interval seconds
+
+        @developer: tnanoba
+
+        :return: bool
+        """
+        if self.poll_interval is None or self.clock() - self._last_poll < self.poll_interval:
+            return False
+
+        return self.changed()
+
+    def reset(self, state=None):
+        """
+        Records state of key chain files further checks compare with, e.g. the one taken (see stat) before the key
+            chain was listed
+
+        @developer: tnanoba
+
+        :param state: tuple|None (see stat, None takes the current one)
+        :return: void
+        """
+        self._state = self.stat() if state is None else state
+        self._last_poll = self.clock()
@@ -8,8 +8,25 @@ class LogStrings(object):
     AES_DEC_CALL = 'starting AES decription routine'
     DISASSEMBLE_MESSAGE_PACKET_CALL = 'starting message packet ' + \
                                       'disassembly (brute forcing keys)'
+    ASSEMBLE_STREAM_CALL = 'starting streaming message packet assembly'
+    ASSEMBLE_MANY_CALL = 'starting batch message packet assembly'
+    ASSEMBLE_FOR_RECIPIENTS_CALL = 'starting message packet assembly ' + \
+        'for several recipients'
+    DISASSEMBLE_MANY_CALL = 'starting batch message packet disassembly'
+    DISASSEMBLE_STREAM_CALL = 'starting streaming message packet ' + \
+                              'disassembly'
+    PACKET_DECODING_FAILED = 'failed to decode a message packet from DER'
+    UNSUPPORTED_PROTOCOL_VERSION = 'message packet protocol version is ' + \
+                                   'not supported'
+    GCM_TAG_VERIFICATION_FAILED = 'AES-GCM authentication tag ' + \
+                                  'verification failed'
+    CONTENT_ALGORITHM_MISMATCH = 'content encryption algorithm does not ' + \
+                                 'match HMAC block'
     ATTEMPT_DECRYPT_HEADER = 'trying to decrypt init header block'
     INVALID_RSA_KEY = 'decryption failed because of an invalid RSA key'
+    RSA_KEY_SIZE_MISMATCH = 'skipping RSA key as its size does not fit ' + \
+                            'a header length'
+    WRONG_X25519_KEY = 'decryption failed as X25519 key does not match'
     WRONG_RSA_KEY = 'decryption failed as RSA key does not match'
     MESSAGE_FOR_USER = 'the message received can be decrypted and was ' + \
                        'intended for a user'
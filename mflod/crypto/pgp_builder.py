@@ -0,0 +1,153 @@
+""" Minimal OpenPGP writer of RSA keys
+
+Counterpart of pgp_parser: turns a cryptography lib RSA private key into a
+transferable secret key (unprotected v4 secret key packet, user ID packet and
+positive self-certification), which gpg --import accepts. This lets RSA keys
+generated outside of gpg (see key_stock) become PGP keys of a key chain.
+
+@link https://tools.ietf.org/html/rfc4880
+
+Developers:
+    - (tnanoba) Tornike Nanobashvili
+"""
+import time
+import hashlib
+from mflod.crypto.pgp_parser import TAG_SECRET_KEY
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+
+TAG_SIGNATURE = 2
+TAG_USER_ID = 13
+
+# Signature type: positive certification of a user ID and public key packet
+SIG_POSITIVE_CERTIFICATION = 0x13
+
+PUBLIC_KEY_ALGORITHM_RSA = 1
+HASH_ALGORITHM_SHA256 = 8
+
+# Signature subpacket types
+SUBPACKET_CREATION_TIME = 2
+SUBPACKET_ISSUER = 16
+SUBPACKET_KEY_FLAGS = 27
+SUBPACKET_ISSUER_FINGERPRINT = 33
+
+# Certify, sign, encrypt communications and encrypt storage
+KEY_FLAGS_ALL = 0x0f
+
+
+def write_mpi(value):
+    """
+    Encodes multiprecision integer (two octets bit count followed by big-endian value)
+
+    :param value: int
+    :return: bytes
+    """
+    return value.bit_length().to_bytes(2, 'big') + value.to_bytes((value.bit_length() + 7) // 8, 'big')
+
+
+def write_packet(tag, body):
+    """
+    Encodes new format packet
+
+    @link https://tools.ietf.org/html/rfc4880#section-4.2.2
+
+    :param tag: int
+    :param body: bytes
+    :return: bytes
+    """
+    length = len(body)
+
+    if length < 192:
+        header = bytes([0xc0 | tag, length])
+    elif length < 8384:
+        header = bytes([0xc0 | tag, ((length - 192) >> 8) + 192, (length - 192) & 0xff])
+    else:
+        header = bytes([0xc0 | tag, 255]) + length.to_bytes(4, 'big')
+
+    return header + body
+
+
+def write_subpacket(subpacket_type, data):
+    """
+    Encodes signature subpacket (data shorter than 191 octets only)
+
+    :param subpacket_type: int
+    :param data: bytes
+    :return: bytes
+    """
+    return bytes([len(data) + 1, subpacket_type]) + data
+
+
+def public_key_body(rsa_key, creation_time):
+    """
+    Builds v4 RSA public key packet body
+
+    :param rsa_key: object (cryptography lib RSA private or public key instance)
+    :param creation_time: int
+    :return: bytes
+    """
+    public_key = rsa_key.public_key() if hasattr(rsa_key, 'private_numbers') else rsa_key
+    numbers = public_key.public_numbers()
+
+    return b'\x04' + creation_time.to_bytes(4, 'big') + bytes([PUBLIC_KEY_ALGORITHM_RSA]) + write_mpi(numbers.n) + \
+        write_mpi(numbers.e)
+
+
+def fingerprint(public_body):
+    """
+    Computes v4 key fingerprint of public key packet body
+
+    :param public_body: bytes
+    :return: bytes (20 bytes SHA1)
+    """
+    return hashlib.sha1(b'\x99' + len(public_body).to_bytes(2, 'big') + public_body).digest()
+
+
+def build_secret_key(rsa_key, user_id, creation_time=None):
+    """
+    Builds transferable secret key of RSA private key: unprotected secret key packet, user ID packet and its
+        self-certification signature
+
+    @developer: tnanoba
+
+    :param rsa_key: object (cryptography lib RSA private key instance)
+    :param user_id: str (e.g. "Auto Generated Key (Generated by KeyManager) <user@host>")
+    :param creation_time: int|None (unix timestamp, None for now)
+    :return: tuple (bytes binary key, str HEX fingerprint)
+    """
+    if creation_time is None:
+        creation_time = int(time.time())
+
+    numbers = rsa_key.private_numbers()
+    public_body = public_key_body(rsa_key, creation_time)
+    key_fingerprint = fingerprint(public_body)
+
+    # OpenPGP requires p < q and u = p ^ -1 mod q
+    p, q = sorted([numbers.p, numbers.q])
+    secret = write_mpi(numbers.d) + write_mpi(p) + write_mpi(q) + write_mpi(pow(p, -1, q))
+    secret_body = public_body + b'\x00' + secret + (sum(secret) % 65536).to_bytes(2, 'big')
+
+    user_id = user_id.encode('utf-8')
+
+    hashed_subpackets = write_subpacket(SUBPACKET_CREATION_TIME, creation_time.to_bytes(4, 'big')) + \
+        write_subpacket(SUBPACKET_KEY_FLAGS, bytes([KEY_FLAGS_ALL])) + \
+        write_subpacket(SUBPACKET_ISSUER_FINGERPRINT, b'\x04' + key_fingerprint)
+    unhashed_subpackets = write_subpacket(SUBPACKET_ISSUER, key_fingerprint[-8:])
+
+    hashed_part = bytes([4, SIG_POSITIVE_CERTIFICATION, PUBLIC_KEY_ALGORITHM_RSA, HASH_ALGORITHM_SHA256]) + \
+        len(hashed_subpackets).to_bytes(2, 'big') + hashed_subpackets
+
+    # Signed data: public key, user ID, hashed part of the signature and its trailer
+    signed_data = b'\x99' + len(public_body).to_bytes(2, 'big') + public_body + \
+        b'\xb4' + len(user_id).to_bytes(4, 'big') + user_id + \
+        hashed_part + b'\x04\xff' + len(hashed_part).to_bytes(4, 'big')
+
+    signature = rsa_key.sign(signed_data, padding.PKCS1v15(), hashes.SHA256())
+
+    signature_body = hashed_part + len(unhashed_subpackets).to_bytes(2, 'big') + unhashed_subpackets + \
+        hashlib.sha256(signed_data).digest()[:2] + write_mpi(int.from_bytes(signature, 'big'))
+
+    key = write_packet(TAG_SECRET_KEY, secret_body) + write_packet(TAG_USER_ID, user_id) + \
+        write_packet(TAG_SIGNATURE, signature_body)
+
+    return key, key_fingerprint.hex().upper()
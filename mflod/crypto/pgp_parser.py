@@ -0,0 +1,321 @@
+""" Minimal OpenPGP parser of RSA key material
+
+KeyManager only needs RSA numbers, keyid and fingerprint of primary keys out of
+gpg exports, so instead of a generic packet dump (pgpdump decodes every packet
+of an export into Python objects) this module walks packet headers of binary
+(non-armored) data and decodes key packet bodies only.
+
+Supported are unprotected (s2k usage 0) v3 and v4 RSA key packets, which is
+what gpg exports for keys without a passphrase.
+
+@link https://tools.ietf.org/html/rfc4880
+
+Developers:
+    - (tnanoba) Tornike Nanobashvili
+"""
+import base64
+import hashlib
+from collections import namedtuple
+from mflod.crypto.exceptions import PGPParsingError
+
+
+# Packet tags
+TAG_SECRET_KEY = 5
+TAG_PUBLIC_KEY = 6
+TAG_SECRET_SUBKEY = 7
+TAG_PUBLIC_SUBKEY = 14
+
+PRIMARY_KEY_TAGS = (TAG_SECRET_KEY, TAG_PUBLIC_KEY)
+KEY_TAGS = PRIMARY_KEY_TAGS + (TAG_SECRET_SUBKEY, TAG_PUBLIC_SUBKEY)
+
+# RSA (encrypt or sign), RSA encrypt-only, RSA sign-only
+RSA_ALGORITHMS = (1, 2, 3)
+
+# RSA key material of a single key packet, secret numbers (d, p, q, u) are None for public key packets
+RSAKey = namedtuple('RSAKey', ['tag', 'version', 'creation_time', 'key_id', 'fingerprint', 'n', 'e', 'd', 'p', 'q',
+                               'u'])
+
+
+def dearmor(armored):
+    """
+    Decodes ASCII armored data and verifies its CRC24 checksum
+
+    @developer: tnanoba
+
+    :param armored: bytes|str
+    :return: bytes
+    """
+    if isinstance(armored, str):
+        armored = armored.encode('ascii')
+
+    lines = armored.replace(b'\r\n', b'\n').split(b'\n')
+
+    try:
+        start = next(i for i, line in enumerate(lines) if line.startswith(b'-----BEGIN PGP '))
+        end = next(i for i in range(start + 1, len(lines)) if lines[i].startswith(b'-----END PGP '))
+        body_start = lines.index(b'', start, end) + 1
+    except (StopIteration, ValueError):
+        raise PGPParsingError('ASCII armor is malformed')
+
+    body = lines[body_start:end]
+    checksum = None
+
+    try:
+        if body and body[-1].startswith(b'='):
+            checksum = int.from_bytes(base64.b64decode(body.pop()[1:], validate=True), 'big')
+
+        data = base64.b64decode(b''.join(body), validate=True)
+    except ValueError:
+        raise PGPParsingError('ASCII armor is not valid base64')
+
+    if checksum is not None and crc24(data) != checksum:
+        raise PGPParsingError('ASCII armor CRC24 mismatch')
+
+    return data
+
+
+def _crc24_table():
+    """
+    Builds CRC24 lookup table (one entry per octet value)
+
+    :return: list
+    """
+    table = []
+
+    for octet in range(256):
+        crc = octet << 16
+
+        for _ in range(8):
+            crc <<= 1
+
+            if crc & 0x1000000:
+                crc ^= 0x1864cfb
+
+        table.append(crc & 0xffffff)
+
+    return table
+
+
+_CRC24_TABLE = _crc24_table()
+
+
+def crc24(data):
+    """
+    Computes CRC24 checksum of ASCII armor
+
+    @link https://tools.ietf.org/html/rfc4880#section-6.1
+
+    :param data: bytes
+    :return: int
+    """
+    crc = 0xb704ce
+
+    for octet in data:
+        crc = ((crc << 8) & 0xffffff) ^ _CRC24_TABLE[(crc >> 16) ^ octet]
+
+    return crc
+
+
+def read_packet_header(data, offset):
+    """
+    Reads old or new format packet header
+
+    @developer: tnanoba
+
+    @link https://tools.ietf.org/html/rfc4880#section-4.2
+
+    :param data: bytes
+    :param offset: int (offset of a packet tag octet)
+    :return: tuple (tag, body start offset, body end offset)
+    """
+    try:
+        header = data[offset]
+
+        if not header & 0x80:
+            raise PGPParsingError('Invalid packet header at offset ' + str(offset))
+
+        if header & 0x40:
+            # New format packet: tag in 6 lower bits, 1, 2 or 5 octets length
+            tag = header & 0x3f
+            first = data[offset + 1]
+
+            if first < 192:
+                body_start, length = offset + 2, first
+            elif first < 224:
+                body_start, length = offset + 3, ((first - 192) << 8) + data[offset + 2] + 192
+            elif first == 255:
+                body_start, length = offset + 6, int.from_bytes(data[offset + 2:offset + 6], 'big')
+            else:
+                raise PGPParsingError('Partial body length is not allowed for key packets')
+        else:
+            # Old format packet: tag in bits 5-2, length type in 2 lower bits
+            tag = (header >> 2) & 0x0f
+            length_type = header & 0x03
+
+            if length_type == 3:
+                body_start, length = offset + 1, len(data) - offset - 1
+            else:
+                body_start = offset + 1 + (1 << length_type)
+                length = int.from_bytes(data[offset + 1:body_start], 'big')
+    except IndexError:
+        raise PGPParsingError('Truncated packet header at offset ' + str(offset))
+
+    if body_start + length > len(data):
+        raise PGPParsingError('Truncated packet at offset ' + str(offset))
+
+    return tag, body_start, body_start + length
+
+
+def iter_packets(data):
+    """
+    Iterates through packets of binary data
+
+    @developer: tnanoba
+
+    :param data: bytes
+    :return: Generator (of tuples (tag, packet start offset, body start offset, body end offset))
+    """
+    offset = 0
+
+    while offset < len(data):
+        tag, body_start, body_end = read_packet_header(data, offset)
+
+        yield tag, offset, body_start, body_end
+
+        offset = body_end
+
+
+def split_keys(data):
+    """
+    Splits binary export of several keys into packet streams of separate keys. Every stream starts with a primary
+        key packet and holds all the following packets (user IDs, signatures, subkeys) up to the next primary key.
+
+    @developer: tnanoba
+
+    :param data: bytes
+    :return: Generator (of bytes)
+    """
+    start = None
+
+    for tag, offset, _, _ in iter_packets(data):
+        if tag in PRIMARY_KEY_TAGS:
+            if start is not None:
+                yield data[start:offset]
+
+            start = offset
+
+    if start is not None:
+        yield data[start:]
+
+
+def parse_rsa_key(data):
+    """
+    Parses the first key packet of binary data, packets following it are not read at all
+
+    @developer: tnanoba
+
+    :param data: bytes
+    :return: RSAKey
+    """
+    for tag, _, body_start, body_end in iter_packets(data):
+        if tag in KEY_TAGS:
+            return parse_rsa_key_packet(tag, memoryview(data)[body_start:body_end])
+
+    raise PGPParsingError('No key packet found')
+
+
+def parse_rsa_key_packet(tag, body):
+    """
+    Parses RSA key packet body
+
+    @developer: tnanoba
+
+    @link https://tools.ietf.org/html/rfc4880#section-5.5.2
+
+    :param tag: int (key packet tag)
+    :param body: bytes|memoryview
+    :return: RSAKey
+    """
+    if len(body) < 8:
+        raise PGPParsingError('Key packet is too short')
+
+    version = body[0]
+    creation_time = int.from_bytes(body[1:5], 'big')
+
+    if version == 4:
+        offset = 5
+    elif version in (2, 3):
+        # v3 keys carry 2 octets of validity period
+        offset = 7
+    else:
+        raise PGPParsingError('Unsupported key packet version ' + str(version))
+
+    algorithm = body[offset]
+
+    if algorithm not in RSA_ALGORITHMS:
+        raise PGPParsingError('Not an RSA key, public key algorithm ' + str(algorithm))
+
+    n, offset = read_mpi(body, offset + 1)
+    e, offset = read_mpi(body, offset)
+    public_end = offset
+
+    if version == 4:
+        # SHA1 over 0x99, two octets length and public key packet body
+        fingerprint = hashlib.sha1(b'\x99' + public_end.to_bytes(2, 'big') + bytes(body[:public_end])).digest()
+        key_id = fingerprint[-8:]
+    else:
+        # MD5 over MPI bodies of n and e, keyid is 64 lower bits of n
+        fingerprint = hashlib.md5(_mpi_body(n) + _mpi_body(e)).digest()
+        key_id = (n & 0xffffffffffffffff).to_bytes(8, 'big')
+
+    d = p = q = u = None
+
+    if tag in (TAG_SECRET_KEY, TAG_SECRET_SUBKEY):
+        if offset >= len(body):
+            raise PGPParsingError('Secret key packet is too short')
+
+        if body[offset] != 0:
+            raise PGPParsingError('Secret key material is protected with a passphrase')
+
+        secret_start = offset + 1
+        d, offset = read_mpi(body, secret_start)
+        p, offset = read_mpi(body, offset)
+        q, offset = read_mpi(body, offset)
+        u, offset = read_mpi(body, offset)
+
+        if offset + 2 > len(body):
+            raise PGPParsingError('Secret key checksum is missing')
+
+        if sum(body[secret_start:offset]) % 65536 != int.from_bytes(body[offset:offset + 2], 'big'):
+            raise PGPParsingError('Secret key checksum mismatch')
+
+    return RSAKey(tag, version, creation_time, key_id, fingerprint, n, e, d, p, q, u)
+
+
+def read_mpi(body, offset):
+    """
+    Reads multiprecision integer (two octets bit count followed by big-endian value)
+
+    :param body: bytes|memoryview
+    :param offset: int
+    :return: tuple (int value, next offset)
+    """
+    if offset + 2 > len(body):
+        raise PGPParsingError('Truncated MPI at offset ' + str(offset))
+
+    end = offset + 2 + (int.from_bytes(body[offset:offset + 2], 'big') + 7) // 8
+
+    if end > len(body):
+        raise PGPParsingError('Truncated MPI at offset ' + str(offset))
+
+    return int.from_bytes(body[offset + 2:end], 'big'), end
+
+
+def _mpi_body(value):
+    """
+    Big-endian octets of MPI value
+
+    :param value: int
+    :return: bytes
+    """
+    return value.to_bytes((value.bit_length() + 7) // 8, 'big')
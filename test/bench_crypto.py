@@ -0,0 +1,392 @@
+""" Throughput benchmarks for mflod.crypto.crypto.Crypto
+
+Not a part of the unit test suite (unittest discovery only picks up
+test*.py files). Run from the repository root:
+
+    python3 test/bench_crypto.py [benchmark name ...]
+
+"""
+import sys
+import os
+import time
+import tracemalloc
+import tempfile
+import mmap
+from random import choice
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mflod.crypto.der_codec as der_codec
+import mflod.crypto.asn1_structures as asn1_dec
+from mflod.crypto.der_codec import split_message_packet
+from mflod.crypto.crypto import Crypto
+from mflod.crypto.constants import Constants as const
+from mflod.crypto.exceptions import NoMatchingRSAKeyForMessage
+from dummy_key_manager import DummyKeyManager
+from pyasn1.type import univ
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
+from cryptography.hazmat.primitives.asymmetric.ed25519 import \
+    Ed25519PrivateKey
+from pyasn1.codec.der.encoder import encode as asn1_encode
+from pyasn1.codec.der.decoder import decode as asn1_decode
+
+
+def timed(func, *args, **kwargs):
+    """ Call a function and return a tuple (seconds spent, result) """
+
+    start = time.perf_counter()
+    res = func(*args, **kwargs)
+    return time.perf_counter() - start, res
+
+
+def report(name, seconds, amount, unit='packets'):
+    """ Print a single benchmark line """
+
+    print('%-40s %8.3f s  %10.1f %s/s' % (name, seconds, amount / seconds,
+                                          unit))
+
+
+def bench_assemble_many(amount=300, msg_size=1024):
+    """ Serial assemble_message_packet loop vs assemble_many """
+
+    crypto_obj = Crypto()
+    key_manager = DummyKeyManager(4, [2048])
+    msg = 'x' * msg_size
+    specs = [(msg, choice(key_manager.keys).public_key())
+             for _ in range(amount)]
+
+    seconds, _ = timed(lambda: [crypto_obj.assemble_message_packet(*spec)
+                                for spec in specs])
+    report('assemble (serial loop)', seconds, amount)
+
+    for workers in sorted({2, 4, os.cpu_count() or 1}):
+        seconds, _ = timed(crypto_obj.assemble_many, specs, workers)
+        report('assemble_many (%d workers)' % workers, seconds, amount)
+
+
+def bench_broadcast(recipients=50, msg_sizes=(1024, 2 ** 20)):
+    """ Signed assemble_message_packet per recipient vs broadcast """
+
+    crypto_obj = Crypto()
+    key_manager = DummyKeyManager(4, [2048])
+    recipient_pks = [choice(key_manager.keys).public_key()
+                     for _ in range(recipients)]
+    sign = [key_manager.gen_rsa_key(2048), bytes(8)]
+
+    for msg_size in msg_sizes:
+        msg = 'x' * msg_size
+
+        seconds, _ = timed(lambda: [
+            crypto_obj.assemble_message_packet(msg, recipient_pk, sign)
+            for recipient_pk in recipient_pks])
+        report('per-recipient loop (%d bytes)' % msg_size, seconds,
+               recipients)
+
+        seconds, _ = timed(crypto_obj.assemble_for_recipients, msg,
+                           recipient_pks, sign)
+        report('assemble_for_recipients (%d bytes)' % msg_size, seconds,
+               recipients)
+
+def bench_der_codec(amount=2000, msg_size=256):
+    """ pyasn1 reference structures vs mflod.crypto.der_codec """
+
+    iv, aes_key, hmac_key = os.urandom(16), os.urandom(16), os.urandom(20)
+    enc_header, digest = os.urandom(512), os.urandom(20)
+    msg = 'x' * msg_size
+    timestamp = '170425120000Z'
+
+    def algorithm_identifier(oid):
+        ai = asn1_dec.AlgorithmIdentifier()
+        ai['algorithm'] = oid
+        ai['parameters'] = univ.Null()
+        return ai
+
+    def pyasn1_encode():
+        mp_content = asn1_dec.MPContent()
+        mp_content['timestamp'] = timestamp
+        mp_content['content'] = msg
+        asn1_encode(mp_content)
+
+        mp_header = asn1_dec.MPHeader()
+        mp_header['identificationString'] = const.IS
+        mp_header['signatureAlgorithm'] = \
+            algorithm_identifier(const.NO_SIGN_OID)
+        mp_header['PGPKeyID'] = os.urandom(8)
+        mp_header['signature'] = os.urandom(214)
+        mp_header['HMACKey'] = hmac_key
+        mp_header['AESKey'] = aes_key
+        asn1_encode(mp_header)
+
+        content_block = asn1_dec.MPContentContainer()
+        content_block['initializationVector'] = iv
+        content_block['encryptionAlgorithm'] = \
+            algorithm_identifier(const.AES_128_CBC_OID)
+        content_block['encryptedContent'] = os.urandom(msg_size + 32)
+        hmac_block = asn1_dec.MPHMACContainer()
+        hmac_block['digestAlgorithm'] = algorithm_identifier(const.SHA1_OID)
+        hmac_block['digest'] = digest
+        header_block = asn1_dec.MPHeaderContainer()
+        header_block['encryptionAlgorithm'] = \
+            algorithm_identifier(const.ID_RSAES_OAEP)
+        header_block['encryptedHeader'] = enc_header
+        message_packet = asn1_dec.MessagePacket()
+        message_packet['protocolVersion'] = const.PROTOCOL_VERSION
+        message_packet['headerBlock'] = header_block
+        message_packet['hmacBlock'] = hmac_block
+        message_packet['contentBlock'] = content_block
+        return asn1_encode(message_packet)
+
+    def fast_encode():
+        der_codec.encode_mp_content(timestamp, msg)
+        der_codec.encode_mp_header(const.IS, const.NO_SIGN_OID,
+                                   os.urandom(8), os.urandom(214), hmac_key,
+                                   aes_key)
+        return der_codec.encode_message_packet(
+            const.PROTOCOL_VERSION,
+            der_codec.encode_mp_header_container(const.ID_RSAES_OAEP,
+                                                 enc_header),
+            der_codec.encode_mp_hmac_container(const.SHA1_OID, digest),
+            der_codec.encode_mp_content_container(
+                iv, const.AES_128_CBC_OID, os.urandom(msg_size + 32)))
+
+    seconds, _ = timed(lambda: [pyasn1_encode() for _ in range(amount)])
+    report('encode (pyasn1)', seconds, amount)
+    seconds, _ = timed(lambda: [fast_encode() for _ in range(amount)])
+    report('encode (der_codec)', seconds, amount)
+
+    packet = fast_encode()
+    seconds, _ = timed(lambda: [asn1_decode(packet) for _ in range(amount)])
+    report('decode MessagePacket (pyasn1)', seconds, amount)
+    seconds, _ = timed(lambda: [der_codec.decode_message_packet(packet)
+                                for _ in range(amount)])
+    report('decode MessagePacket (der_codec)', seconds, amount)
+
+
+def bench_disassembly_memory(msg_size=8 * 1024 * 1024):
+    """ Peak memory of a large packet disassembly (tracemalloc) """
+
+    key_manager = DummyKeyManager(1, [2048])
+    packet = Crypto().assemble_message_packet(
+            'x' * msg_size, key_manager.keys[0].public_key())
+
+    for name, crypto_obj in [('str content', Crypto()),
+                             ('zero_copy', Crypto(zero_copy=True))]:
+        tracemalloc.start()
+        crypto_obj.disassemble_message_packet(packet, key_manager)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('%-40s %8.1f MiB  %5.2fx packet size' % (
+            'disassemble peak (%s)' % name, peak / 2 ** 20,
+            peak / len(packet)))
+
+
+def bench_stream_assembly_memory(msg_size=256 * 1024 * 1024):
+    """ Peak memory of streaming assembly of a large file (tracemalloc) """
+
+    key_manager = DummyKeyManager(1, [2048])
+    crypto_obj = Crypto()
+
+    with tempfile.TemporaryFile() as source, \
+            tempfile.TemporaryFile() as sink:
+        chunk = os.urandom(1024 * 1024)
+        for _ in range(msg_size // len(chunk)):
+            source.write(chunk)
+        source.seek(0)
+
+        tracemalloc.start()
+        seconds, written = timed(crypto_obj.assemble_message_packet_stream,
+                                 source, msg_size,
+                                 key_manager.keys[0].public_key(), sink)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    report('assemble stream (%d MiB)' % (msg_size // 2 ** 20), seconds,
+           written / 2 ** 20, 'MiB')
+    print('%-40s %8.1f KiB' % ('assemble stream peak', peak / 2 ** 10))
+
+
+def bench_stream_disassembly_memory(msg_size=256 * 1024 * 1024):
+    """ Peak memory of streaming disassembly of a large packet file """
+
+    key_manager = DummyKeyManager(1, [2048])
+    crypto_obj = Crypto()
+
+    with tempfile.TemporaryFile() as source, \
+            tempfile.TemporaryFile() as packet_file, \
+            tempfile.TemporaryFile() as sink:
+        chunk = os.urandom(1024 * 1024)
+        for _ in range(msg_size // len(chunk)):
+            source.write(chunk)
+        source.seek(0)
+        crypto_obj.assemble_message_packet_stream(
+                source, msg_size, key_manager.keys[0].public_key(),
+                packet_file)
+
+        for name in ['file', 'mmap']:
+            packet_file.seek(0)
+            sink.seek(0)
+            packet = packet_file if name == 'file' else \
+                mmap.mmap(packet_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            tracemalloc.start()
+            seconds, res = timed(crypto_obj.disassemble_message_packet_stream,
+                                 packet, key_manager, sink)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            report('disassemble stream (%s)' % name, seconds,
+                   res[1] / 2 ** 20, 'MiB')
+            print('%-40s %8.1f KiB' % ('disassemble stream peak (%s)' % name,
+                                       peak / 2 ** 10))
+            if name == 'mmap':
+                packet.close()
+
+
+def bench_header_versions(amount=200, msg_size=1024):
+    """ RSA operations and throughput per protocol version header layout """
+
+    key_manager = DummyKeyManager(0)
+    sk = key_manager.gen_rsa_key(2048)
+    key_manager.keys = [sk]
+    msg = 'x' * msg_size
+
+    for version in const.SUPPORTED_PROTOCOL_VERSIONS:
+        crypto_obj = Crypto(protocol_version=version)
+
+        # count RSA operations through the private helpers
+        rsa_ops = {'encrypt': 0, 'decrypt': 0}
+        for op in rsa_ops:
+            name = '_Crypto__%s_with_rsa' % op
+            helper = getattr(crypto_obj, name)
+
+            def counted(*args, helper=helper, op=op):
+                rsa_ops[op] += 1
+                return helper(*args)
+            setattr(crypto_obj, name, counted)
+
+        for sign in [None, [sk, bytes(8)]]:
+            label = 'v%d %s' % (version, 'signed' if sign else 'unsigned')
+            rsa_ops.update(encrypt=0, decrypt=0)
+
+            seconds, packets = timed(
+                lambda: [crypto_obj.assemble_message_packet(
+                             msg, sk.public_key(), sign)
+                         for _ in range(amount)])
+            report('assemble (%s)' % label, seconds, amount)
+            seconds, _ = timed(
+                lambda: [crypto_obj.disassemble_message_packet(packet,
+                                                               key_manager)
+                         for packet in packets])
+            report('disassemble (%s)' % label, seconds, amount)
+            print('%-40s %8.1f encrypt %6.1f decrypt' % (
+                'RSA ops per packet (%s)' % label,
+                rsa_ops['encrypt'] / amount, rsa_ops['decrypt'] / amount))
+
+
+def bench_content_modes(sizes=((1024, 2000), (2 ** 20, 20),
+                               (100 * 2 ** 20, 1))):
+    """ AES-128-CBC + HMAC-SHA1 vs AES-128-GCM content blocks """
+
+    key_manager = DummyKeyManager(1, [2048])
+    pk = key_manager.keys[0].public_key()
+
+    for msg_size, amount in sizes:
+        msg = os.urandom(msg_size)
+        for oid, name in [(const.AES_128_CBC_OID, 'CBC+HMAC'),
+                          (const.AES_128_GCM_OID, 'GCM')]:
+            crypto_obj = Crypto(content_algorithm=oid)
+            label = '%s, %d KiB' % (name, msg_size // 2 ** 10)
+
+            seconds, packets = timed(
+                lambda: [crypto_obj.assemble_message_packet(msg, pk)
+                         for _ in range(amount)])
+            report('assemble (%s)' % label, seconds,
+                   amount * msg_size / 2 ** 20, 'MiB')
+            seconds, _ = timed(
+                lambda: [crypto_obj.disassemble_message_packet(packet,
+                                                               key_manager)
+                         for packet in packets])
+            report('disassemble (%s)' % label, seconds,
+                   amount * msg_size / 2 ** 20, 'MiB')
+            del packets
+
+
+def bench_header_trials(amount=100, keys=8):
+    """ Per-key trial decryption cost: RSA-OAEP vs X25519 headers """
+
+    crypto_obj = Crypto()
+    key_manager = DummyKeyManager(keys, [2048])
+    key_manager.x25519_keys = [X25519PrivateKey.generate()
+                               for _ in range(keys)]
+
+    # packets addressed to someone else make every user key a miss
+    strangers = [('RSA-OAEP 2048', key_manager.gen_rsa_key(2048)),
+                 ('X25519', X25519PrivateKey.generate())]
+
+    for name, stranger_sk in strangers:
+        packets = [crypto_obj.assemble_message_packet(
+                       'x', stranger_sk.public_key()) for _ in range(amount)]
+
+        def disassemble():
+            for packet in packets:
+                try:
+                    crypto_obj.disassemble_message_packet(packet,
+                                                          key_manager)
+                except NoMatchingRSAKeyForMessage:
+                    pass
+
+        seconds, _ = timed(disassemble)
+        report('trials (%s, %d keys)' % (name, keys), seconds,
+               amount * keys, 'trials')
+        print('%-40s %8.1f us' % ('per-key trial (%s)' % name,
+                                  seconds / (amount * keys) * 10 ** 6))
+
+
+def bench_signatures(amount=200, msg_size=1024):
+    """ Signed packet round trip and header size: RSASSA-PSS vs Ed25519 """
+
+    crypto_obj = Crypto()
+    key_manager = DummyKeyManager(1, [2048])
+    recipient_pk = key_manager.keys[0].public_key()
+    msg = 'x' * msg_size
+    signers = [('RSASSA-PSS 2048', key_manager.gen_rsa_key(2048)),
+               ('Ed25519', Ed25519PrivateKey.generate())]
+
+    for name, signer_sk in signers:
+        pgp_id = os.urandom(8)
+        key_manager.pgp_keys[pgp_id] = signer_sk.public_key()
+
+        seconds, packets = timed(lambda: [
+            crypto_obj.assemble_message_packet(msg, recipient_pk,
+                                               [signer_sk, pgp_id])
+            for _ in range(amount)])
+        report('signed assembly (%s)' % name, seconds, amount)
+
+        seconds, _ = timed(lambda: [
+            crypto_obj.disassemble_message_packet(packet, key_manager)
+            for packet in packets])
+        report('signed disassembly (%s)' % name, seconds, amount)
+
+        print('%-40s %8d bytes' % ('header block (%s)' % name,
+                                   len(split_message_packet(packets[0])[1])))
+
+
+BENCHMARKS = {
+    'assemble_many': bench_assemble_many,
+    'broadcast': bench_broadcast,
+    'content_modes': bench_content_modes,
+    'der_codec': bench_der_codec,
+    'header_trials': bench_header_trials,
+    'header_versions': bench_header_versions,
+    'signatures': bench_signatures,
+    'disassembly_memory': bench_disassembly_memory,
+    'stream_assembly_memory': bench_stream_assembly_memory,
+    'stream_disassembly_memory': bench_stream_disassembly_memory,
+}
+
+
+if __name__ == '__main__':
+    for bench_name in sys.argv[1:] or sorted(BENCHMARKS):
+        print('== %s' % bench_name)
+        BENCHMARKS[bench_name]()
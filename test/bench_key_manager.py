@@ -0,0 +1,301 @@
+""" Key listing and startup latency of mflod.crypto.key_manager.KeyManager vs keyring size
+
+Not a part of the unit test suite (unittest discovery only picks up
+test*.py files). All but the key_parsing and key_stock benchmarks need a working gpg binary, keys
+are generated in a temporary GnuPG home directory. Run from the repository
+root:
+
+    python3 test/bench_key_manager.py [benchmark name ...]
+
+"""
+import sys
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import asyncio
+import logging
+import threading
+import gnupg
+import pgpdump
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mflod.crypto.pgp_parser as pgp_parser
+import mflod.crypto.pgp_builder as pgp_builder
+import pgp_test_data
+from mflod.crypto.key_manager import KeyManager
+from mflod.crypto.gpg_pool import GPGPool
+from mflod.crypto.async_key_manager import AsyncKeyManager
+from mflod.crypto.key_stock import KeyStock
+from bench_crypto import timed, report
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+
+def generate_keys(home_dir, amount, offset=0, key_length=1024):
+    """ Generate unprotected RSA keys in a single gpg batch run """
+
+    batch = ''.join(
+        'Key-Type: RSA\nKey-Length: %d\nName-Real: Bench Key %d\n%%no-protection\n%%commit\n' % (key_length, i)
+        for i in range(offset, offset + amount))
+
+    subprocess.run(['gpg', '--homedir', home_dir, '--no-default-keyring', '--keyring',
+                    os.path.join(home_dir, 'pubring.gpg'), '--batch', '--pinentry-mode', 'loopback',
+                    '--passphrase', '', '--gen-key'],
+                   input=batch.encode('ascii'), check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def bench_key_listing(sizes):
+    """ Per-key export (list + export per key) vs a single bulk export """
+
+    home_dir = tempfile.mkdtemp()
+    generated = 0
+
+    try:
+        for size in sizes:
+            generate_keys(home_dir, size - generated, generated)
+            generated = size
+
+            key_manager = KeyManager(home_dir)
+
+            seconds, keys = timed(lambda: [
+                key_manager._return_rsa_key_from_pgp(pgp_key.encode('utf-8'), True)
+                for pgp_key in key_manager._retrieve_local_pgp_keys(True)])
+            report('per-key export (%d keys)' % len(keys), seconds, len(keys), 'keys')
+
+            seconds, keys = timed(lambda: list(key_manager.get_pgp_rsa_keys(-1, True)))
+            report('bulk export (%d keys)' % len(keys), seconds, len(keys), 'keys')
+    finally:
+        subprocess.run(['gpgconf', '--homedir', home_dir, '--kill', 'gpg-agent'], stderr=subprocess.DEVNULL)
+        shutil.rmtree(home_dir, ignore_errors=True)
+
+
+def bench_warm_start(sizes=(10, 100), key_length=2048):
+    """ Key index startup: cold one (export from gpg, parse, compute CRT) vs warm one (what loading a passphrase
+        protected snapshot of prepared keys costs: key chain listing, scrypt, DER encoded keys loading) """
+
+    home_dir = tempfile.mkdtemp()
+    generated = 0
+
+    try:
+        for size in sizes:
+            generate_keys(home_dir, size - generated, generated, key_length)
+            generated = size
+
+            key_manager = KeyManager(home_dir)
+            seconds, count = timed(key_manager.build_key_index)
+            report('cold start, gpg (%d keys)' % count, seconds, count, 'keys')
+
+            der_keys = [entry['private_key'].private_bytes(serialization.Encoding.DER,
+                                                           serialization.PrivateFormat.PKCS8,
+                                                           serialization.NoEncryption())
+                        for entry in key_manager._key_entries]
+
+            def warm_start():
+                key_manager._list_key_chain_fingerprints()
+                Scrypt(salt=bytes(16), length=32, n=2 ** 14, r=8, p=1, backend=default_backend()).derive(b'bench')
+                return [serialization.load_der_private_key(der_key, None, default_backend()) for der_key in der_keys]
+
+            key_manager = KeyManager(home_dir)
+            seconds, keys = timed(warm_start)
+            report('warm start, snapshot (%d keys)' % len(keys), seconds, len(keys), 'keys')
+    finally:
+        subprocess.run(['gpgconf', '--homedir', home_dir, '--kill', 'gpg-agent'], stderr=subprocess.DEVNULL)
+        shutil.rmtree(home_dir, ignore_errors=True)
+
+
+def bench_gpg_pool(threads=8, calls=25, pool_sizes=(1, 4)):
+    """ Concurrent key exports: a fresh gnupg.GPG handle per call vs handles taken from GPGPool """
+
+    home_dir = tempfile.mkdtemp()
+
+    try:
+        generate_keys(home_dir, 10)
+        fingerprints = [key['fingerprint'] for key in gnupg.GPG(homedir=home_dir).list_keys()]
+
+        def run(export):
+            def worker(offset):
+                for i in range(calls):
+                    assert export(fingerprints[(offset + i) % len(fingerprints)])
+
+            workers = [threading.Thread(target=worker, args=(offset,)) for offset in range(threads)]
+
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+
+        seconds, _ = timed(run, lambda fingerprint: gnupg.GPG(homedir=home_dir).export_keys(fingerprint))
+        report('fresh handle per call (%d threads)' % threads, seconds, threads * calls, 'calls')
+
+        for size in pool_sizes:
+            pool = GPGPool(home_dir, size)
+
+            def export(fingerprint):
+                with pool.handle() as gpg:
+                    return gpg.export_keys(fingerprint)
+
+            seconds, _ = timed(run, export)
+            report('GPGPool of %d (%d threads)' % (size, threads), seconds, threads * calls, 'calls')
+    finally:
+        subprocess.run(['gpgconf', '--homedir', home_dir, '--kill', 'gpg-agent'], stderr=subprocess.DEVNULL)
+        shutil.rmtree(home_dir, ignore_errors=True)
+
+
+def bench_async_lookups(lookups=50):
+    """ Event loop stalls while looking keys up: blocking KeyManager calls vs AsyncKeyManager """
+
+    home_dir = tempfile.mkdtemp()
+
+    try:
+        generate_keys(home_dir, 10)
+        async_manager = AsyncKeyManager(gnupg_home_dir=home_dir, concurrency=4)
+        key_manager = async_manager.key_manager
+        fingerprints = key_manager._list_pgp_fingerprints(True)
+
+        async def blocking_lookup(fingerprint):
+            return key_manager.get_pgp_rsa_key_id(fingerprint)
+
+        async def measure(lookup):
+            stalls = []
+            done = asyncio.Event()
+
+            async def ticker():
+                last = time.perf_counter()
+
+                while not done.is_set():
+                    await asyncio.sleep(0.001)
+                    now = time.perf_counter()
+                    stalls.append(now - last)
+                    last = now
+
+            ticking = asyncio.ensure_future(ticker())
+            await asyncio.sleep(0)
+
+            for i in range(lookups):
+                key_manager.key_cache.clear()
+                assert await lookup(fingerprints[i % len(fingerprints)]) is not None
+
+            done.set()
+            await ticking
+
+            return max(stalls)
+
+        for name, lookup in [('blocking KeyManager', blocking_lookup),
+                             ('AsyncKeyManager', async_manager.get_pgp_rsa_key_id)]:
+            seconds, stall = timed(asyncio.run, measure(lookup))
+            report('%s (max loop stall %.1f ms)' % (name, stall * 1000), seconds, lookups, 'lookups')
+    finally:
+        subprocess.run(['gpgconf', '--homedir', home_dir, '--kill', 'gpg-agent'], stderr=subprocess.DEVNULL)
+        shutil.rmtree(home_dir, ignore_errors=True)
+
+
+def bench_key_stock(amount=8, key_size=2048):
+    """ Provisioning latency: inline key generation vs keys taken out of a filled KeyStock """
+
+    key_manager = KeyManager()
+
+    seconds, _ = timed(lambda: [key_manager.generate_plain_rsa_key(key_size) for _ in range(amount)])
+    report('inline generation (%d bits)' % key_size, seconds, amount, 'keys')
+
+    stock = KeyStock(amount, (key_size,))
+    key_manager.key_stock = stock
+
+    try:
+        seconds, _ = timed(stock.wait)
+        report('stock fill, process pool', seconds, amount, 'keys')
+
+        seconds, _ = timed(lambda: [key_manager.generate_plain_rsa_key(key_size) for _ in range(amount)])
+        report('take from stock', seconds, amount, 'keys')
+
+        stock.wait()
+        print('refill rate %.1f keys/s' % stock.get_stats()[key_size]['refill_rate'])
+    finally:
+        stock.close()
+
+
+def bench_bulk_mutations(amount=50, key_size=1024):
+    """ Per-key import/delete calls vs import_keys/delete_pgp_keys bulk calls """
+
+    keys = [rsa.generate_private_key(65537, key_size, default_backend()) for _ in range(amount)]
+    built = [pgp_builder.build_secret_key(key, 'Bench Key %d' % i) for i, key in enumerate(keys)]
+    fingerprints = [fingerprint for _, fingerprint in built]
+
+    home_dir = tempfile.mkdtemp()
+
+    try:
+        key_manager = KeyManager(home_dir)
+
+        seconds, _ = timed(lambda: [key_manager.import_keys(pgp_key) for pgp_key, _ in built])
+        report('per-key import', seconds, amount, 'keys')
+
+        seconds, _ = timed(lambda: [key_manager.delete_pgp_key(fingerprint) for fingerprint in fingerprints])
+        report('per-key delete', seconds, amount, 'keys')
+
+        seconds, _ = timed(key_manager.import_keys, b''.join(pgp_key for pgp_key, _ in built))
+        report('bulk import', seconds, amount, 'keys')
+
+        seconds, deleted = timed(key_manager.delete_pgp_keys, fingerprints)
+        report('bulk delete', seconds, amount, 'keys')
+
+        assert all(entry['ok'] for entry in deleted)
+    finally:
+        subprocess.run(['gpgconf', '--homedir', home_dir, '--kill', 'gpg-agent'], stderr=subprocess.DEVNULL)
+        shutil.rmtree(home_dir, ignore_errors=True)
+
+
+def bench_key_parsing(sizes=(100, 1000, 5000), key_length=2048):
+    """ pgpdump (armored export, full packet walk) vs pgp_parser (binary export, key packets only) """
+
+    keys = [rsa.generate_private_key(65537, key_length, default_backend()) for _ in range(20)]
+
+    for size in sizes:
+        data = b''.join(pgp_test_data.transferable_key(keys[i % len(keys)], subkey=keys[(i + 1) % len(keys)])
+                        for i in range(size))
+        armored = pgp_test_data.armor(data).encode('ascii')
+
+        def pgpdump_path():
+            numbers = []
+            for packet in pgpdump.AsciiData(armored).packets():
+                if packet.raw == 5:
+                    numbers.append((packet.prime_p, packet.prime_q, packet.exponent, packet.modulus,
+                                    packet.exponent_d))
+            return numbers
+
+        def native_path():
+            numbers = []
+            for pgp_key in pgp_parser.split_keys(data):
+                key = pgp_parser.parse_rsa_key(pgp_key)
+                numbers.append((key.p, key.q, key.e, key.n, key.d))
+            return numbers
+
+        seconds, reference = timed(pgpdump_path)
+        report('pgpdump, armored (%d keys)' % size, seconds, size, 'keys')
+        seconds, numbers = timed(native_path)
+        report('pgp_parser, binary (%d keys)' % size, seconds, size, 'keys')
+
+        assert numbers == reference
+
+
+BENCHMARKS = {
+    'key_listing': lambda: bench_key_listing([10, 50, 100]),
+    'key_parsing': bench_key_parsing,
+    'warm_start': bench_warm_start,
+    'gpg_pool': bench_gpg_pool,
+    'async_lookups': bench_async_lookups,
+    'key_stock': bench_key_stock,
+    'bulk_mutations': bench_bulk_mutations,
+}
+
+
+if __name__ == '__main__':
+    # gnupg wrapper is very chatty on unknown gpg status lines
+    logging.disable(logging.WARNING)
+
+    for bench_name in sys.argv[1:] or sorted(BENCHMARKS):
+        print('== %s' % bench_name)
+        BENCHMARKS[bench_name]()
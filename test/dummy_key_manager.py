@@ -11,6 +11,15 @@ class DummyKeyManager(object):
         # initialize key storage
         self.keys = []
 
+        # raw PGP key ID -> public key of a "PGP" signer
+        self.pgp_keys = {}
+
+        # X25519 keys (X25519 header mode)
+        self.x25519_keys = []
+
+        # Ed25519 signing keys (all-zero PGP key ID signers)
+        self.ed25519_keys = []
+
         # generate specified amount of random RSA keys
         for i in range(gen_keys_num):
             self.keys.append(self.gen_rsa_key(choice(sizes)))
@@ -29,8 +38,16 @@ class DummyKeyManager(object):
         for key in self.keys:
             yield key
 
-    def get_pk_by_pgp_id(self):
-        raise NotImplementedError("NO WAY")
+    def yield_x25519_keys(self):
+        for key in self.x25519_keys:
+            yield key
+
+    def get_pk_by_pgp_id(self, pgp_id):
+        # all-zero ID means a signer used one of plain keys
+        if not any(pgp_id):
+            return tuple(key.public_key()
+                         for key in self.keys + self.ed25519_keys)
+        return self.pgp_keys.get(bytes(pgp_id))
 
     def dump_key_pickle(self, key_ind, path):
 
@@ -0,0 +1,93 @@
+""" Synthetic OpenPGP key material for KeyManager unit tests
+
+Builds RFC 4880 packets straight from cryptography lib RSA keys, so tests do
+not depend on gpg being able to generate keys in the test environment.
+
+"""
+import base64
+import hashlib
+from pgpdump.utils import crc24
+
+
+def mpi(value):
+    """ Encode a multiprecision integer (bit count followed by big-endian bytes) """
+
+    return value.bit_length().to_bytes(2, 'big') + value.to_bytes((value.bit_length() + 7) // 8, 'big')
+
+
+def packet(tag, body, new_format=True):
+    """ Encode a packet with either new or old format header """
+
+    length = len(body)
+
+    if new_format:
+        if length < 192:
+            header = bytes([0xc0 | tag, length])
+        elif length < 8384:
+            header = bytes([0xc0 | tag, ((length - 192) >> 8) + 192, (length - 192) & 0xff])
+        else:
+            header = bytes([0xc0 | tag, 255]) + length.to_bytes(4, 'big')
+    else:
+        length_type = 0 if length < 0x100 else 1 if length < 0x10000 else 2
+        header = bytes([0x80 | (tag << 2) | length_type]) + length.to_bytes(1 << length_type, 'big')
+
+    return header + body
+
+
+def public_key_body(rsa_key, created=0):
+    """ Version 4 RSA public key packet body """
+
+    numbers = rsa_key.public_key().public_numbers()
+
+    return b'\x04' + created.to_bytes(4, 'big') + b'\x01' + mpi(numbers.n) + mpi(numbers.e)
+
+
+def secret_key_body(rsa_key, created=0):
+    """ Version 4 unprotected RSA secret key packet body """
+
+    numbers = rsa_key.private_numbers()
+
+    # OpenPGP requires p < q and u = p ^ -1 mod q
+    p, q = sorted([numbers.p, numbers.q])
+    secret = mpi(numbers.d) + mpi(p) + mpi(q) + mpi(pow(p, -1, q))
+
+    return public_key_body(rsa_key, created) + b'\x00' + secret + (sum(secret) % 65536).to_bytes(2, 'big')
+
+
+def fingerprint(rsa_key, created=0):
+    """ Version 4 key fingerprint as an upper case hex string """
+
+    body = public_key_body(rsa_key, created)
+
+    return hashlib.sha1(b'\x99' + len(body).to_bytes(2, 'big') + body).hexdigest().upper()
+
+
+def transferable_key(rsa_key, secret=True, subkey=None, user_id=b'Unit Test Key', new_format=True, created=0):
+    """ Primary key packet followed by a user ID and optionally a subkey packet """
+
+    if secret:
+        data = packet(5, secret_key_body(rsa_key, created), new_format)
+    else:
+        data = packet(6, public_key_body(rsa_key, created), new_format)
+
+    data += packet(13, user_id, new_format)
+
+    if subkey is not None:
+        if secret:
+            data += packet(7, secret_key_body(subkey, created), new_format)
+        else:
+            data += packet(14, public_key_body(subkey, created), new_format)
+
+    return data
+
+
+def armor(data, secret=True):
+    """ ASCII armor a binary packet stream as gpg --armor --export does """
+
+    kind = 'PRIVATE' if secret else 'PUBLIC'
+    encoded = base64.b64encode(data).decode('ascii')
+    lines = [encoded[i:i + 64] for i in range(0, len(encoded), 64)]
+    checksum = base64.b64encode(crc24(bytearray(data)).to_bytes(3, 'big')).decode('ascii')
+
+    return '-----BEGIN PGP ' + kind + ' KEY BLOCK-----\n\n' + '\n'.join(lines) + '\n=' + checksum + \
+        '\n-----END PGP ' + kind + ' KEY BLOCK-----\n'
@@ -0,0 +1,88 @@
+import asyncio
+import shutil
+import tempfile
+import subprocess
+import unittest
+from mflod.crypto.async_key_manager import AsyncKeyManager
+from cryptography.hazmat.backends.openssl import rsa
+
+
+class TestAsyncKeyManager(unittest.TestCase):
+    """
+    Running AsyncKeyManager class unit tests against gpg in a temporary GnuPG home directory
+
+    Developers:
+        - (tnanoba) Tornike Nanobashvili
+    """
+
+    def setUp(self):
+        self.home_dir = tempfile.mkdtemp()
+        self.manager = AsyncKeyManager(gnupg_home_dir=self.home_dir, concurrency=2)
+
+    def tearDown(self):
+        subprocess.run(['gpgconf', '--homedir', self.home_dir, '--kill', 'gpg-agent'], stderr=subprocess.DEVNULL)
+        shutil.rmtree(self.home_dir, ignore_errors=True)
+
+    def test_key_life_cycle(self):
+        """ Unit tests async generate_pgp_key, get_pgp_rsa_key_id, get_pgp_rsa_keys and delete_pgp_key
+
+        Asserts that unknown fingerprints are not deleted and that keys which are not RSA ones are skipped
+
+        Asserts that the event loop keeps running other tasks while gpg generates keys
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        async def ticker(ticks, done):
+            while not done.is_set():
+                ticks.append(None)
+                await asyncio.sleep(0.001)
+
+        async def run():
+            ticks = []
+            done = asyncio.Event()
+            ticking = asyncio.ensure_future(ticker(ticks, done))
+
+            fingerprints = await asyncio.gather(*[self.manager.generate_pgp_key(1024, 'Unit Test Key ' + str(i))
+                                                  for i in range(3)])
+            done.set()
+            await ticking
+
+            self.assertGreater(len(ticks), 1)
+            self.assertTrue(all(int(fingerprint, 16) for fingerprint in fingerprints))
+
+            private_key = await self.manager.get_pgp_rsa_key_id(fingerprints[0])
+            public_key = await self.manager.get_pgp_rsa_key_id(fingerprints[0][-16:], False)
+
+            self.assertIsInstance(private_key, rsa._RSAPrivateKey)
+            self.assertEqual(private_key.public_key().public_numbers(), public_key.public_numbers())
+            self.assertIs(await self.manager.get_pgp_rsa_key_id(fingerprints[0]), private_key)
+
+            self.assertEqual(len([key async for key in self.manager.get_pgp_rsa_keys(-1)]), 3)
+            self.assertEqual(len([key async for key in self.manager.get_pgp_rsa_keys(2, False)]), 2)
+            self.assertEqual([key async for key in self.manager.get_pgp_rsa_keys(0)], [])
+            self.assertEqual([key async for key in self.manager.get_pgp_rsa_keys(-1, key_ids=[])], [])
+
+            self.assertTrue(await self.manager.delete_pgp_key(fingerprints[0]))
+            self.assertFalse(await self.manager.delete_pgp_key(fingerprints[0]))
+            self.assertFalse(await self.manager.delete_pgp_key('0' * 40))
+
+            self.assertEqual(await self.manager.get_pgp_rsa_key_id(fingerprints[0]), None)
+            self.assertEqual(len([key async for key in self.manager.get_pgp_rsa_keys(-1)]), 2)
+
+            # A key which is not an RSA one is skipped instead of being yielded or stopping the iteration
+            subprocess.run(['gpg', '--homedir', self.home_dir, '--batch', '--passphrase', '', '--quick-gen-key',
+                            'Unit Test ECC Key', 'ed25519', 'default', 'never'], check=True, stderr=subprocess.DEVNULL)
+
+            keys = [key async for key in self.manager.get_pgp_rsa_keys(-1)]
+
+            self.assertEqual(len(keys), 2)
+            self.assertTrue(all(isinstance(key, rsa._RSAPrivateKey) for key in keys))
+            self.assertEqual(len([key async for key in self.manager.get_pgp_rsa_keys(1)]), 1)
+
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import shutil
+import tempfile
+import subprocess
+import unittest
+from unittest import mock
+import pgp_test_data
+import mflod.crypto.pgp_builder as pgp_builder
+from mflod.crypto.key_manager import KeyManager
+from mflod.crypto.exceptions import GPGError
+
+
+class TestBulkKeyOperations(unittest.TestCase):
+    """
+    Running bulk key chain mutation (generate_pgp_keys, import_keys, delete_pgp_keys) unit tests against gpg in
+        a temporary GnuPG home directory
+
+    Developers:
+        - (tnanoba) Tornike Nanobashvili
+    """
+
+    def setUp(self):
+        self.home_dir = tempfile.mkdtemp()
+        self.manager = KeyManager(self.home_dir)
+
+    def tearDown(self):
+        subprocess.run(['gpgconf', '--homedir', self.home_dir, '--kill', 'gpg-agent'], stderr=subprocess.DEVNULL)
+        shutil.rmtree(self.home_dir, ignore_errors=True)
+
+    def test_generate_and_delete(self):
+        """ Unit tests that several keys are generated and deleted with single gpg invocations per operation
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        specs = [
+            {'key_length': 1024, 'user_name': 'Unit Test Key 0'},
+            {'key_length': 1024, 'user_name': 'Injected\n%commit'},
+            {'key_length': 1024, 'user_name': 'Unit Test Key 2', 'user_comment': '', 'user_email': 'test@flod'},
+        ]
+
+        # Index is built, so it has to be synchronized after each operation
+        self.assertEqual(len(list(self.manager.yield_keys())), 0)
+
+        with mock.patch.object(self.manager, '_run_gpg', wraps=self.manager._run_gpg) as run_gpg:
+            report = self.manager.generate_pgp_keys(specs)
+
+        # Generation, then key chain listing and public and secret exports of the added keys (index synchronization)
+        self.assertEqual(run_gpg.call_count, 4)
+        self.assertEqual([entry['ok'] for entry in report], [True, False, True])
+        self.assertEqual([entry['spec'] for entry in report], specs)
+        self.assertIn('Invalid key spec', report[1]['error'])
+
+        fingerprints = [report[0]['fingerprint'], report[2]['fingerprint']]
+
+        self.assertEqual(sorted(self.manager._list_pgp_fingerprints(True)), sorted(fingerprints))
+        self.assertEqual(len(list(self.manager.yield_keys())), 2)
+
+        missing = '0' * 40
+
+        fingerprints.append(self.manager.generate_pgp_keys([{'key_length': 1024}])[0]['fingerprint'])
+
+        # Key chain listing, deletion and key chain listing of the index synchronization
+        with mock.patch.object(self.manager, '_run_gpg', wraps=self.manager._run_gpg) as run_gpg:
+            report = self.manager.delete_pgp_keys([fingerprints[0], missing, fingerprints[1].lower()])
+
+        self.assertEqual(run_gpg.call_count, 3)
+        self.assertEqual([(entry['ok'], entry['status']) for entry in report],
+                         [(True, 'deleted'), (False, 'not found'), (True, 'deleted')])
+        self.assertEqual(self.manager._list_pgp_fingerprints(False), fingerprints[2:])
+        self.assertEqual(len(list(self.manager.yield_keys())), 1)
+
+        # Single key deletion does not list the key chain (but the index synchronization does)
+        with mock.patch.object(self.manager, '_run_gpg', wraps=self.manager._run_gpg) as run_gpg:
+            self.assertFalse(self.manager.delete_pgp_key(missing))
+            self.assertEqual(run_gpg.call_count, 1)
+
+            self.assertTrue(self.manager.delete_pgp_key(fingerprints[2]))
+            self.assertEqual(run_gpg.call_count, 3)
+
+        self.assertEqual(self.manager._list_key_chain_fingerprints(), {'public': [], 'secret': []})
+        self.assertEqual(len(list(self.manager.yield_keys())), 0)
+
+    def test_import_keys(self):
+        """ Unit tests import report of binary and ASCII armored key chains with new, unchanged and broken keys
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        keys = [self.manager.generate_plain_rsa_key(1024) for _ in range(3)]
+        data = pgp_test_data.transferable_key(keys[0], False, user_id=b'Unit Test Key <test@flod>')
+
+        # Keys without a self-signature are skipped by gpg
+        self.assertEqual(self.manager.import_keys(pgp_test_data.armor(data, False)), [])
+
+        built = [pgp_builder.build_secret_key(key, 'Unit Test Key ' + str(i)) for i, key in enumerate(keys)]
+
+        report = self.manager.import_keys(built[0][0])
+        self.assertEqual(report, [{'fingerprint': built[0][1], 'ok': True, 'status': 'new', 'secret': True}])
+
+        report = self.manager.import_keys(b''.join(key for key, _ in built))
+        self.assertEqual([(entry['fingerprint'], entry['status']) for entry in report],
+                         [(fingerprint, status) for (_, fingerprint), status in zip(built, ['unchanged', 'new', 'new'])])
+
+        self.assertEqual(sorted(self.manager._list_pgp_fingerprints(True)), sorted(fp for _, fp in built))
+        self.assertEqual(self.manager.import_keys(b'garbage'), [])
+
+
+    def test_gpg_exit_code(self):
+        """ Unit tests that gpg failures without expected status lines raise GPGError, expected ones are returned
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        self.assertRaises(GPGError, self.manager._run_gpg, ['--export', '--no-such-option'])
+        self.assertRaises(GPGError, self.manager._run_gpg, ['--yes', '--delete-secret-and-public-key', '0' * 40])
+
+        _, status = self.manager._run_gpg(['--yes', '--delete-secret-and-public-key', '0' * 40],
+                                          expected=('DELETE_PROBLEM',))
+        self.assertEqual(status, [('DELETE_PROBLEM', ['1'])])
+
+        # Failed key chain listing is not taken for an empty key chain
+        with mock.patch.object(self.manager, '_gpg_command', return_value=['gpg', '--no-such-option']):
+            self.assertRaises(GPGError, self.manager._list_key_chain_fingerprints)
+
+
+if __name__ == '__main__':
+    unittest.main()
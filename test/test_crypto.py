@@ -1,7 +1,22 @@
 import unittest
 import logging
+import io
+import mmap
+import tempfile
+from unittest import mock
+from datetime import datetime
 from random import choice
 from mflod.crypto.crypto import Crypto
+from mflod.crypto.key_stats import KeyHitStats
+import mflod.crypto.der_codec as der_codec
+from mflod.crypto.der_codec import split_message_packet
+from mflod.crypto.exceptions import NoMatchingRSAKeyForMessage
+from mflod.crypto.exceptions import HMACVerificationFailed
+from mflod.crypto.exceptions import DERDecodingError
+from mflod.crypto.exceptions import SignatureVerificationFailed
+from mflod.crypto.exceptions import UnsupportedProtocolVersion
+from mflod.crypto.exceptions import HeaderVerificationFailed
+from mflod.crypto.constants import Constants as const
 from dummy_key_manager import DummyKeyManager
 from pyasn1.type import univ
 from os import urandom
@@ -9,6 +24,9 @@ from pyasn1.codec.der.encoder import encode
 from pyasn1.type.univ import OctetString
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
+from cryptography.hazmat.primitives.asymmetric.ed25519 import \
+    Ed25519PrivateKey, Ed25519PublicKey
 
 # set up root logger
 logger = logging.getLogger()
@@ -137,3 +155,528 @@ class TestCrypto(unittest.TestCase):
         msg = self.crypto_obj.disassemble_message_packet(encrypted_packet, key_manager)
         print(msg)
 
+    def test_parallel_header_trial_decryption(self):
+        crypto_obj = Crypto(trial_workers=4)
+
+        # the packet is addressed to one of the user keys
+        sk = choice(self.key_manager.keys)
+        packet = crypto_obj.assemble_message_packet('HelloHello',
+                                                    sk.public_key())
+        msg = crypto_obj.disassemble_message_packet(packet, self.key_manager)
+        self.assertEqual(msg[1:], ('HelloHello', 2))
+
+        # the packet is addressed to someone else
+        stranger_pk = self.key_manager.gen_rsa_key(1024).public_key()
+        packet = crypto_obj.assemble_message_packet('HelloHello',
+                                                    stranger_pk)
+        self.assertRaises(NoMatchingRSAKeyForMessage,
+                          crypto_obj.disassemble_message_packet,
+                          packet, self.key_manager)
+
+        crypto_obj.close()
+
+    def test_adaptive_key_order(self):
+        crypto_obj = Crypto(adaptive_key_order=True)
+
+        # always send to the last key in a key chain
+        sk = self.key_manager.keys[-1]
+        for _ in range(3):
+            packet = crypto_obj.assemble_message_packet('HelloHello',
+                                                        sk.public_key())
+            msg = crypto_obj.disassemble_message_packet(packet,
+                                                        self.key_manager)
+            self.assertEqual(msg[1], 'HelloHello')
+
+        # the key is tried first once it matched
+        stats = crypto_obj.key_stats
+        self.assertEqual(stats.get_key_hits(sk), 3)
+        self.assertEqual(stats.order(self.key_manager.yield_keys())[0], sk)
+        self.assertEqual((stats.packets, stats.hits, stats.misses), (3, 3, 0))
+        self.assertEqual(stats.trial_decryptions,
+                         len(self.key_manager.keys) + 2)
+
+    def test_key_order_policy(self):
+        self.assertRaises(ValueError, Crypto, key_order_policy='lfu')
+
+        # the last key matches twice, the one before it matches last
+        frequent_sk, recent_sk = self.key_manager.keys[-1:-3:-1]
+        for policy, first_sk in [(KeyHitStats.MOST_FREQUENT, frequent_sk),
+                                 (KeyHitStats.MOST_RECENT, recent_sk)]:
+            crypto_obj = Crypto(adaptive_key_order=True,
+                                key_order_policy=policy)
+            self.assertEqual(crypto_obj.key_stats.policy, policy)
+
+            for sk in [frequent_sk, frequent_sk, recent_sk]:
+                packet = crypto_obj.assemble_message_packet('HelloHello',
+                                                            sk.public_key())
+                crypto_obj.disassemble_message_packet(packet,
+                                                      self.key_manager)
+
+            # the next packet is decrypted with a single RSA operation
+            trials = crypto_obj.key_stats.trial_decryptions
+            packet = crypto_obj.assemble_message_packet('HelloHello',
+                                                        first_sk.public_key())
+            crypto_obj.disassemble_message_packet(packet, self.key_manager)
+            self.assertEqual(crypto_obj.key_stats.trial_decryptions,
+                             trials + 1)
+
+    def test_header_key_size_filter(self):
+
+        # user has 3072 bit keys only
+        key_manager = DummyKeyManager(2, [3072])
+
+        # 1024 bit key header (256 bytes) cannot be split into 384 byte blocks
+        stranger_pk = key_manager.gen_rsa_key(1024).public_key()
+        packet = self.crypto_obj.assemble_message_packet('HelloHello',
+                                                         stranger_pk)
+        self.assertRaises(NoMatchingRSAKeyForMessage,
+                          self.crypto_obj.disassemble_message_packet,
+                          packet, key_manager)
+
+        # no RSA operation was performed
+        self.assertEqual(self.crypto_obj.key_stats.trial_decryptions, 0)
+        self.assertEqual(self.crypto_obj.key_stats.misses, 1)
+
+        # version 1 headers are a single RSA block of any size, keys are
+        # filtered by a length of an encrypted MPHeader instead: a 2048 bit
+        # key header does not fit 3072 and 4096 bit keys
+        key_manager.keys = [key_manager.gen_rsa_key(size)
+                            for size in [1024, 2048, 3072, 4096]]
+        stranger_pk = key_manager.gen_rsa_key(2048).public_key()
+        for sign in [None, [key_manager.keys[0], bytes(8)]]:
+            crypto_obj = Crypto(
+                    protocol_version=const.PROTOCOL_VERSION_WRAPPED_KEY)
+            packet = crypto_obj.assemble_message_packet(
+                    'HelloHello', stranger_pk, sign)
+            self.assertRaises(NoMatchingRSAKeyForMessage,
+                              crypto_obj.disassemble_message_packet,
+                              packet, key_manager)
+            self.assertEqual(crypto_obj.key_stats.trial_decryptions, 2)
+
+        # packets for the keys still pass the filter
+        for sk in key_manager.keys:
+            for sign in [None, [sk, bytes(8)],
+                         [Ed25519PrivateKey.generate(), bytes(8)]]:
+                packet = crypto_obj.assemble_message_packet(
+                        'HelloHello', sk.public_key(), sign)
+                self.assertEqual(crypto_obj.disassemble_message_packet(
+                        packet, key_manager)[1], 'HelloHello')
+
+    def test_disassemble_many(self):
+        stranger_pk = self.key_manager.gen_rsa_key(1024).public_key()
+
+        # mix packets for a user, packets for someone else and garbage
+        packets = []
+        for i in range(6):
+            pk = choice(self.key_manager.keys).public_key()
+            packets.append(self.crypto_obj.assemble_message_packet(
+                    'message %d' % i, pk))
+        packets.insert(2, self.crypto_obj.assemble_message_packet(
+                'not for user', stranger_pk))
+        packets.insert(5, b'\x30\x03garbage')
+
+        res = self.crypto_obj.disassemble_many(packets, self.key_manager,
+                                               workers=3)
+
+        # results preserve order and errors do not abort the batch
+        self.assertEqual(len(res), len(packets))
+        self.assertIsInstance(res[2], NoMatchingRSAKeyForMessage)
+        self.assertIsInstance(res[5], Exception)
+        msgs = [r[1] for r in res if not isinstance(r, Exception)]
+        self.assertEqual(msgs, ['message %d' % i for i in range(6)])
+
+    def test_assemble_many(self):
+        specs = [('message %d' % i, choice(self.key_manager.keys).public_key())
+                 for i in range(8)]
+
+        packets = self.crypto_obj.assemble_many(specs, workers=4)
+
+        # packets come back in submission order
+        self.assertEqual(len(packets), len(specs))
+        for (msg, _), packet in zip(specs, packets):
+            self.assertEqual(self.crypto_obj.disassemble_message_packet(
+                packet, self.key_manager)[1], msg)
+
+    def test_assemble_for_recipients(self):
+        recipient_sks = self.key_manager.keys[:3]
+        x25519_sk = X25519PrivateKey.generate()
+        self.key_manager.x25519_keys = [x25519_sk]
+        sender_sk = self.key_manager.gen_rsa_key(1024)
+        msg = 'broadcast message'
+
+        # a signature is produced once for all the recipients
+        with mock.patch.object(
+                self.crypto_obj, '_Crypto__sign_content',
+                wraps=self.crypto_obj._Crypto__sign_content) as sign_content:
+            packets = self.crypto_obj.assemble_for_recipients(
+                    msg, [sk.public_key() for sk in recipient_sks] +
+                    [x25519_sk.public_key()], [sender_sk, bytes(8)])
+        self.assertEqual(sign_content.call_count, 1)
+        self.assertEqual(len(packets), len(recipient_sks) + 1)
+
+        # packets differ in a header block only and every one opens with
+        # some of user keys
+        self.key_manager.keys.append(sender_sk)
+        blocks = [split_message_packet(packet) for packet in packets]
+        self.assertEqual(len({block[2:] for block in blocks}), 1)
+        self.assertEqual(len({block[1] for block in blocks}), len(packets))
+        for packet in packets:
+            res = self.crypto_obj.disassemble_message_packet(
+                    packet, self.key_manager)
+            self.assertEqual(res[1:3], (msg, 1))
+        self.key_manager.keys.pop()
+
+        # unsigned GCM packets
+        crypto_obj = Crypto(content_algorithm=const.AES_128_GCM_OID)
+        for packet in crypto_obj.assemble_for_recipients(
+                msg, (sk.public_key() for sk in recipient_sks)):
+            self.assertEqual(crypto_obj.disassemble_message_packet(
+                packet, self.key_manager)[1:], (msg, 2))
+
+        self.assertEqual(self.crypto_obj.assemble_for_recipients(msg, []),
+                         [])
+
+    def test_hmac_covers_received_content_block(self):
+        sk = choice(self.key_manager.keys)
+        packet = self.crypto_obj.assemble_message_packet('HelloHello',
+                                                         sk.public_key())
+
+        # flip a bit in the last byte of encrypted content
+        tampered = packet[:-1] + bytes([packet[-1] ^ 0x01])
+        self.assertRaises(HMACVerificationFailed,
+                          self.crypto_obj.disassemble_message_packet,
+                          tampered, self.key_manager)
+
+    def test_zero_copy_disassembly(self):
+        crypto_obj = Crypto(zero_copy=True)
+        sk = choice(self.key_manager.keys)
+
+        for msg in self.TEST_MSGS:
+            packet = crypto_obj.assemble_message_packet(msg, sk.public_key())
+            res = crypto_obj.disassemble_message_packet(
+                    bytearray(packet), self.key_manager)
+
+            # content is a view of a decrypted buffer
+            self.assertIsInstance(res[1], memoryview)
+            self.assertEqual(str(res[1], 'iso-8859-1'), msg)
+
+    def test_assemble_message_packet_stream(self):
+        sk = choice(self.key_manager.keys)
+        msg = urandom(100000)
+
+        # fix keys and timestamp so that the packets can be compared
+        keys = [urandom(16), urandom(16), urandom(20)]
+        self.crypto_obj._Crypto__get_random_bytes = lambda spec: keys
+        with mock.patch('mflod.crypto.crypto.datetime') as dt:
+            dt.utcnow.return_value = datetime(2017, 4, 25, 12, 0, 0)
+            ref = self.crypto_obj.assemble_message_packet(msg,
+                                                          sk.public_key())
+
+            # seekable sink and non-seekable sink with seekable source
+            seekable_sink = io.BytesIO()
+            written = self.crypto_obj.assemble_message_packet_stream(
+                    io.BytesIO(msg), len(msg), sk.public_key(),
+                    seekable_sink, chunk_size=4096)
+            self.assertEqual(written, len(ref))
+
+            stream_sink = io.BufferedWriter(io.BytesIO())
+            stream_sink.seekable = lambda: False
+            self.crypto_obj.assemble_message_packet_stream(
+                    io.BytesIO(msg), len(msg), sk.public_key(), stream_sink)
+            stream_sink.flush()
+
+        # everything but RSA encrypted header is byte-identical
+        for packet in [seekable_sink.getvalue(), stream_sink.raw.getvalue()]:
+            self.assertEqual(len(packet), len(ref))
+            self.assertEqual(split_message_packet(packet)[2:],
+                             split_message_packet(ref)[2:])
+            res = self.crypto_obj.disassemble_message_packet(packet,
+                                                             self.key_manager)
+            self.assertEqual(res[1], str(msg, 'iso-8859-1'))
+
+        # a source shorter than announced
+        self.assertRaises(ValueError,
+                          self.crypto_obj.assemble_message_packet_stream,
+                          io.BytesIO(msg), len(msg) + 1, sk.public_key(),
+                          io.BytesIO())
+
+    def test_disassemble_message_packet_stream(self):
+        sk = choice(self.key_manager.keys)
+
+        for msg in [b'', urandom(10), urandom(100000)]:
+            packet = self.crypto_obj.assemble_message_packet(msg,
+                                                             sk.public_key())
+            ref = self.crypto_obj.disassemble_message_packet(packet,
+                                                             self.key_manager)
+
+            with tempfile.TemporaryFile() as packet_file:
+                packet_file.write(b'junk' + packet)
+                packet_file.seek(4)
+                packet_map = mmap.mmap(packet_file.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+
+                # bytes, file-like object positioned at a packet and mmap
+                packet_view = memoryview(packet_map)[4:]
+                for msg_packet in [packet, packet_file, packet_view]:
+                    sink = io.BytesIO()
+                    res = self.crypto_obj.disassemble_message_packet_stream(
+                            msg_packet, self.key_manager, sink, chunk_size=17)
+                    self.assertEqual(res, (ref[0], len(msg), ref[2]))
+                    self.assertEqual(sink.getvalue(), msg)
+
+                packet_view.release()
+                packet_map.close()
+
+        # nothing is written if the content block was tampered with
+        sink = io.BytesIO()
+        packet = bytearray(packet)
+        packet[-1] ^= 1
+        self.assertRaises(HMACVerificationFailed,
+                          self.crypto_obj.disassemble_message_packet_stream,
+                          packet, self.key_manager, sink)
+        self.assertEqual(sink.getvalue(), b'')
+
+        # a truncated file
+        self.assertRaises(DERDecodingError,
+                          self.crypto_obj.disassemble_message_packet_stream,
+                          io.BytesIO(packet[:-1]), self.key_manager, sink)
+
+    def test_signed_message_packet(self):
+        recipient_sk = choice(self.key_manager.keys)
+        sender_sk = self.key_manager.gen_rsa_key(1024)
+        pgp_id = urandom(8)
+        msg = 'signed message'
+
+        # known PGP signer
+        self.key_manager.pgp_keys[pgp_id] = sender_sk.public_key()
+        packet = self.crypto_obj.assemble_message_packet(
+                msg, recipient_sk.public_key(), [sender_sk, pgp_id])
+        res = self.crypto_obj.disassemble_message_packet(packet,
+                                                         self.key_manager)
+        self.assertEqual(res[1:], (msg, 0, str(pgp_id, 'iso-8859-1')))
+
+        # a signature that does not match a public key of a PGP ID
+        self.key_manager.pgp_keys[pgp_id] = recipient_sk.public_key()
+        self.assertRaises(SignatureVerificationFailed,
+                          self.crypto_obj.disassemble_message_packet, packet,
+                          self.key_manager)
+
+        # unknown signer
+        del self.key_manager.pgp_keys[pgp_id]
+        res = self.crypto_obj.disassemble_message_packet(packet,
+                                                         self.key_manager)
+        self.assertEqual(res[1:], (msg, 3))
+
+        # plain key signer (all-zero PGP ID)
+        packet = self.crypto_obj.assemble_message_packet(
+                msg, recipient_sk.public_key(), [recipient_sk, bytes(8)])
+        res = self.crypto_obj.disassemble_message_packet(packet,
+                                                         self.key_manager)
+        self.assertEqual(res[1:3], (msg, 1))
+        self.assertEqual(res[3].public_numbers(),
+                         recipient_sk.public_key().public_numbers())
+
+    def test_protocol_versions(self):
+        sk = self.key_manager.gen_rsa_key(2048)
+        key_manager = DummyKeyManager(0)
+        key_manager.keys = [self.key_manager.gen_rsa_key(1024), sk]
+        wrapped_obj = Crypto(
+                protocol_version=const.PROTOCOL_VERSION_WRAPPED_KEY)
+
+        # version 1 header is one RSA block followed by AES-GCM ciphertext
+        # and a tag
+        packet = wrapped_obj.assemble_message_packet(
+                'HelloHello', sk.public_key(), [sk, bytes(8)])
+        version, header_block = split_message_packet(packet)[:2]
+        enc_header = der_codec.decode_mp_header_container(header_block)[1]
+        self.assertEqual(version, const.PROTOCOL_VERSION_WRAPPED_KEY)
+        mp_header_len = len(der_codec.encode_mp_header(
+                const.IS, const.RSASSA_PSS_OID, bytes(8), bytes(256),
+                bytes(20), bytes(16)))
+        self.assertEqual(len(enc_header),
+                         256 + mp_header_len + const.AES_GCM_TAG_SIZE)
+
+        # a change of version 1 header ciphertext or tag is detected once
+        # the key is found
+        enc_offset = bytes(packet).index(bytes(enc_header))
+        for pos in [enc_offset + len(enc_header) - 1,
+                    enc_offset + 256 + 1]:
+            tampered = bytearray(packet)
+            tampered[pos] ^= 1
+            self.assertRaises(HeaderVerificationFailed,
+                              wrapped_obj.disassemble_message_packet,
+                              bytes(tampered), key_manager)
+
+        # version 0 header takes several RSA blocks and is the default
+        legacy_packet = self.crypto_obj.assemble_message_packet(
+                'HelloHello', sk.public_key(), [sk, bytes(8)])
+        version, header_block = split_message_packet(legacy_packet)[:2]
+        enc_header = der_codec.decode_mp_header_container(header_block)[1]
+        self.assertEqual(version, const.PROTOCOL_VERSION_RSA_HEADER)
+        self.assertEqual(len(enc_header), 2 * 256)
+
+        # disassembly dispatches on a packet version
+        for crypto_obj in [self.crypto_obj, wrapped_obj]:
+            for msg_packet in [packet, legacy_packet]:
+                res = crypto_obj.disassemble_message_packet(msg_packet,
+                                                            key_manager)
+                self.assertEqual(res[1:3], ('HelloHello', 1))
+
+        # unknown versions are rejected on both ends
+        self.assertRaises(UnsupportedProtocolVersion, Crypto,
+                          protocol_version=42)
+        unknown_packet = der_codec.encode_message_packet(
+                42, *split_message_packet(packet)[1:])
+        self.assertRaises(UnsupportedProtocolVersion,
+                          self.crypto_obj.disassemble_message_packet,
+                          unknown_packet, key_manager)
+
+    def test_aead_content(self):
+        crypto_obj = Crypto(content_algorithm=const.AES_128_GCM_OID)
+        sk = choice(self.key_manager.keys)
+
+        # GCM tag takes place of HMAC digest, any instance disassembles it
+        for msg in self.TEST_MSGS:
+            packet = crypto_obj.assemble_message_packet(msg, sk.public_key())
+            hmac_block, content_block = split_message_packet(packet)[2:]
+            self.assertEqual(der_codec.decode_mp_hmac_container(hmac_block),
+                             (const.AES_128_GCM_OID, mock.ANY))
+            self.assertEqual(
+                    der_codec.decode_mp_content_container(content_block)[1],
+                    const.AES_128_GCM_OID)
+            for disassembler in [crypto_obj, self.crypto_obj]:
+                res = disassembler.disassemble_message_packet(
+                        packet, self.key_manager)
+                self.assertEqual(res[1:], (msg, 2))
+
+        # tampered content and a CBC packet claiming to carry a GCM tag
+        tampered = packet[:-1] + bytes([packet[-1] ^ 0x01])
+        cbc_packet = self.crypto_obj.assemble_message_packet(
+                'HelloHello', sk.public_key())
+        version, header_block, hmac_block, content_block = \
+            split_message_packet(cbc_packet)
+        downgraded = der_codec.encode_message_packet(
+                version, header_block, der_codec.encode_mp_hmac_container(
+                    const.AES_128_GCM_OID,
+                    der_codec.decode_mp_hmac_container(hmac_block)[1]),
+                content_block)
+        for msg_packet in [tampered, downgraded]:
+            self.assertRaises(HMACVerificationFailed,
+                              crypto_obj.disassemble_message_packet,
+                              msg_packet, self.key_manager)
+            sink = io.BytesIO()
+            self.assertRaises(HMACVerificationFailed,
+                              crypto_obj.disassemble_message_packet_stream,
+                              msg_packet, self.key_manager, sink)
+            self.assertEqual(sink.getvalue(), b'')
+
+        # streaming assembly into seekable and non-seekable sinks
+        msg = urandom(100000)
+        stream_sink = io.BufferedWriter(io.BytesIO())
+        stream_sink.seekable = lambda: False
+        for sink in [io.BytesIO(), stream_sink]:
+            written = crypto_obj.assemble_message_packet_stream(
+                    io.BytesIO(msg), len(msg), sk.public_key(), sink,
+                    chunk_size=4096)
+            sink.flush()
+            packet = sink.raw.getvalue() if sink is stream_sink else \
+                sink.getvalue()
+            self.assertEqual(written, len(packet))
+
+            res = crypto_obj.disassemble_message_packet(packet,
+                                                        self.key_manager)
+            self.assertEqual(res[1], str(msg, 'iso-8859-1'))
+
+            out = io.BytesIO()
+            res = crypto_obj.disassemble_message_packet_stream(
+                    packet, self.key_manager, out, chunk_size=1000)
+            self.assertEqual((res[1], out.getvalue()), (len(msg), msg))
+
+        self.assertRaises(ValueError, Crypto, content_algorithm=const.SHA1_OID)
+
+    def test_x25519_header(self):
+        sender_sk = self.key_manager.keys[0]
+        self.key_manager.x25519_keys = [X25519PrivateKey.generate()
+                                        for _ in range(3)]
+        sk = self.key_manager.x25519_keys[-1]
+
+        # header mode is chosen by a recipient key type
+        packet = self.crypto_obj.assemble_message_packet(
+                'HelloHello', sk.public_key(), [sender_sk, bytes(8)])
+        header_block = split_message_packet(packet)[1]
+        oid, enc_header = der_codec.decode_mp_header_container(header_block)
+        self.assertEqual(oid, const.X25519_OID)
+
+        # only X25519 keys are tried
+        crypto_obj = Crypto(adaptive_key_order=True)
+        for _ in range(2):
+            res = crypto_obj.disassemble_message_packet(packet,
+                                                        self.key_manager)
+            self.assertEqual(res[1:3], ('HelloHello', 1))
+        self.assertEqual(crypto_obj.key_stats.get_key_hits(sk), 2)
+        self.assertEqual(crypto_obj.key_stats.trial_decryptions, 3 + 1)
+
+        sink = io.BytesIO()
+        res = self.crypto_obj.disassemble_message_packet_stream(
+                packet, self.key_manager, sink)
+        self.assertEqual((res[1:3], sink.getvalue()),
+                         ((10, 1), b'HelloHello'))
+
+        # a packet for someone else and a tampered header
+        stranger_pk = X25519PrivateKey.generate().public_key()
+        tampered = bytearray(packet)
+        tampered[packet.index(bytes(enc_header)) + len(enc_header) - 1] ^= 1
+        parallel_obj = Crypto(trial_workers=4)
+        for msg_packet in [self.crypto_obj.assemble_message_packet(
+                               'HelloHello', stranger_pk), tampered]:
+            for crypto_obj in [self.crypto_obj, parallel_obj]:
+                self.assertRaises(NoMatchingRSAKeyForMessage,
+                                  crypto_obj.disassemble_message_packet,
+                                  msg_packet, self.key_manager)
+        parallel_obj.close()
+
+    def test_ed25519_signature(self):
+        recipient_sk = choice(self.key_manager.keys)
+        rsa_sk = self.key_manager.gen_rsa_key(2048)
+        ed_sk = Ed25519PrivateKey.generate()
+        pgp_id = urandom(8)
+        msg = 'signed message'
+
+        # plain key signer (all-zero PGP ID), RSA keys are skipped
+        self.key_manager.ed25519_keys = [ed_sk]
+        packet = self.crypto_obj.assemble_message_packet(
+                msg, recipient_sk.public_key(), [ed_sk, bytes(8)])
+        res = self.crypto_obj.disassemble_message_packet(packet,
+                                                         self.key_manager)
+        self.assertEqual(res[1:3], (msg, 1))
+        self.assertIsInstance(res[3], Ed25519PublicKey)
+
+        # known PGP signer and a key of another scheme or signer
+        self.key_manager.pgp_keys[pgp_id] = ed_sk.public_key()
+        packet = self.crypto_obj.assemble_message_packet(
+                msg, recipient_sk.public_key(), [ed_sk, pgp_id])
+        res = self.crypto_obj.disassemble_message_packet(packet,
+                                                         self.key_manager)
+        self.assertEqual(res[1:], (msg, 0, str(pgp_id, 'iso-8859-1')))
+        for wrong_pk in [rsa_sk.public_key(),
+                         Ed25519PrivateKey.generate().public_key()]:
+            self.key_manager.pgp_keys[pgp_id] = wrong_pk
+            self.assertRaises(SignatureVerificationFailed,
+                              self.crypto_obj.disassemble_message_packet,
+                              packet, self.key_manager)
+        del self.key_manager.pgp_keys[pgp_id]
+
+        # a 64 bytes signature makes the header shorter, unsigned headers
+        # of Ed25519 senders are as long as signed ones
+        ed_obj = Crypto(signature_algorithm=const.ED25519_OID)
+        headers = [split_message_packet(crypto_obj.assemble_message_packet(
+                       msg, recipient_sk.public_key(), sign))[1]
+                   for crypto_obj, sign in [
+                       (self.crypto_obj, [ed_sk, pgp_id]),
+                       (self.crypto_obj, [rsa_sk, pgp_id]),
+                       (ed_obj, None)]]
+        self.assertLess(len(headers[0]), len(headers[1]))
+        self.assertEqual(len(headers[0]), len(headers[2]))
+
+        self.assertRaises(ValueError, Crypto,
+                          signature_algorithm=const.X25519_OID)
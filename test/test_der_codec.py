@@ -0,0 +1,216 @@
+import unittest
+from os import urandom
+from random import randint, choice
+import mflod.crypto.der_codec as der_codec
+import mflod.crypto.asn1_structures as asn1_dec
+from mflod.crypto.constants import Constants as const
+from mflod.crypto.exceptions import DERDecodingError
+from pyasn1.type import univ
+from pyasn1.codec.der.encoder import encode as asn1_encode
+from pyasn1.codec.der.decoder import decode as asn1_decode
+
+
+class TestDERCodec(unittest.TestCase):
+    """ Differential tests of the fast-path DER codec against pyasn1
+
+    asn1_structures.py is the reference: every structure encoded by the
+    codec must be byte-identical to pyasn1 encoding and decode to the same
+    values.
+
+    """
+
+    OIDS = [
+        const.AES_128_CBC_OID,
+        const.SHA1_OID,
+        const.RSASSA_PSS_OID,
+        const.ID_RSAES_OAEP,
+        const.NO_SIGN_OID,
+        '2.999.1.16384.4294967296',
+    ]
+
+    # lengths around short/long form boundaries
+    LENGTHS = [0, 1, 127, 128, 129, 255, 256, 257, 65535, 65536, 70000]
+
+    def _algorithm_identifier(self, oid):
+        ai = asn1_dec.AlgorithmIdentifier()
+        ai['algorithm'] = oid
+        ai['parameters'] = univ.Null()
+        return ai
+
+    def _content_container(self, iv, oid, enc_content):
+        container = asn1_dec.MPContentContainer()
+        container['initializationVector'] = iv
+        container['encryptionAlgorithm'] = self._algorithm_identifier(oid)
+        container['encryptedContent'] = enc_content
+        return container
+
+    def _hmac_container(self, oid, digest):
+        container = asn1_dec.MPHMACContainer()
+        container['digestAlgorithm'] = self._algorithm_identifier(oid)
+        container['digest'] = digest
+        return container
+
+    def _header_container(self, oid, enc_header):
+        container = asn1_dec.MPHeaderContainer()
+        container['encryptionAlgorithm'] = self._algorithm_identifier(oid)
+        container['encryptedHeader'] = enc_header
+        return container
+
+    def test_algorithm_identifier(self):
+        for oid in self.OIDS:
+            der = der_codec.encode_algorithm_identifier(oid)
+            self.assertEqual(der,
+                             asn1_encode(self._algorithm_identifier(oid)))
+            self.assertEqual(
+                der_codec.decode_mp_hmac_container(
+                    der_codec.encode_mp_hmac_container(oid, b''))[0],
+                oid)
+
+    def test_oid_lookup_is_bounded(self):
+        lookup_size = len(der_codec._oids)
+
+        # OIDs of received packets are decoded without being remembered
+        for arc in range(100):
+            oid = '2.999.%d' % (arc + 10 ** 6)
+            self.assertEqual(
+                der_codec.decode_mp_hmac_container(
+                    der_codec.encode_mp_hmac_container(oid, b''))[0],
+                oid)
+        self.assertEqual(len(der_codec._oids), lookup_size)
+        self.assertEqual(der_codec._oids[der_codec.encode_oid(
+            const.RSASSA_PSS_OID)[2:]], const.RSASSA_PSS_OID)
+
+    def test_integer(self):
+        for value in [0, 1, 127, 128, 255, 256, -1, -128, -129, 2 ** 64]:
+            self.assertEqual(der_codec.encode_integer(value),
+                             asn1_encode(univ.Integer(value)))
+
+    def test_mp_content(self):
+        for length in self.LENGTHS:
+            for content in [urandom(length), 'ä' * length]:
+                mp_content = asn1_dec.MPContent()
+                mp_content['timestamp'] = '170425120000Z'
+                mp_content['content'] = content
+                der = der_codec.encode_mp_content('170425120000Z', content)
+                self.assertEqual(der, asn1_encode(mp_content))
+
+                timestamp, decoded = der_codec.decode_mp_content(der)
+                self.assertEqual(timestamp, '170425120000Z')
+                self.assertEqual(decoded, bytes(mp_content['content']))
+
+                # prefix decoding needs a bounded head of an encoding only
+                head = der[:der_codec.MAX_MP_CONTENT_PREFIX_LEN]
+                timestamp, content_len, prefix_len = \
+                    der_codec.decode_mp_content_prefix(head)
+                self.assertEqual(timestamp, '170425120000Z')
+                self.assertEqual(der[prefix_len:], decoded)
+                self.assertEqual(content_len, len(decoded))
+
+    def test_mp_header(self):
+        for length in self.LENGTHS:
+            values = (const.IS, choice(self.OIDS), urandom(8),
+                      urandom(length), urandom(20), urandom(16))
+
+            mp_header = asn1_dec.MPHeader()
+            mp_header['identificationString'] = values[0]
+            mp_header['signatureAlgorithm'] = \
+                self._algorithm_identifier(values[1])
+            mp_header['PGPKeyID'] = values[2]
+            mp_header['signature'] = values[3]
+            mp_header['HMACKey'] = values[4]
+            mp_header['AESKey'] = values[5]
+
+            der = der_codec.encode_mp_header(*values)
+            self.assertEqual(der, asn1_encode(mp_header))
+            self.assertEqual(der_codec.decode_mp_header(der),
+                             (b'FLOD',) + values[1:])
+
+    def test_mp_header_key(self):
+        values = (const.IS, urandom(16), urandom(16))
+
+        mp_header_key = asn1_dec.MPHeaderKey()
+        mp_header_key['identificationString'] = values[0]
+        mp_header_key['initializationVector'] = values[1]
+        mp_header_key['AESKey'] = values[2]
+
+        der = der_codec.encode_mp_header_key(*values)
+        self.assertEqual(der, asn1_encode(mp_header_key))
+        self.assertEqual(der_codec.decode_mp_header_key(der),
+                         (b'FLOD',) + values[1:])
+
+    def test_message_packet(self):
+        for length in self.LENGTHS:
+            iv, enc_content = urandom(16), urandom(length)
+            digest, enc_header = urandom(20), urandom(randint(1, 1024))
+
+            message_packet = asn1_dec.MessagePacket()
+            message_packet['protocolVersion'] = const.PROTOCOL_VERSION
+            message_packet['headerBlock'] = self._header_container(
+                    const.ID_RSAES_OAEP, enc_header)
+            message_packet['hmacBlock'] = self._hmac_container(
+                    const.SHA1_OID, digest)
+            message_packet['contentBlock'] = self._content_container(
+                    iv, const.AES_128_CBC_OID, enc_content)
+
+            der = der_codec.encode_message_packet(
+                    const.PROTOCOL_VERSION,
+                    der_codec.encode_mp_header_container(
+                        const.ID_RSAES_OAEP, enc_header),
+                    der_codec.encode_mp_hmac_container(const.SHA1_OID,
+                                                       digest),
+                    der_codec.encode_mp_content_container(
+                        iv, const.AES_128_CBC_OID, enc_content))
+            self.assertEqual(der, asn1_encode(message_packet))
+
+            # compare decoded values with the ones pyasn1 recovers
+            ref = asn1_decode(der)[0]
+            self.assertEqual(der_codec.decode_message_packet(der), (
+                int(ref[0]),
+                (str(ref[1][0][0]), bytes(ref[1][1])),
+                (str(ref[2][0][0]), bytes(ref[2][1])),
+                (bytes(ref[3][0]), str(ref[3][1][0]), bytes(ref[3][2]))
+            ))
+
+            # split blocks are exactly the encoded sub-structures
+            split = der_codec.split_message_packet(der)
+            self.assertEqual(split[3],
+                             asn1_encode(message_packet['contentBlock']))
+
+            # locating blocks reads small pieces only
+            reads = []
+
+            def read_at(offset, amount):
+                reads.append(amount)
+                return der[offset:offset + amount]
+
+            located = der_codec.locate_message_packet(read_at, len(der))
+            self.assertEqual(located[:3], split[:3])
+            self.assertEqual(der[slice(*located[3])], split[3])
+            self.assertEqual(located[4:6], (iv, const.AES_128_CBC_OID))
+            self.assertEqual(der[slice(*located[6])], enc_content)
+            self.assertLess(sum(reads) - len(split[1]) - len(split[2]), 128)
+
+    def test_malformed_input(self):
+        good = der_codec.encode_mp_hmac_container(const.SHA1_OID, urandom(20))
+
+        for bad in [
+            b'',
+            b'\x30',
+            good[:-1],
+            good + b'\x00',
+            b'\x31' + good[1:],
+            b'\x30\x81\x05' + good[2:],
+            b'\x30\x84\xff\xff\xff\xff' + good[2:],
+        ]:
+            self.assertRaises(DERDecodingError,
+                              der_codec.decode_mp_hmac_container, bad)
+
+        # a prefix that is cut or declares more content than it holds
+        prefix = der_codec.encode_mp_content_prefix('170425120000Z', 10)
+        for bad in [prefix[:-1], b'\x30\x10' + prefix[2:]]:
+            self.assertRaises(DERDecodingError,
+                              der_codec.decode_mp_content_prefix, bad)
+
+
+if __name__ == '__main__':
+    unittest.main()
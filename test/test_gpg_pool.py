@@ -0,0 +1,107 @@
+import threading
+import unittest
+from unittest import mock
+from mflod.crypto.gpg_pool import GPGPool
+
+
+class TestGPGPool(unittest.TestCase):
+    """
+    Running GPGPool class unit tests
+
+    Developers:
+        - (tnanoba) Tornike Nanobashvili
+    """
+
+    def setUp(self):
+        self.pool = GPGPool('/nonexistent', 2, factory=lambda home_dir: object())
+
+    def test_reuse(self):
+        """ Unit tests that single threaded callers always get the primary handle
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        for _ in range(3):
+            with self.pool.handle() as handle:
+                self.assertIs(handle, self.pool.primary)
+
+        stats = self.pool.get_stats()
+        self.assertEqual((stats['created'], stats['idle'], stats['acquisitions']), (1, 1, 3))
+
+        self.assertRaises(ValueError, GPGPool, '/nonexistent', 0, lambda home_dir: object())
+
+    def test_bounded_concurrency(self):
+        """ Unit tests that handles are created lazily up to pool size, further callers wait for a returned one
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+
+        self.assertIsNot(first, second)
+        self.assertRaises(TimeoutError, self.pool.acquire, 0.01)
+
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(self.pool.acquire(5)))
+        waiter.start()
+
+        self.pool.release(second)
+        waiter.join()
+
+        self.assertEqual(acquired, [second])
+        self.assertEqual(self.pool.get_stats()['created'], 2)
+        self.assertEqual(self.pool.get_stats()['waits'], 2)
+
+
+    def test_create_outside_lock(self):
+        """ Unit tests that a handle being created does not block callers taking idle handles
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        entered = threading.Event()
+        proceed = threading.Event()
+
+        def factory(home_dir):
+            entered.set()
+            proceed.wait(5)
+            return object()
+
+        pool = GPGPool('/nonexistent', 2, factory=lambda home_dir: object())
+        pool.factory = factory
+
+        primary = pool.acquire()
+        creator = threading.Thread(target=pool.acquire)
+        creator.start()
+        self.assertTrue(entered.wait(5))
+
+        # The primary handle is returned and taken again while the second one is still being created
+        pool.release(primary)
+        acquired = []
+        taker = threading.Thread(target=lambda: acquired.append(pool.acquire(1)))
+        taker.start()
+        taker.join(1)
+
+        self.assertFalse(taker.is_alive())
+        self.assertEqual(acquired, [primary])
+
+        proceed.set()
+        creator.join()
+        self.assertEqual(pool.get_stats()['created'], 2)
+
+        # Failed creation frees its slot
+        pool = GPGPool('/nonexistent', 2, factory=lambda home_dir: object())
+        pool.factory = mock.Mock(side_effect=OSError)
+        pool.acquire()
+
+        self.assertRaises(OSError, pool.acquire)
+        self.assertRaises(OSError, pool.acquire)
+        self.assertEqual(pool.factory.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from mflod.crypto.key_cache import KeyCache
+
+
+class FakeClock(object):
+    """
+    Manually advanced clock for TTL testing
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestKeyCache(unittest.TestCase):
+    """
+    Running KeyCache class unit tests
+
+    Developers:
+        - (tnanoba) Tornike Nanobashvili
+    """
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = KeyCache(3, clock=self.clock)
+
+    def test_lru_eviction(self):
+        """ Unit tests that the least recently used entry is evicted on overflow
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        for key in 'abc':
+            self.cache.put(key, key.upper())
+
+        # Touches "a", so "b" becomes the least recently used one
+        self.assertEqual(self.cache.get('a'), 'A')
+
+        self.cache.put('d', 'D')
+
+        self.assertEqual(self.cache.get('b'), None)
+        self.assertEqual([self.cache.get(key) for key in 'acd'], ['A', 'C', 'D'])
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_ttl(self):
+        """ Unit tests that entries expire after TTL seconds
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        cache = KeyCache(3, ttl=10, clock=self.clock)
+        cache.put('a', 'A')
+
+        self.clock.now = 9.9
+        self.assertEqual(cache.get('a'), 'A')
+
+        self.clock.now = 10
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.expirations, 1)
+
+        self.assertRaises(ValueError, KeyCache, 3, 0)
+        self.assertRaises(ValueError, KeyCache, 0)
+
+    def test_invalidate_and_stats(self):
+        """ Unit tests predicate invalidation and hit/miss statistics
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        self.cache.put(('ABCD', True), 1)
+        self.cache.put(('ABCD', False), 2)
+        self.cache.put(('EF', True), 3)
+
+        # None values are not cached
+        self.cache.put('none', None)
+
+        self.assertEqual(self.cache.invalidate(lambda key: key[0] == 'ABCD'), 2)
+        self.assertEqual(self.cache.get(('ABCD', True)), None)
+        self.assertEqual(self.cache.get(('EF', True)), 3)
+        self.assertEqual(self.cache.get('none'), None)
+
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['size'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['invalidations'], 2)
+        self.assertAlmostEqual(stats['hit_ratio'], 1 / 3)
+
+        self.cache.reset_stats()
+        self.cache.clear()
+        self.assertEqual(self.cache.get_stats()['hits'], 0)
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
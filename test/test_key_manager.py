@@ -1,8 +1,18 @@
+import os
+import shutil
+import subprocess
 import unittest
 import logging
+import tempfile
+from unittest import mock
 from mflod.crypto.key_manager import KeyManager
+from mflod.crypto.keyring_watcher import KeyringWatcher
 from unittest_data_provider import data_provider
+import pgp_test_data
 from cryptography.hazmat.backends.openssl import rsa
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
 
 
 logger = logging.getLogger()
@@ -44,6 +54,49 @@ class TestKeyManager(unittest.TestCase):
         # Fires up ValueError exception
         self.assertRaises(ValueError)
 
+    def test_x25519_keys(self):
+        """ Unit tests generate_x25519_key, add_x25519_key and yield_x25519_keys methods from KeyManager class
+
+        Asserts that generated keys are X25519 private keys and added ones are yielded in the order of addition
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        keys = [self.manager.generate_x25519_key() for _ in range(2)]
+
+        self.assertTrue(all(isinstance(key, X25519PrivateKey) for key in keys))
+        self.assertEqual(list(self.manager.yield_x25519_keys()), [])
+
+        for key in keys:
+            self.manager.add_x25519_key(key)
+
+        self.assertEqual(list(self.manager.yield_x25519_keys()), keys)
+
+    def test_ed25519_keys(self):
+        """ Unit tests generate_ed25519_key and add_ed25519_key methods from KeyManager class
+
+        Asserts that public keys of added Ed25519 keys are returned for an all-zero PGP key ID after plain RSA ones
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        key = self.manager.generate_ed25519_key()
+        rsa_key = self.manager.generate_plain_rsa_key(1024)
+
+        self.assertIsInstance(key, Ed25519PrivateKey)
+        self.assertEqual(self.manager.get_pk_by_pgp_id(bytes(8)), ())
+
+        self.manager.add_plain_rsa_key(rsa_key)
+        self.manager.add_ed25519_key(key)
+
+        public_keys = self.manager.get_pk_by_pgp_id(bytes(8))
+
+        self.assertEqual(public_keys[0].public_numbers(), rsa_key.public_key().public_numbers())
+        self.assertEqual(public_keys[1].public_bytes(Encoding.Raw, PublicFormat.Raw),
+                         key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw))
+
     def test_generate_pgp_key(self):
         """ Unit tests GnuPGWrapper class generate_pgp_key method
 
@@ -135,6 +188,227 @@ class TestKeyManager(unittest.TestCase):
         else:
             pass
 
+    def test_get_pgp_rsa_keys_bulk_export(self):
+        """ Unit tests that get_pgp_rsa_keys exports the key chain with a single gpg call and splits it per key
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        keys = [self.manager.generate_plain_rsa_key(1024) for _ in range(3)]
+        subkey = self.manager.generate_plain_rsa_key(1024)
+
+        for secret in [True, False]:
+            # Mixed old/new packet formats, subkey packets must not start a new key
+            exported = b''.join([
+                pgp_test_data.transferable_key(keys[0], secret, subkey),
+                pgp_test_data.transferable_key(keys[1], secret, new_format=False),
+                pgp_test_data.transferable_key(keys[2], secret, subkey, user_id=b'x' * 300),
+            ])
+
+            with mock.patch.object(self.manager, '_export_pgp_keys', return_value=exported) as export_keys:
+                retrieved = list(self.manager.get_pgp_rsa_keys(-1, secret))
+
+                export_keys.assert_called_once_with([], secret)
+
+                self.assertEqual(
+                    [key.public_key().public_numbers() if secret else key.public_numbers() for key in retrieved],
+                    [key.public_key().public_numbers() for key in keys]
+                )
+
+                # Limit and requested subset
+                self.assertEqual(len(list(self.manager.get_pgp_rsa_keys(2, secret, ['A', 'B']))), 2)
+                export_keys.assert_called_with(['A', 'B'], secret)
+
+                # Empty subset does not export the whole key chain
+                export_keys.reset_mock()
+                self.assertEqual(list(self.manager.get_pgp_rsa_keys(-1, secret, [])), [])
+                export_keys.assert_not_called()
+
+    def test_pgp_key_index(self):
+        """ Unit tests PGP key index driven yield_keys, get_pk_by_pgp_id and get_sign_list methods
+
+        Asserts that the index is built with two gpg invocations (public and private key chain exports) and lookups
+            by raw/hex keyid, short keyid and fingerprint do not invoke gpg.
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        own_keys = [self.manager.generate_plain_rsa_key(1024) for _ in range(2)]
+        contact_key = self.manager.generate_plain_rsa_key(1024)
+        plain_key = self.manager.generate_plain_rsa_key(1024)
+
+        exports = {
+            True: b''.join(pgp_test_data.transferable_key(key) for key in own_keys),
+            False: b''.join(pgp_test_data.transferable_key(key, False) for key in own_keys + [contact_key]),
+        }
+        listed = {
+            True: [pgp_test_data.fingerprint(key) for key in own_keys],
+            False: [pgp_test_data.fingerprint(key) for key in own_keys + [contact_key]],
+        }
+
+        def list_key_chain():
+            return {'public': list(listed[False]), 'secret': list(listed[True])}
+
+        with mock.patch.object(self.manager, '_export_pgp_keys',
+                               side_effect=lambda key_ids, secret: exports[secret]) as export_keys, \
+                mock.patch.object(self.manager, '_list_key_chain_fingerprints', side_effect=list_key_chain):
+            self.manager.add_plain_rsa_key(plain_key)
+
+            self.assertEqual(
+                [key.private_numbers().public_numbers for key in self.manager.yield_keys()],
+                [key.private_numbers().public_numbers for key in own_keys + [plain_key]]
+            )
+
+            for key in own_keys + [contact_key]:
+                fingerprint = pgp_test_data.fingerprint(key)
+                key_id = fingerprint[-16:]
+                numbers = key.public_key().public_numbers()
+
+                for pgp_id in [key_id, key_id[-8:], fingerprint.lower(), bytes.fromhex(key_id),
+                               bytes.fromhex(fingerprint)]:
+                    self.assertEqual(self.manager.get_pk_by_pgp_id(pgp_id).public_numbers(), numbers)
+
+                # Private RSA keys are served from the index without exporting them again
+                if key is not contact_key:
+                    self.assertEqual(self.manager.get_pgp_rsa_key_id(key_id[-8:]).private_numbers().d,
+                                     key.private_numbers().d)
+
+            # Sign list is returned for own keys only
+            sign_list = self.manager.get_sign_list(pgp_test_data.fingerprint(own_keys[0]))
+            self.assertEqual(sign_list[0].private_numbers().d, own_keys[0].private_numbers().d)
+            self.assertEqual(sign_list[1], bytes.fromhex(pgp_test_data.fingerprint(own_keys[0])[-16:]))
+            self.assertEqual(self.manager.get_sign_list(pgp_test_data.fingerprint(contact_key)), None)
+
+            # Unknown key and all-zero keyid of plain key signers
+            self.assertEqual(self.manager.get_pk_by_pgp_id(b'\x01' * 8), None)
+            self.assertEqual(self.manager.get_pk_by_pgp_id('not a key id'), None)
+            self.assertEqual(self.manager.get_pk_by_pgp_id(bytes.fromhex(key_id).decode('latin-1')), None)
+            self.assertEqual([key.public_numbers() for key in self.manager.get_pk_by_pgp_id('0' * 16)],
+                             [plain_key.public_key().public_numbers()])
+
+            self.assertEqual(export_keys.call_count, 2)
+
+            # Deleting a key drops its index entry without exporting the key chain again
+            listed[False].remove(pgp_test_data.fingerprint(contact_key))
+
+            with mock.patch.object(self.manager, '_run_gpg', return_value=(b'', [])) as run_gpg:
+                self.assertTrue(self.manager.delete_pgp_key(pgp_test_data.fingerprint(contact_key)))
+
+            # The deletion is the only gpg invocation besides the key chain listing
+            self.assertEqual(run_gpg.call_count, 1)
+
+            self.assertEqual(self.manager.get_pk_by_pgp_id(pgp_test_data.fingerprint(contact_key)), None)
+            self.assertEqual(len(list(self.manager.yield_keys())), 3)
+            self.assertEqual(export_keys.call_count, 2)
+
+    def test_sync_key_index(self):
+        """ Unit tests sync_key_index: keys added to or removed from the key chain by another process are picked up
+            on a lookup after key chain files change, only the added keys are exported
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        keys = [self.manager.generate_plain_rsa_key(1024) for _ in range(3)]
+        fingerprints = [pgp_test_data.fingerprint(key) for key in keys]
+
+        def export(key_ids, secret):
+            return b''.join(pgp_test_data.transferable_key(keys[fingerprints.index(fingerprint)], secret)
+                            for fingerprint in key_ids or listed[secret])
+
+        listed = {True: fingerprints[:1], False: fingerprints[:2]}
+
+        def list_key_chain():
+            return {'public': list(listed[False]), 'secret': list(listed[True])}
+
+        home_dir = tempfile.mkdtemp()
+        keyring_dir = tempfile.mkdtemp()
+        pubring = os.path.join(keyring_dir, 'pubring.kbx')
+        now = [0.0]
+
+        manager = KeyManager(home_dir)
+
+        # Key chain files are watched in a directory gpg does not write to, polled on a fake clock
+        manager.keyring_watcher = KeyringWatcher(keyring_dir, 1.0, clock=lambda: now[0])
+
+        try:
+            with mock.patch.object(manager, '_export_pgp_keys', side_effect=export) as export_keys, \
+                    mock.patch.object(manager, '_list_key_chain_fingerprints', side_effect=list_key_chain):
+
+                # Key chain files written before the index is built do not make it stale
+                with open(pubring, 'wb') as keyring_file:
+                    keyring_file.write(b'gpg')
+
+                self.assertEqual(len(list(manager.yield_keys())), 1)
+                self.assertEqual(export_keys.call_count, 2)
+
+                # Key chain is not listed again until its files change
+                self.assertEqual(manager.sync_key_index(), None)
+
+                # Another process imports a key pair, deletes one public key and one private key
+                listed[True] = fingerprints[2:]
+                listed[False] = fingerprints[1:]
+
+                with open(pubring, 'wb') as keyring_file:
+                    keyring_file.write(b'changed')
+
+                # The change is not noticed until the poll interval passes
+                self.assertEqual(manager.get_pk_by_pgp_id(fingerprints[0]).public_numbers(),
+                                 keys[0].public_key().public_numbers())
+
+                now[0] += 1.0
+
+                self.assertEqual(manager.get_pk_by_pgp_id(fingerprints[0]), None)
+                self.assertEqual(manager.get_pk_by_pgp_id(fingerprints[2][-16:]).public_numbers(),
+                                 keys[2].public_key().public_numbers())
+                self.assertEqual(manager.get_sign_list(fingerprints[1]), None)
+                self.assertEqual(manager.get_sign_list(fingerprints[2])[0].private_numbers().d,
+                                 keys[2].private_numbers().d)
+
+                self.assertEqual(export_keys.call_args_list[2:], [mock.call(fingerprints[2:], False),
+                                                                  mock.call(fingerprints[2:], True)])
+
+                # Private key imported for an already indexed public key
+                listed[True] = fingerprints[1:]
+                self.assertEqual(manager.sync_key_index(True), {'added': 0, 'removed': 0})
+                self.assertEqual(len(list(manager.yield_keys())), 2)
+                self.assertEqual(export_keys.call_args_list[-1], mock.call(fingerprints[1:2], True))
+        finally:
+            subprocess.run(['gpgconf', '--homedir', home_dir, '--kill', 'gpg-agent'], stderr=subprocess.DEVNULL)
+            shutil.rmtree(home_dir, ignore_errors=True)
+            shutil.rmtree(keyring_dir, ignore_errors=True)
+
+    def test_get_pgp_rsa_key_id_cache(self):
+        """ Unit tests that get_pgp_rsa_key_id caches RSA key instances and delete_pgp_key invalidates them
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        fingerprint = 'D94FC56AFD1D1AD8B56D35EA9FB10119E057B48F'
+        rsa_key = self.manager.generate_plain_rsa_key(512)
+
+        with mock.patch.object(self.manager, '_retrieve_local_pgp_key_id', return_value='armor') as retrieve, \
+                mock.patch.object(self.manager, '_return_rsa_key_from_pgp', return_value=rsa_key), \
+                mock.patch.object(self.manager, '_run_gpg'):
+
+            # Only the first lookup of each keyid/fingerprint and secret flag pair hits gpg
+            for key_id in [fingerprint, fingerprint.lower(), '9FB10119E057B48F', '0x9fb10119e057b48f']:
+                self.assertIs(self.manager.get_pgp_rsa_key_id(key_id), rsa_key)
+            self.manager.get_pgp_rsa_key_id(fingerprint, False)
+
+            self.assertEqual(retrieve.call_count, 3)
+            self.assertEqual(self.manager.key_cache.hits, 2)
+
+            # Deleting a key drops the entries looked up by its fingerprint and keyid
+            self.manager.delete_pgp_key(fingerprint)
+            self.assertEqual(len(self.manager.key_cache), 0)
+
+            self.manager.get_pgp_rsa_key_id(fingerprint)
+            self.assertEqual(retrieve.call_count, 4)
+
     @data_provider(lambda: (
             # First RSA example
             (
@@ -0,0 +1,134 @@
+import shutil
+import asyncio
+import tempfile
+import subprocess
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from mflod.crypto.key_stock import KeyStock
+from mflod.crypto.key_manager import KeyManager
+from mflod.crypto.async_key_manager import AsyncKeyManager
+
+
+class TestKeyStock(unittest.TestCase):
+    """
+    Running KeyStock class unit tests
+
+    Developers:
+        - (tnanoba) Tornike Nanobashvili
+    """
+
+    def setUp(self):
+        self.stock = KeyStock({1024: 2, 1536: 1}, max_workers=2)
+
+    def tearDown(self):
+        self.stock.close()
+
+    def test_take_and_refill(self):
+        """ Unit tests that stocked keys are handed out and replaced, empty stock generates keys inline
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        self.assertTrue(self.stock.wait(60))
+
+        stats = self.stock.get_stats()
+        self.assertEqual((stats[1024]['level'], stats[1536]['level']), (2, 1))
+
+        keys = [self.stock.take(1024) for _ in range(3)]
+
+        self.assertEqual([key.key_size for key in keys], [1024] * 3)
+        self.assertEqual(len({key.private_numbers().d for key in keys}), 3)
+
+        # Not stocked size is generated inline and is not accounted
+        self.assertEqual(self.stock.take(512).key_size, 512)
+
+        self.assertTrue(self.stock.wait(60))
+
+        stats = self.stock.get_stats()[1024]
+        self.assertEqual((stats['level'], stats['taken'], stats['pending']), (2, 3, 0))
+        self.assertEqual(stats['generated'] + stats['misses'], 5)
+        self.assertGreater(stats['refill_rate'], 0)
+
+        self.stock.close()
+        self.stock.take(1024)
+        self.assertEqual(self.stock.refill(1024), 0)
+
+    def test_key_manager_stock(self):
+        """ Unit tests that KeyManager takes plain RSA keys and PGP keys out of the key stock
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        home_dir = tempfile.mkdtemp()
+        stock = KeyStock(1, (1024,), executor=ThreadPoolExecutor(1))
+
+        try:
+            manager = KeyManager(home_dir, key_stock=stock)
+            stock.wait(60)
+
+            self.assertEqual(manager.generate_plain_rsa_key(1024).key_size, 1024)
+
+            fingerprint = manager.generate_pgp_key(1024, 'Unit Test Key', 'Generated by Unit Testing', 'test@flod')
+
+            self.assertEqual(manager._list_pgp_fingerprints(True), [fingerprint])
+            self.assertEqual(stock.get_stats()[1024]['taken'], 2)
+
+            private_key = manager.get_sign_list(fingerprint)[0]
+            self.assertEqual(private_key.private_numbers(), manager.get_pgp_rsa_key_id(fingerprint).private_numbers())
+
+            # gpg verifies the self-certification signature built of the stocked key
+            self.assertTrue(self._check_sigs(manager, fingerprint))
+        finally:
+            stock.close()
+            subprocess.run(['gpgconf', '--homedir', home_dir, '--kill', 'gpg-agent'], stderr=subprocess.DEVNULL)
+            shutil.rmtree(home_dir, ignore_errors=True)
+
+    def test_async_key_manager_stock(self):
+        """ Unit tests that AsyncKeyManager takes PGP keys out of the key stock of the wrapped KeyManager
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        home_dir = tempfile.mkdtemp()
+        stock = KeyStock(2, (1024,), executor=ThreadPoolExecutor(1))
+
+        try:
+            manager = AsyncKeyManager(gnupg_home_dir=home_dir, key_stock=stock)
+            stock.wait(60)
+
+            async def generate():
+                return await asyncio.gather(*[manager.generate_pgp_key(1024, 'Unit Test Key ' + str(i))
+                                              for i in range(2)])
+
+            fingerprints = asyncio.run(generate())
+
+            self.assertEqual(sorted(manager.key_manager._list_pgp_fingerprints(True)), sorted(fingerprints))
+            self.assertEqual(stock.get_stats()[1024]['taken'], 2)
+            self.assertEqual(len(list(manager.key_manager.yield_keys())), 2)
+
+            for fingerprint in fingerprints:
+                self.assertTrue(self._check_sigs(manager.key_manager, fingerprint))
+        finally:
+            stock.close()
+            subprocess.run(['gpgconf', '--homedir', home_dir, '--kill', 'gpg-agent'], stderr=subprocess.DEVNULL)
+            shutil.rmtree(home_dir, ignore_errors=True)
+
+    @staticmethod
+    def _check_sigs(manager, fingerprint):
+        """ Checks key signatures with gpg --check-sigs
+
+        :param manager: KeyManager
+        :param fingerprint: str
+        :return: bool (True if the key has signatures and all of them are good)
+        """
+        output, _ = manager._run_gpg(['--with-colons', '--check-sigs', fingerprint])
+        validity = [line.split(':')[1] for line in output.decode('utf-8').splitlines() if line.startswith('sig:')]
+
+        return bool(validity) and all(sig == '!' for sig in validity)
+
+
+if __name__ == '__main__':
+    unittest.main()
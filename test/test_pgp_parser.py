@@ -0,0 +1,129 @@
+import unittest
+import pgpdump
+import pgp_test_data
+import mflod.crypto.pgp_parser as pgp_parser
+import mflod.crypto.pgp_builder as pgp_builder
+from mflod.crypto.exceptions import PGPParsingError
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+class TestPGPParser(unittest.TestCase):
+    """
+    Running pgp_parser module unit tests
+
+    Differential tests: pgpdump is the reference, both parsers have to recover the same RSA numbers.
+
+    Developers:
+        - (tnanoba) Tornike Nanobashvili
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.keys = [rsa.generate_private_key(65537, size, default_backend()) for size in [1024, 1536, 2048, 3072]]
+
+    def test_rsa_numbers_match_pgpdump(self):
+        """ Unit tests that parse_rsa_key recovers the same numbers pgpdump does for every packet layout
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        for key in self.keys:
+            for secret in [True, False]:
+                for new_format in [True, False]:
+                    data = pgp_test_data.transferable_key(key, secret, subkey=self.keys[0], new_format=new_format,
+                                                          created=1500000000)
+
+                    parsed = pgp_parser.parse_rsa_key(data)
+                    reference = next(pgpdump.BinaryData(data).packets())
+
+                    self.assertEqual((parsed.n, parsed.e), (reference.modulus, reference.exponent))
+                    self.assertEqual(parsed.creation_time, 1500000000)
+
+                    if secret:
+                        self.assertEqual((parsed.d, parsed.p, parsed.q, parsed.u),
+                                         (reference.exponent_d, reference.prime_p, reference.prime_q,
+                                          reference.multiplicative_inverse))
+                    else:
+                        self.assertEqual((parsed.d, parsed.p, parsed.q, parsed.u), (None, None, None, None))
+
+                        # pgpdump computes fingerprints of public key packets correctly only
+                        self.assertEqual(parsed.fingerprint.hex().upper(), reference.fingerprint.decode('ascii'))
+                        self.assertEqual(parsed.key_id.hex().upper(), reference.key_id.decode('ascii'))
+
+                    self.assertEqual(parsed.fingerprint.hex().upper(), pgp_test_data.fingerprint(key, 1500000000))
+
+    def test_split_keys_and_dearmor(self):
+        """ Unit tests splitting of a multi-key export and ASCII armor decoding against pgpdump
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        parts = [pgp_test_data.transferable_key(key, subkey=self.keys[1], new_format=i % 2 == 0)
+                 for i, key in enumerate(self.keys)]
+        data = b''.join(parts)
+
+        self.assertEqual(list(pgp_parser.split_keys(data)), parts)
+
+        armored = pgp_test_data.armor(data)
+        self.assertEqual(pgp_parser.dearmor(armored), bytes(pgpdump.AsciiData(armored.encode('ascii')).data))
+
+        # Armor headers are skipped, CRC24 is verified
+        self.assertEqual(pgp_parser.dearmor(armored.replace('-----\n\n', '-----\nComment: test\n\n', 1)), data)
+        self.assertRaises(PGPParsingError, pgp_parser.dearmor, armored[:armored.rindex('\n=') + 2] + 'AAAA' +
+                          armored[armored.rindex('\n=') + 6:])
+        self.assertRaises(PGPParsingError, pgp_parser.dearmor, armored.replace('\n=', '\n=A', 1))
+        self.assertRaises(PGPParsingError, pgp_parser.dearmor, 'not an armor')
+
+    def test_builder_round_trip(self):
+        """ Unit tests that keys built by pgp_builder parse back into the same RSA numbers and fingerprint
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        for key in self.keys:
+            data, fingerprint = pgp_builder.build_secret_key(key, 'Unit Test Key <test@flod>', 1500000000)
+            parsed = pgp_parser.parse_rsa_key(data)
+            numbers = key.private_numbers()
+
+            self.assertEqual(fingerprint, pgp_test_data.fingerprint(key, 1500000000))
+            self.assertEqual(parsed.fingerprint.hex().upper(), fingerprint)
+            self.assertEqual((parsed.n, parsed.e, parsed.d, {parsed.p, parsed.q}),
+                             (numbers.public_numbers.n, numbers.public_numbers.e, numbers.d, {numbers.p, numbers.q}))
+
+            # Secret key, user ID and self-signature packets
+            self.assertEqual([tag for tag, _, _, _ in pgp_parser.iter_packets(data)], [5, 13, 2])
+
+    def test_malformed_input(self):
+        """ Unit tests that malformed and unsupported key packets raise PGPParsingError
+
+        @developer: tnanoba
+
+        :return: void
+        """
+        data = pgp_test_data.transferable_key(self.keys[0])
+        body = pgp_test_data.secret_key_body(self.keys[0])
+        public_len = len(pgp_test_data.public_key_body(self.keys[0]))
+
+        for bad in [
+            b'',
+            b'\x00' + data[1:],
+            data[:200],
+            pgp_test_data.packet(13, b'user id only'),
+            # passphrase protected secret material
+            pgp_test_data.packet(5, body[:public_len] + b'\xfe' + body[public_len + 1:]),
+            # broken checksum
+            pgp_test_data.packet(5, body[:-1] + bytes([body[-1] ^ 1])),
+            # DSA key
+            pgp_test_data.packet(6, body[:5] + b'\x11' + body[6:public_len]),
+            # v5 key
+            pgp_test_data.packet(6, b'\x05' + body[1:public_len]),
+        ]:
+            self.assertRaises(PGPParsingError, pgp_parser.parse_rsa_key, bad)
+
+
+if __name__ == '__main__':
+    unittest.main()